@@ -0,0 +1,204 @@
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import bench_utils
+
+# 浏览器关闭监控的 CPU 占用和发现关闭的延迟：改动前监控线程不停调用 current_window_handle，
+# 现在阻塞等待驱动和浏览器进程退出，找不到浏览器进程时逐步放慢轮询。
+# 驱动用一个替身进程模拟：本地 HTTP 服务，像 chromedriver 一样从会话线程启动“浏览器”子进程
+# 用法（需要 PyQt5 和 selenium）：python benchmarks/bench_browser_monitor.py --seconds 5
+
+
+def run_driver():
+    # 替身驱动进程：GET /window 在浏览器运行时返回 200，POST /close 关闭浏览器（相当于用户关闭窗口）
+    browser = {}
+    browser_exited = threading.Event()
+    browser_started = threading.Event()
+
+    def run_session():
+        # 浏览器由会话线程启动并等待，子进程记录在该线程的 /proc/<pid>/task/<tid>/children 中
+        browser["process"] = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(3600)"],
+                                              stdout=subprocess.DEVNULL)
+        browser_started.set()
+        browser["process"].wait()
+        browser_exited.set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def reply(self, status):
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            self.reply(404 if browser_exited.is_set() else 200)
+
+        def do_POST(self):
+            browser["process"].terminate()
+            browser_exited.wait()
+            self.reply(200)
+
+        def log_message(self, *args):
+            pass
+
+    threading.Thread(target=run_session, daemon=True).start()
+    browser_started.wait()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+class StandInService:
+    def __init__(self, process):
+        self.process = process
+
+
+class StandInDriver:
+    # 只实现监控用到的部分：service.process、capabilities 和 current_window_handle
+    def __init__(self):
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--driver"],
+                                   stdout=subprocess.PIPE, text=True)
+        self.service = StandInService(process)
+        self.port = int(process.stdout.readline())
+        self.capabilities = {}
+        self.local = threading.local()
+
+    def request(self, method, path):
+        # 与 selenium 一样复用连接，每个线程一个
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        conn.request(method, path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+
+    @property
+    def current_window_handle(self):
+        from selenium.common.exceptions import WebDriverException
+        if self.request("GET", "/window") != 200:
+            raise WebDriverException("no such window")
+        return "window-1"
+
+    def close_window(self):
+        self.request("POST", "/close")
+
+    def quit(self):
+        # 先关闭浏览器，驱动被结束后不会留下子进程
+        self.close_window()
+        self.service.process.terminate()
+        self.service.process.wait()
+
+
+class SignalSink:
+    def emit(self):
+        pass
+
+
+class LegacyMonitor:
+    # 改动前 App.monitor_browser_and_update 的实现
+    def monitor_browser_and_update(self):
+        from selenium.common.exceptions import WebDriverException
+        while not self.monitor_stop_event.is_set():
+            if hasattr(self, 'driver') and self.driver:
+                try:
+                    if self.driver.service.process is None:
+                        self.close_browser()
+                        self.request_update_status.emit()
+                        self.monitor_stop_event.set()
+                        break
+                    _ = self.driver.current_window_handle
+                except WebDriverException:
+                    self.close_browser()
+                    self.request_update_status.emit()
+                    self.monitor_stop_event.set()
+
+
+def make_monitor_class(tool, find_browser=True):
+    # 直接使用 App 中现有的监控方法；find_browser 为 False 时模拟找不到浏览器进程，走轮询
+    class Monitor:
+        monitor_browser_and_update = tool.App.monitor_browser_and_update
+        get_browser_pids = tool.App.get_browser_pids
+        get_child_pids = tool.App.get_child_pids if find_browser else lambda self, pid: []
+        wait_for_process_exit = tool.App.wait_for_process_exit
+        poll_process_exit = tool.App.poll_process_exit
+        is_process_running = tool.App.is_process_running
+        is_browser_alive = tool.App.is_browser_alive
+        poll_browser_until_closed = tool.App.poll_browser_until_closed
+
+    return Monitor
+
+
+def process_cpu_seconds(pid):
+    # /proc/<pid>/stat 中的 utime 和 stime，包括所有线程
+    with open(f"/proc/{pid}/stat") as file:
+        fields = file.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def measure(monitor_class, seconds):
+    driver = StandInDriver()
+    monitor = monitor_class()
+    monitor.driver = driver
+    monitor.monitor_stop_event = threading.Event()
+    monitor.request_update_status = SignalSink()
+    monitor.closed_at = None
+
+    def close_browser():
+        monitor.closed_at = time.perf_counter()
+
+    monitor.close_browser = close_browser
+
+    driver_pid = driver.service.process.pid
+    driver_cpu = process_cpu_seconds(driver_pid)
+    own_cpu = time.process_time()
+    thread = threading.Thread(target=monitor.monitor_browser_and_update)
+    thread.start()
+    time.sleep(seconds)
+    own_cpu = time.process_time() - own_cpu
+    driver_cpu = process_cpu_seconds(driver_pid) - driver_cpu
+
+    # 关闭浏览器，记录监控发现关闭所用的时间
+    closed = time.perf_counter()
+    driver.close_window()
+    thread.join(timeout=10)
+    monitor.monitor_stop_event.set()
+    thread.join()
+    driver.quit()
+    latency = monitor.closed_at - closed if monitor.closed_at is not None else None
+    return own_cpu / seconds, driver_cpu / seconds, latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="浏览器关闭监控的 CPU 占用")
+    parser.add_argument("--seconds", type=float, default=5, help="浏览器保持打开的时间")
+    parser.add_argument("--driver", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.driver:
+        run_driver()
+        return
+
+    bench_utils.use_temp_home()
+    tool = bench_utils.load_app_module()
+    monitors = [
+        ("改动前（连续调用 WebDriver）", LegacyMonitor),
+        ("等待进程退出", make_monitor_class(tool)),
+        ("找不到浏览器进程时轮询", make_monitor_class(tool, find_browser=False)),
+    ]
+    for label, monitor_class in monitors:
+        monitor_cpu, driver_cpu, latency = measure(monitor_class, args.seconds)
+        latency_text = bench_utils.format_duration(latency) if latency is not None else "未发现"
+        print(f"{label}: 监控线程 CPU {monitor_cpu * 100:.1f}%, 驱动进程 CPU {driver_cpu * 100:.1f}%, "
+              f"发现关闭 {latency_text}")
+
+
+if __name__ == "__main__":
+    main()
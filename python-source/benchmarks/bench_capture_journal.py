@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+
+import bench_utils
+
+# 每秒可记录的响应数：改动前每条响应重写整个 import.json，现在追加到用例的抓包日志
+# 用法（需要 mitmproxy）：python benchmarks/bench_capture_journal.py --modules 50 --cases-per-module 100
+
+
+def legacy_update(import_file_path, module_id, case_id, error):
+    # 改动前的 update_error_json_with_error_data：读取整个计划，追加一条记录后按 indent=4 重写
+    with open(import_file_path, "r") as file:
+        data = json.load(file)
+    for module in data:
+        if str(module["id"]) == module_id:
+            for case in module.get("caseVoList", []):
+                if str(case["id"]) == case_id:
+                    existing_errors = case.get("httpResult") or []
+                    if isinstance(existing_errors, str):
+                        existing_errors = json.loads(existing_errors)
+                    existing_errors.append(error)
+                    case["httpResult"] = json.dumps(existing_errors, ensure_ascii=False)
+                    with open(import_file_path, "w") as file:
+                        json.dump(data, file, ensure_ascii=False, indent=4)
+                    return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓包记录写入吞吐量")
+    parser.add_argument("--modules", type=int, default=50)
+    parser.add_argument("--cases-per-module", type=int, default=100)
+    parser.add_argument("--responses", type=int, default=2000, help="新方式记录的响应数")
+    parser.add_argument("--legacy-responses", type=int, default=20, help="旧方式记录的响应数（每条都重写整个计划）")
+    args = parser.parse_args()
+
+    bench_utils.use_temp_home()
+    addon = bench_utils.load_addon_module()
+
+    plan = bench_utils.make_plan(args.modules, args.cases_per_module)
+    import_file_path = bench_utils.get_user_data_path("import.json")
+    bench_utils.write_plan(import_file_path, plan)
+    # 最后一个用例，旧方式需要遍历整个计划才能找到
+    module_id, case_id = str(plan[-1]["id"]), str(plan[-1]["caseVoList"][-1]["id"])
+    with open(bench_utils.get_user_data_path("current_test_case.json"), "w") as file:
+        json.dump({"module_id": module_id, "case_id": case_id, "storage": "json"}, file)
+    error = bench_utils.sample_capture()
+
+    def record_capture():
+        # GUI 未连接时每条响应的写入路径：读取当前用例（有缓存）并追加一行抓包日志
+        current_module_id, current_case_id, storage = addon.get_current_test_case()
+        addon.emit_capture(current_module_id, current_case_id, storage, error)
+
+    print(f"计划: {args.modules} 个模块, {args.modules * args.cases_per_module} 个用例, "
+          f"import.json {os.path.getsize(import_file_path) / 1024 / 1024:.1f} MB")
+    legacy = bench_utils.time_calls(lambda: legacy_update(import_file_path, module_id, case_id, error),
+                                    args.legacy_responses)
+    journal = bench_utils.time_calls(record_capture, args.responses)
+    print(f"重写 import.json: 每条 {bench_utils.format_duration(legacy)}, {1 / legacy:.1f} 条/秒")
+    print(f"追加抓包日志:     每条 {bench_utils.format_duration(journal)}, {1 / journal:.1f} 条/秒")
+    print(f"吞吐量提升: {legacy / journal:.0f} 倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+
+import bench_utils
+
+# 合成的 5 万用例计划上每次按快捷键（上/下一个用例）的开销：
+# 改动前每个查找方法各自遍历计划，现在使用 CaseIndex 并增量维护剩余数量
+# 用法（需要 PyQt5）：python benchmarks/bench_case_index.py --modules 500 --cases-per-module 100
+
+
+class StatusWindowSink:
+    # 只接收状态窗口的更新调用，不创建界面，测量的只是查找本身
+    def update_status(self, *args):
+        pass
+
+    update_module_case = update_remaining = update_steps = update_status
+
+
+class LegacyNavigator:
+    # 改动前 App 中的实现，每个方法线性遍历计划
+    def __init__(self, data, module_id, case_id):
+        self.data = data
+        self.current_module_id = module_id
+        self.current_case_id = case_id
+        self.driver = None
+        self.status_window = StatusWindowSink()
+
+    def get_current_case(self):
+        if self.current_module_id and self.current_case_id:
+            for module in self.data:
+                if str(module["id"]) == self.current_module_id:
+                    for case in module.get("caseVoList", []):
+                        if str(case["id"]) == self.current_case_id:
+                            return case
+        return None
+
+    def get_current_module_case(self):
+        if self.current_module_id and self.current_case_id:
+            for module in self.data:
+                if str(module["id"]) == self.current_module_id:
+                    for index, case in enumerate(module.get("caseVoList", []), start=1):
+                        if str(case["id"]) == self.current_case_id:
+                            return module["name"], index, len(module.get("caseVoList", []))
+        return "-", "-", "-"
+
+    def get_remaining_modules_cases(self):
+        remaining_modules = 0
+        remaining_cases = 0
+        for module in self.data:
+            module_has_remaining = False
+            for case in module.get("caseVoList", []):
+                if not case.get("isTested"):
+                    remaining_cases += 1
+                    module_has_remaining = True
+            if module_has_remaining:
+                remaining_modules += 1
+        return remaining_modules, remaining_cases
+
+    def get_current_steps(self):
+        if self.current_case_id:
+            for module in self.data:
+                for case in module.get('caseVoList', []):
+                    if str(case['id']) == self.current_case_id:
+                        return case.get('contentMap') or []
+        return []
+
+    def update_status_windows(self):
+        current_module, current_case, total_cases = self.get_current_module_case()
+        remaining_modules, remaining_cases = self.get_remaining_modules_cases()
+        current_case_info = self.get_current_case()
+        if current_case_info:
+            is_tested = current_case_info.get('isTested', False)
+            self.status_window.update_status("未测试", is_tested)
+            self.status_window.update_module_case(current_module, current_case, total_cases, is_tested)
+        self.status_window.update_remaining(remaining_modules, remaining_cases)
+        self.status_window.update_steps(self.get_current_steps())
+
+    def move(self, step):
+        for module in self.data:
+            if str(module["id"]) == self.current_module_id:
+                cases = module.get("caseVoList", [])
+                index = next((i for i, case in enumerate(cases) if str(case["id"]) == self.current_case_id), -1)
+                if 0 <= index + step < len(cases):
+                    self.current_case_id = str(cases[index + step]["id"])
+                    self.update_status_windows()
+        self.update_status_windows()
+
+    def next_case(self):
+        self.move(1)
+
+    def prev_case(self):
+        self.move(-1)
+
+
+def make_indexed_navigator(tool, data, module_id, case_id):
+    # 直接使用 App 中现有的方法，只替换掉写文件和界面部分
+    class IndexedNavigator:
+        get_current_case = tool.App.get_current_case
+        get_current_module_case = tool.App.get_current_module_case
+        get_remaining_modules_cases = tool.App.get_remaining_modules_cases
+        get_current_steps = tool.App.get_current_steps
+        update_status_windows = tool.App.update_status_windows
+        next_case = tool.App.next_case
+        prev_case = tool.App.prev_case
+
+        def save_current_test_case(self):
+            pass
+
+    navigator = IndexedNavigator()
+    navigator.data = data
+    navigator.case_index = tool.CaseIndex()
+    navigator.case_index.rebuild(data)
+    navigator.current_module_id = module_id
+    navigator.current_case_id = case_id
+    navigator.driver = None
+    navigator.status_window = StatusWindowSink()
+    return navigator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大计划上的用例导航开销")
+    parser.add_argument("--modules", type=int, default=500)
+    parser.add_argument("--cases-per-module", type=int, default=100)
+    parser.add_argument("--presses", type=int, default=200, help="旧实现按键次数")
+    args = parser.parse_args()
+
+    bench_utils.use_temp_home()
+    tool = bench_utils.load_app_module()
+    data = bench_utils.make_plan(args.modules, args.cases_per_module)
+    # 当前用例在最后一个模块中间，旧实现需要遍历几乎整个计划
+    last_module = data[-1]
+    module_id = str(last_module["id"])
+    case_id = str(last_module["caseVoList"][len(last_module["caseVoList"]) // 2]["id"])
+
+    def press_keys(navigator):
+        navigator.next_case()
+        navigator.prev_case()
+
+    legacy = LegacyNavigator(data, module_id, case_id)
+    legacy_press = bench_utils.time_calls(lambda: press_keys(legacy), args.presses) / 2
+
+    build = bench_utils.time_repeated(lambda: tool.CaseIndex().rebuild(data), 5)
+    indexed = make_indexed_navigator(tool, data, module_id, case_id)
+    indexed_press = bench_utils.time_calls(lambda: press_keys(indexed), args.presses * 100) / 2
+
+    def toggle():
+        indexed.case_index.set_tested(module_id, case_id, True)
+        indexed.case_index.set_tested(module_id, case_id, False)
+
+    toggle_cost = bench_utils.time_calls(toggle, args.presses * 100) / 2
+
+    print(f"计划: {args.modules} 个模块, {args.modules * args.cases_per_module} 个用例")
+    print(f"构建索引: {bench_utils.format_duration(build)}")
+    print(f"每次按键（线性遍历）: {bench_utils.format_duration(legacy_press)}")
+    print(f"每次按键（索引）:     {bench_utils.format_duration(indexed_press)} ({legacy_press / indexed_press:.0f} 倍)")
+    print(f"切换测试状态并更新剩余数量: {bench_utils.format_duration(toggle_cost)}")
+
+
+if __name__ == "__main__":
+    main()
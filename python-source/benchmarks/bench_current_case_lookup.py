@@ -0,0 +1,48 @@
+import argparse
+import json
+
+import bench_utils
+
+# 每个响应查找当前用例的开销：改动前每次打开并解析 current_test_case.json，
+# 现在文件未变化时只做一次 stat，GUI 通过本地通道连接时直接读内存
+# 用法（需要 mitmproxy）：python benchmarks/bench_current_case_lookup.py --flows 100000
+
+
+def legacy_get_current_test_case(current_test_case_path):
+    # 改动前的 get_current_test_case
+    try:
+        with open(current_test_case_path, "r") as file:
+            current_test_case = json.load(file)
+            return current_test_case["module_id"], current_test_case["case_id"]
+    except Exception:
+        return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="当前用例查找的单次开销")
+    parser.add_argument("--flows", type=int, default=100000)
+    args = parser.parse_args()
+
+    bench_utils.use_temp_home()
+    addon = bench_utils.load_addon_module()
+
+    current_test_case_path = bench_utils.get_user_data_path("current_test_case.json")
+    with open(current_test_case_path, "w") as file:
+        json.dump({"module_id": "12", "case_id": "1200034", "storage": "json"}, file)
+
+    legacy = bench_utils.time_calls(lambda: legacy_get_current_test_case(current_test_case_path), args.flows)
+    cached = bench_utils.time_calls(addon.get_current_test_case, args.flows)
+
+    # GUI 已连接时使用通道中收到的用例
+    addon.gui_channel.case = ("12", "1200034", "json")
+    addon.gui_channel.connected.set()
+    channel = bench_utils.time_calls(lambda: addon.gui_channel.current_case() or addon.get_current_test_case(),
+                                     args.flows)
+
+    print(f"每次读取并解析文件: {bench_utils.format_duration(legacy)}")
+    print(f"按 stat 判断后使用缓存: {bench_utils.format_duration(cached)} ({legacy / cached:.1f} 倍)")
+    print(f"本地通道中的当前用例: {bench_utils.format_duration(channel)} ({legacy / channel:.0f} 倍)")
+
+
+if __name__ == "__main__":
+    main()
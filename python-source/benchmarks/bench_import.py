@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import bench_utils
+
+# 导入大计划文件的峰值内存和耗时：改动前 json.load 整个文件后按 indent=4 重写 import.json，
+# 现在 PlanImporter 逐个模块解析并写入存储。两种方式分别在子进程中运行，峰值内存互不影响
+# 用法（需要 PyQt5）：python benchmarks/bench_import.py --size-mb 500
+
+
+def generate_plan(path, size_mb, cases_per_module=100):
+    # 按模块流式写出合成计划，直到文件达到指定大小；每个用例带若干条抓包记录
+    target = size_mb * 1024 * 1024
+    http_result = json.dumps([bench_utils.sample_capture(index) for index in range(5)], ensure_ascii=False)
+    module_id = 0
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[")
+        while file.tell() < target:
+            module_id += 1
+            module = bench_utils.make_plan(1, cases_per_module)[0]
+            module["id"] = module_id
+            module["name"] = f"模块 {module_id}"
+            for case_pos, case in enumerate(module["caseVoList"], start=1):
+                case["id"] = module_id * 100000 + case_pos
+                case["httpResult"] = http_result
+            file.write(",\n" if module_id > 1 else "\n")
+            json.dump(module, file, ensure_ascii=False, indent=4)
+        file.write("\n]")
+    return module_id
+
+
+def legacy_import(plan_path):
+    # 改动前的 import_data 和 save_data
+    with open(plan_path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    for module in data:
+        for case in module.get("caseVoList", []):
+            case["completion"] = 1 if case.get("isTested", False) else 0
+    with open(bench_utils.get_user_data_path("import.json"), "w") as file:
+        json.dump(data, file, indent=4)
+    return len(data)
+
+
+def streaming_import(tool, plan_path, storage):
+    if storage == "sqlite":
+        store = tool.SqlitePlanStore(bench_utils.get_user_data_path("plan.db"))
+    else:
+        store = tool.JsonPlanStore(bench_utils.get_user_data_path("import.json"))
+    importer = tool.PlanImporter(None)
+    results = []
+    importer.finished.connect(lambda modules: results.append(len(modules)))
+    importer.failed.connect(lambda message: results.append(message))
+    # 直接在当前线程运行，信号同步送达
+    importer.run(store, plan_path)
+    if not isinstance(results[0], int):
+        raise RuntimeError(results[0])
+    return results[0]
+
+
+def peak_rss_mb():
+    # Linux 上 ru_maxrss 的单位是 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(args):
+    os.environ["HOME"] = args.home
+    if args.run == "new":
+        tool = bench_utils.load_app_module()
+        import_plan = lambda: streaming_import(tool, args.plan, args.storage)
+    else:
+        import_plan = lambda: legacy_import(args.plan)
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    module_count = import_plan()
+    print(json.dumps({
+        "seconds": time.perf_counter() - started,
+        "baseline_mb": baseline,
+        "peak_mb": peak_rss_mb(),
+        "modules": module_count
+    }))
+
+
+def measure(args, mode):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", mode, "--plan", args.plan,
+                             "--home", args.home, "--storage", args.storage],
+                            check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入大计划文件的峰值内存和耗时")
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--plan", help="使用已有的计划文件，不再生成")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--skip-old", action="store_true", help="不运行改动前的导入方式")
+    parser.add_argument("--run", choices=("old", "new"), help=argparse.SUPPRESS)
+    parser.add_argument("--home", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_child(args)
+        return
+
+    args.home = bench_utils.use_temp_home()
+    if not args.plan:
+        args.plan = os.path.join(args.home, "plan.json")
+        module_count = generate_plan(args.plan, args.size_mb)
+        print(f"已生成计划: {module_count} 个模块")
+    print(f"计划文件: {os.path.getsize(args.plan) / 1024 / 1024:.0f} MB, 存储: {args.storage}")
+
+    modes = [("new", "流式导入")] if args.skip_old else [("old", "改动前"), ("new", "流式导入")]
+    for mode, label in modes:
+        result = measure(args, mode)
+        print(f"{label}: 耗时 {bench_utils.format_duration(result['seconds'])}, "
+              f"峰值内存 {result['peak_mb']:.0f} MB (导入前 {result['baseline_mb']:.0f} MB), "
+              f"{result['modules']} 个模块")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import re
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import bench_utils
+
+# 启动到第一个窗口绘制完成的时间：在 offscreen 平台上启动程序，等待 app.log 中出现“启动耗时”
+# 外部计时从创建进程开始，包括解释器启动和模块导入；日志中的数值从 __main__ 开始计时
+# 用法（需要 PyQt5，PATH 中需要有 mitmdump）：python benchmarks/bench_startup.py --runs 5
+
+STARTUP_LINE = re.compile(r"启动耗时: (\d+) ms")
+
+
+def read_reported_startup(log_path):
+    try:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as file:
+            match = STARTUP_LINE.search(file.read())
+    except FileNotFoundError:
+        return None
+    return int(match.group(1)) / 1000 if match else None
+
+
+def measure_once(timeout):
+    log_path = bench_utils.get_user_data_path("logs", "app.log")
+    if os.path.exists(log_path):
+        os.remove(log_path)
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    if not env.get("DISPLAY"):
+        env.setdefault("PYNPUT_BACKEND", "dummy")
+
+    started = time.perf_counter()
+    # 单独的进程组，结束时连同程序启动的 mitmdump 一起结束
+    process = subprocess.Popen([sys.executable, "tool-all-bak.py"], cwd=bench_utils.SOURCE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        while time.perf_counter() - started < timeout:
+            reported = read_reported_startup(log_path)
+            if reported is not None:
+                return time.perf_counter() - started, reported
+            if process.poll() is not None:
+                raise RuntimeError(f"程序在显示窗口前退出，返回码 {process.returncode}，请查看 {log_path}")
+            time.sleep(0.01)
+        raise TimeoutError(f"{timeout} 秒内没有显示窗口")
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动到第一个窗口的时间")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modules", type=int, default=50, help="启动时加载的计划模块数，0 表示没有计划")
+    parser.add_argument("--cases-per-module", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    if shutil.which("mitmdump") is None:
+        sys.exit("PATH 中没有 mitmdump，程序启动时会启动代理")
+
+    bench_utils.use_temp_home()
+    if args.modules:
+        bench_utils.write_plan(bench_utils.get_user_data_path("import.json"),
+                               bench_utils.make_plan(args.modules, args.cases_per_module))
+
+    # 第一次运行生成 __pycache__ 和字体缓存，不计入结果
+    measure_once(args.timeout)
+    results = [measure_once(args.timeout) for _ in range(args.runs)]
+    wall = statistics.median(result[0] for result in results)
+    reported = statistics.median(result[1] for result in results)
+    print(f"计划: {args.modules * args.cases_per_module} 个用例, 运行 {args.runs} 次取中位数")
+    print(f"创建进程到第一个窗口: {bench_utils.format_duration(wall)}")
+    print(f"程序记录的启动耗时:   {bench_utils.format_duration(reported)}（不含解释器启动和模块导入）")
+
+
+if __name__ == "__main__":
+    main()
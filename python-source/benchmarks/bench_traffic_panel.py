@@ -0,0 +1,113 @@
+import argparse
+import json
+import sys
+
+import bench_utils
+
+# 打开有 2 万条抓包记录的用例时详情面板的耗时：改动前表格 setSortingEnabled(True) 后由
+# QSortFilterProxyModel 逐对调用 data() 排序，现在打开时不排序，点击表头时在源模型中按预先算好的键排序
+# 用法（需要 PyQt5）：python benchmarks/bench_traffic_panel.py --entries 20000
+
+
+def make_entries(count):
+    return [dict(bench_utils.sample_capture(index), status=200 + index % 4 * 100, duration=index * 7919 % 3000)
+            for index in range(count)]
+
+
+def make_legacy_models(tool):
+    # 改动前的模型：代理按 Qt.UserRole 取排序值，排序和过滤都在代理中进行
+    from PyQt5.QtCore import QSortFilterProxyModel, Qt
+
+    class LegacyTrafficTableModel(tool.TrafficTableModel):
+        def data(self, index, role=Qt.DisplayRole):
+            if role == Qt.UserRole and index.isValid():
+                return self.sort_value(self.entries[index.row()], index.column())
+            return super().data(index, role)
+
+    class LegacyTrafficFilterProxyModel(tool.TrafficFilterProxyModel):
+        def __init__(self, parent=None):
+            super().__init__(parent)
+            self.setSortRole(Qt.UserRole)
+
+        def sort(self, column, order=Qt.AscendingOrder):
+            QSortFilterProxyModel.sort(self, column, order)
+
+    return LegacyTrafficTableModel, LegacyTrafficFilterProxyModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大量抓包记录时打开用例和排序的耗时")
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bench_utils.use_temp_home()
+    tool = bench_utils.load_app_module()
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtWidgets import QApplication, QTableView
+    qapp = QApplication.instance() or QApplication(sys.argv[:1])
+    # 不启动 mitmdump 和全局快捷键监听
+    tool.ProxyManager.start = lambda self, *args, **kwargs: None
+    tool.App.setup_global_hotkey_listener = lambda self: None
+
+    plan = bench_utils.make_plan(1, 2)
+    http_result = json.dumps(make_entries(args.entries), ensure_ascii=False)
+    for case in plan[0]["caseVoList"]:
+        case["httpResult"] = http_result
+    bench_utils.write_plan(bench_utils.get_user_data_path("import.json"), plan)
+    app = tool.App()
+    app.show()
+    qapp.processEvents()
+    first, second = app.data[0]["caseVoList"]
+
+    def open_case(case):
+        app.display_case_info(case)
+        qapp.processEvents()
+
+    def switch_cases():
+        open_case(first)
+        open_case(second)
+
+    def click_header():
+        table = next(view for view in app.right_widget.widget().findChildren(QTableView)
+                     if view.model() is app.traffic_proxy)
+        table.horizontalHeader().setSortIndicator(3, Qt.DescendingOrder)
+        table.horizontalHeader().setSortIndicator(3, Qt.AscendingOrder)
+
+    switch = bench_utils.time_repeated(switch_cases, args.repeat) / 2
+    reopen = bench_utils.time_repeated(lambda: open_case(second), args.repeat)
+    sort = bench_utils.time_repeated(click_header, args.repeat) / 2
+    entries = app.traffic_model.entries
+    app.close()
+
+    legacy_model_class, legacy_proxy_class = make_legacy_models(tool)
+    legacy_model = legacy_model_class()
+    legacy_proxy = legacy_proxy_class()
+    legacy_proxy.setSourceModel(legacy_model)
+
+    def legacy_open():
+        legacy_model.set_entries(None, tool.parse_json_list(http_result))
+        table = QTableView()
+        table.setModel(legacy_proxy)
+        table.setSortingEnabled(True)
+        qapp.processEvents()
+
+    legacy_table = QTableView()
+    legacy_table.setModel(legacy_proxy)
+    legacy_table.setSortingEnabled(True)
+    legacy = bench_utils.time_repeated(legacy_open, args.repeat)
+    legacy_model.set_entries(None, entries)
+    legacy_sort = bench_utils.time_repeated(
+        lambda: (legacy_table.sortByColumn(3, Qt.DescendingOrder), legacy_table.sortByColumn(3, Qt.AscendingOrder)),
+        args.repeat) / 2
+
+    print(f"抓包记录: {args.entries} 条")
+    print(f"打开用例（改动前，代理模型排序）: {bench_utils.format_duration(legacy)}")
+    print(f"切换到另一个用例:                 {bench_utils.format_duration(switch)}")
+    print(f"重新打开同一用例:                 {bench_utils.format_duration(reopen)}")
+    print(f"点击表头排序（改动前）:           {bench_utils.format_duration(legacy_sort)}")
+    print(f"点击表头排序（源模型）:           {bench_utils.format_duration(sort)}")
+
+
+if __name__ == "__main__":
+    main()
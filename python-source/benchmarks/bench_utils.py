@@ -0,0 +1,108 @@
+import importlib.util
+import json
+import os
+import statistics
+import tempfile
+import time
+
+# 基准测试公用函数：数据文件写入临时目录，按文件路径加载界面模块和代理脚本
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_temp_home():
+    # 用临时目录代替用户主目录，不影响真实的 ~/.auto-test-recorder
+    home = tempfile.mkdtemp(prefix="auto-test-recorder-bench-")
+    os.environ["HOME"] = home
+    os.makedirs(get_user_data_path(), exist_ok=True)
+    return home
+
+
+def get_user_data_path(*parts):
+    return os.path.join(os.path.expanduser("~"), ".auto-test-recorder", *parts)
+
+
+def load_module(name, file_name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SOURCE_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_app_module():
+    # 界面模块导入时即导入 PyQt5 和 pynput；没有显示器时使用 offscreen 平台和 pynput 的空后端
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if not os.environ.get("DISPLAY"):
+        os.environ.setdefault("PYNPUT_BACKEND", "dummy")
+    return load_module("tool_all_bak", "tool-all-bak.py")
+
+
+def load_addon_module():
+    # 代理脚本依赖 mitmproxy
+    return load_module("mitmproxy_script", "mitmproxy_script.py")
+
+
+def make_plan(module_count, cases_per_module, steps_per_case=3):
+    # 与导出文件结构相同的合成计划
+    plan = []
+    for module_id in range(1, module_count + 1):
+        cases = []
+        for case_id in range(1, cases_per_module + 1):
+            cases.append({
+                "id": module_id * 100000 + case_id,
+                "caseName": f"用例 {module_id}-{case_id}",
+                "contentMap": [{"describe": f"步骤 {step}", "expect": f"预期结果 {step}"}
+                               for step in range(1, steps_per_case + 1)],
+                "httpResult": None,
+                "imageResult": None,
+                "isTested": False,
+                "completion": 0
+            })
+        plan.append({"id": module_id, "name": f"模块 {module_id}", "caseVoList": cases})
+    return plan
+
+
+def write_plan(path, plan):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(plan, file, ensure_ascii=False, indent=4)
+
+
+def sample_capture(index=0):
+    # 一条典型的 JSON 接口抓包记录
+    return {
+        "url": f"https://example.test/api/orders/{index}?page=1",
+        "header": ["Accept:application/json", "User-Agent:Mozilla/5.0"],
+        "method": "GET",
+        "data": {"page": "1"},
+        "result": json.dumps({"code": 0, "data": [{"id": i, "name": f"订单 {i}"} for i in range(20)]},
+                             ensure_ascii=False)[:1000],
+        "status": 200,
+        "isSuccess": True,
+        "time": "2024-01-01 10:00",
+        "duration": 35
+    }
+
+
+def time_calls(func, count):
+    # 返回每次调用的平均耗时（秒）
+    started = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - started) / count
+
+
+def time_repeated(func, repeat):
+    # 多次运行取中位数，适合单次耗时较长的操作
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def format_duration(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} µs"
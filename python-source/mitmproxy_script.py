@@ -1,7 +1,17 @@
 import os
+import re
 import json
-from mitmproxy import http
-from datetime import datetime
+import time
+import codecs
+import fnmatch
+import hashlib
+from urllib.parse import urlsplit, parse_qsl
+import queue
+import socket
+import sqlite3
+import threading
+from mitmproxy import ctx, http
+from datetime import datetime, timezone
 import logging
 
 # 设置日志级别
@@ -23,76 +33,761 @@ def log_to_file(message, level=logging.INFO):
     if level >= LOG_LEVEL:
         logging.log(level, message)
 
+# 当前用例缓存：GUI 只在切换用例时改写 current_test_case.json，
+# 因此按 inode/mtime/size 判断文件是否变化，未变化时不再重新解析
+_current_test_case_cache = {"stat_key": None, "value": (None, None, None)}
+
+
 def get_current_test_case():
+    current_test_case_path = get_user_data_path("current_test_case.json")
+    try:
+        stat = os.stat(current_test_case_path)
+    except OSError as e:
+        _current_test_case_cache["stat_key"] = None
+        log_to_file(f"Error reading current test case: {str(e)}")
+        return None, None, None
+
+    stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if stat_key == _current_test_case_cache["stat_key"]:
+        return _current_test_case_cache["value"]
+
     try:
-        current_test_case_path = get_user_data_path("current_test_case.json")
         with open(current_test_case_path, "r") as file:
             current_test_case = json.load(file)
-            return current_test_case["module_id"], current_test_case["case_id"]
+            value = (current_test_case["module_id"], current_test_case["case_id"],
+                     current_test_case.get("storage", "json"))
     except Exception as e:
         log_to_file(f"Error reading current test case: {str(e)}")
-        return None, None
+        return None, None, None
 
+    _current_test_case_cache["stat_key"] = stat_key
+    _current_test_case_cache["value"] = value
+    return value
 
-def response(flow: http.HTTPFlow) -> None:
+
+CAPTURED_CONTENT_TYPES = ["application/json", "text/html", "text/plain", "application/xml"]
+
+# 请求体中这些类型只记录大小，不保存内容
+BINARY_CONTENT_TYPES = ["multipart/form-data", "application/octet-stream", "image/", "audio/", "video/",
+                        "application/zip", "application/pdf"]
+
+
+def load(loader):
+    # 抓包大小限制，GUI 启动 mitmdump 时通过 --set 传入
+    loader.add_option("capture_request_limit", int, 65536, "请求体最多保存的字节数")
+    loader.add_option("capture_response_limit", int, 1000, "响应体最多保存的字节数")
+    loader.add_option("capture_max_body_size", int, 10 * 1024 * 1024,
+                      "Content-Length 超过该值的请求体或响应体不保存内容")
+    loader.add_option("capture_compressed", bool, False, "是否解压并保存压缩过的响应体")
+    loader.add_option("capture_aggregate", bool, False, "是否将重复的轮询请求合并为聚合记录")
+
+
+class CaptureRule:
+    # 一条过滤规则，各条件同时满足才算匹配，未配置的条件不做限制
+    # host/path 支持通配符（不区分大小写，匹配整个值），path_regex 为正则（在路径中搜索，不含查询串），
+    # 与 path 同时配置时两者都要满足；status 支持 404 或 "5xx"
+    def __init__(self, config):
+        self.host = self.compile_globs(config.get("host"))
+        self.path = self.compile_globs(config.get("path"))
+        self.path_regex = re.compile(config["path_regex"]) if config.get("path_regex") else None
+        methods = self.as_list(config.get("method"))
+        self.methods = {method.upper() for method in methods} if methods else None
+        self.statuses = self.compile_statuses(self.as_list(config.get("status")))
+        content_types = self.as_list(config.get("content_type"))
+        self.content_type = re.compile("|".join(re.escape(ct) for ct in content_types), re.IGNORECASE) \
+            if content_types else None
+
+    @staticmethod
+    def as_list(value):
+        if value is None:
+            return []
+        return value if isinstance(value, list) else [value]
+
+    def compile_globs(self, patterns):
+        patterns = self.as_list(patterns)
+        if not patterns:
+            return None
+        return re.compile("|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns), re.IGNORECASE)
+
+    @staticmethod
+    def compile_statuses(statuses):
+        if not statuses:
+            return None
+        exact, classes = set(), set()
+        for status in statuses:
+            status = str(status).lower()
+            if status.endswith("xx"):
+                classes.add(int(status[0]))
+            else:
+                exact.add(int(status))
+        return exact, classes
+
+    def matches(self, flow):
+        request = flow.request
+        if self.methods is not None and request.method.upper() not in self.methods:
+            return False
+        if self.host is not None and not self.host.match(request.pretty_host):
+            return False
+        if self.path is not None or self.path_regex is not None:
+            path = request.path.split("?", 1)[0]
+            if self.path is not None and not self.path.match(path):
+                return False
+            if self.path_regex is not None and not self.path_regex.search(path):
+                return False
+        if self.statuses is not None:
+            if flow.response is None:
+                return False
+            exact, classes = self.statuses
+            status = flow.response.status_code
+            if status not in exact and status // 100 not in classes:
+                return False
+        if self.content_type is not None:
+            if flow.response is None or not self.content_type.search(flow.response.headers.get("Content-Type", "")):
+                return False
+        return True
+
+
+class CaptureRules:
+    # ~/.auto-test-recorder/capture_rules.json：
+    # {"include": [规则...], "exclude": [规则...]}，匹配任一 include 且不匹配任何 exclude 的请求才记录
+    # 规则在加载时编译，文件变化后自动重新加载（最多每秒检查一次）
+    check_interval = 1.0
+
+    def __init__(self, path):
+        self.path = path
+        self.stat_key = None
+        self.checked_at = 0.0
+        self.include = [CaptureRule({"content_type": CAPTURED_CONTENT_TYPES})]
+        self.exclude = []
+
+    def reload_if_changed(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return
+        self.checked_at = now
+
+        try:
+            stat = os.stat(self.path)
+            stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat_key = None
+        if stat_key == self.stat_key:
+            return
+        self.stat_key = stat_key
+
+        if stat_key is None:
+            # 规则文件被删除，恢复默认规则
+            self.include = [CaptureRule({"content_type": CAPTURED_CONTENT_TYPES})]
+            self.exclude = []
+            return
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                config = json.load(file)
+            include = [CaptureRule(rule) for rule in config.get("include", [])]
+            exclude = [CaptureRule(rule) for rule in config.get("exclude", [])]
+        except Exception as e:
+            # 规则有误时继续使用上一次的规则
+            log_to_file(f"Error loading capture rules: {str(e)}", logging.ERROR)
+            return
+
+        self.include = include or [CaptureRule({"content_type": CAPTURED_CONTENT_TYPES})]
+        self.exclude = exclude
+        log_to_file(f"Loaded capture rules: {len(include)} include, {len(exclude)} exclude")
+
+    def matches(self, flow):
+        self.reload_if_changed()
+        return (any(rule.matches(flow) for rule in self.include)
+                and not any(rule.matches(flow) for rule in self.exclude))
+
+
+capture_rules = CaptureRules(get_user_data_path("capture_rules.json"))
+
+
+def should_capture(flow):
+    # 在 responseheaders 中判断一次，结果保存在 flow.metadata 中，response 直接使用
+    if "capture" not in flow.metadata:
+        flow.metadata["capture"] = capture_rules.matches(flow)
+    return flow.metadata["capture"]
+
+
+def get_content_length(headers):
     try:
-        content_type = flow.response.headers.get("Content-Type", "")
+        return int(headers.get("Content-Length", ""))
+    except ValueError:
+        return None
+
+
+def decode_prefix(raw, content_type, limit):
+    # 先按字节截断再解码，截断处不完整的多字节字符由增量解码器丢弃
+    charset = "utf-8"
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "charset" and value:
+            charset = value.strip('"\'')
+    try:
+        decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    return decoder.decode(raw[:limit])
+
+
+def keep_prefix(flow, limit, key="capture"):
+    # 流式转发消息体，只保留前 limit 个字节并统计总大小，内存占用与消息体大小无关
+    # 响应体保存在 capture_prefix/capture_size，请求体保存在 capture_request_prefix/capture_request_size
+    prefix = bytearray()
+    flow.metadata[f"{key}_prefix"] = prefix
+    flow.metadata[f"{key}_size"] = 0
+
+    def collect(chunk):
+        if len(prefix) < limit:
+            prefix.extend(chunk[:limit - len(prefix)])
+        flow.metadata[f"{key}_size"] += len(chunk)
+        return chunk
+
+    return collect
+
+
+def requestheaders(flow: http.HTTPFlow) -> None:
+    # 只有请求头时决定是否缓存请求体，此时还没有响应，不能判断是否记录，只决定保存多少内容
+    # 二进制、过大或不解压的请求体只统计大小，超过保存上限的请求体只保留前缀，均流式转发
+    try:
+        headers = flow.request.headers
+        content_length = get_content_length(headers)
+        if not content_length and "Transfer-Encoding" not in headers:
+            return
+
+        content_type = headers.get("Content-Type", "")
+        compressed = headers.get("Content-Encoding", "identity").lower() != "identity"
+        if (any(ct in content_type for ct in BINARY_CONTENT_TYPES)
+                or (content_length or 0) > ctx.options.capture_max_body_size
+                or (compressed and not ctx.options.capture_compressed)):
+            flow.request.stream = keep_prefix(flow, 0, "capture_request")
+        elif compressed:
+            # 允许保存压缩请求体时需要完整请求体才能解压，保持缓存
+            return
+        elif content_length is None or content_length > ctx.options.capture_request_limit:
+            # 分块上传长度未知，同样只保留前缀
+            flow.request.stream = keep_prefix(flow, ctx.options.capture_request_limit, "capture_request")
+    except Exception as e:
+        log_to_file(f"Error in requestheaders function: {str(e)}")
+
+
+def responseheaders(flow: http.HTTPFlow) -> None:
+    # 只有响应头时决定是否需要缓存响应体，不需要保存内容的响应直接流式转发
+    try:
+        headers = flow.response.headers
+        if not should_capture(flow):
+            flow.response.stream = True
+            return
+
+        content_length = get_content_length(headers)
+        if content_length is not None and content_length > ctx.options.capture_max_body_size:
+            flow.metadata["capture_skip_reason"] = f"<响应体过大: {content_length} 字节>"
+            flow.response.stream = keep_prefix(flow, 0)
+        elif headers.get("Content-Encoding", "identity").lower() != "identity":
+            if not ctx.options.capture_compressed:
+                flow.metadata["capture_skip_reason"] = f"<压缩的响应体: {headers.get('Content-Encoding')}>"
+                flow.response.stream = keep_prefix(flow, 0)
+            # 允许保存压缩响应时需要完整响应体才能解压，保持缓存
+        else:
+            flow.response.stream = keep_prefix(flow, ctx.options.capture_response_limit)
+    except Exception as e:
+        log_to_file(f"Error in responseheaders function: {str(e)}")
+
+
+def get_request_data(flow):
+    request = flow.request
+    if request.query:
+        return dict(request.query)
+
+    size = get_request_size(flow)
+    if not size:
+        return ""
+    content_type = request.headers.get("Content-Type", "")
+    if any(ct in content_type for ct in BINARY_CONTENT_TYPES):
+        return f"<{content_type}: {size} 字节>"
+    if size > ctx.options.capture_max_body_size:
+        return f"<请求体过大: {size} 字节>"
+    # 流式转发的请求体只保留了前缀
+    prefix = flow.metadata.get("capture_request_prefix")
+    if request.headers.get("Content-Encoding", "identity").lower() != "identity":
+        if not ctx.options.capture_compressed or prefix is not None:
+            return f"<压缩的请求体: {request.headers.get('Content-Encoding')}>"
+        raw = request.get_content(strict=False) or b""
+    else:
+        raw = bytes(prefix) if prefix is not None else request.raw_content or b""
+    return decode_prefix(raw, content_type, ctx.options.capture_request_limit)
+
+
+def get_request_size(flow):
+    if "capture_request_size" in flow.metadata:
+        return flow.metadata["capture_request_size"]
+    return len(flow.request.raw_content or b"")
+
+
+def get_response_result(flow):
+    skip_reason = flow.metadata.get("capture_skip_reason")
+    if skip_reason:
+        return skip_reason
+
+    content_type = flow.response.headers.get("Content-Type", "")
+    prefix = flow.metadata.get("capture_prefix")
+    if prefix is not None:
+        raw = bytes(prefix)
+    elif flow.response.headers.get("Content-Encoding", "identity").lower() != "identity":
+        raw = flow.response.get_content(strict=False) or b""
+    else:
+        raw = flow.response.raw_content or b""
+    return decode_prefix(raw, content_type, ctx.options.capture_response_limit)
+
+
+def get_response_size(flow):
+    if "capture_size" in flow.metadata:
+        return flow.metadata["capture_size"]
+    return len(flow.response.raw_content or b"")
+
+
+# 已经计算过连接耗时的服务器连接，同一连接上的后续请求 connect/ssl 记为 -1
+_har_seen_connections = set()
+
+
+def get_har_timings(flow):
+    # 按 HAR 1.2 的阶段划分计算耗时（毫秒），无法得到的阶段为 -1
+    request, response = flow.request, flow.response
+    connect, ssl = -1, -1
+    server_conn = flow.server_conn
+    if server_conn is not None and server_conn.id not in _har_seen_connections:
+        if len(_har_seen_connections) > 10000:
+            _har_seen_connections.clear()
+        _har_seen_connections.add(server_conn.id)
+        if server_conn.timestamp_start and server_conn.timestamp_tcp_setup:
+            connect = server_conn.timestamp_tcp_setup - server_conn.timestamp_start
+            if server_conn.timestamp_tls_setup:
+                ssl = server_conn.timestamp_tls_setup - server_conn.timestamp_tcp_setup
 
-        if any(ct in content_type for ct in ["application/json", "text/html", "text/plain", "application/xml"]):
+    def phase(start, end):
+        return end - start if start and end else -1
+
+    timings = {
+        "blocked": -1,
+        "dns": -1,
+        "connect": connect,
+        "ssl": ssl,
+        "send": phase(request.timestamp_start, request.timestamp_end),
+        "wait": phase(request.timestamp_end, response.timestamp_start),
+        "receive": phase(response.timestamp_start, response.timestamp_end)
+    }
+    return {name: round(value * 1000, 3) if value != -1 else -1 for name, value in timings.items()}
+
+
+def build_har_entry(flow, error, timings):
+    request, response = flow.request, flow.response
+    har_request = {
+        "method": request.method,
+        "url": request.pretty_url,
+        "httpVersion": request.http_version,
+        "cookies": [],
+        "headers": [{"name": name, "value": value} for name, value in request.headers.items()],
+        "queryString": [{"name": name, "value": value} for name, value in request.query.items(multi=True)],
+        "headersSize": -1,
+        "bodySize": get_request_size(flow)
+    }
+    if har_request["bodySize"] and isinstance(error["data"], str):
+        har_request["postData"] = {"mimeType": request.headers.get("Content-Type", ""), "text": error["data"]}
+
+    response_size = get_response_size(flow)
+    return {
+        "startedDateTime": datetime.fromtimestamp(request.timestamp_start, timezone.utc).isoformat(),
+        "time": sum(value for value in timings.values() if value != -1),
+        "request": har_request,
+        "response": {
+            "status": response.status_code,
+            "statusText": response.reason,
+            "httpVersion": response.http_version,
+            "cookies": [],
+            "headers": [{"name": name, "value": value} for name, value in response.headers.items()],
+            "content": {
+                "size": response_size,
+                "mimeType": response.headers.get("Content-Type", ""),
+                # 只保存截断后的内容，完整大小见 size
+                "text": error["result"]
+            },
+            "redirectURL": response.headers.get("Location", ""),
+            "headersSize": -1,
+            "bodySize": response_size
+        },
+        "cache": {},
+        "timings": timings,
+        "serverIPAddress": str(flow.server_conn.peername[0]) if flow.server_conn and flow.server_conn.peername else ""
+    }
+
+
+def response(flow: http.HTTPFlow) -> None:
+    try:
+        if should_capture(flow):
+            timings = get_har_timings(flow)
             error = {
                 "url": flow.request.pretty_url,
                 "header": [f"{name}:{value}" for name, value in flow.request.headers.items()],
                 "method": flow.request.method,
-                "data": flow.request.query or flow.request.text,
-                "result": flow.response.text[:1000],
+                "data": get_request_data(flow),
+                "result": get_response_result(flow),
                 "status": flow.response.status_code,
                 "isSuccess": flow.response.status_code == 200,
-                "time": datetime.now().strftime("%Y-%m-%d %H:%M")
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                "duration": round((flow.response.timestamp_end - flow.request.timestamp_start) * 1000)
             }
-            update_error_json_with_error_data(error)
+            update_error_json_with_error_data(error, build_har_entry(flow, error, timings))
     except Exception as e:
         log_to_file(f"Error in response function: {str(e)}")
 
 
-def update_error_json_with_error_data(error):
-    try:
-        import_file_path = get_user_data_path("import.json")
+def get_http_journal_path(module_id, case_id):
+    # 每个用例一个追加写入的 JSONL 抓包日志，由 GUI 在保存或导出时合并进 httpResult
+    return get_user_data_path(os.path.join("http_journal", str(module_id), f"{case_id}.jsonl"))
+
+
+def get_har_journal_path(module_id, case_id):
+    # 每个用例的 HAR 条目，一行一条，导出时由 GUI 拼成 HAR 文件
+    return get_user_data_path(os.path.join("har", str(module_id), f"{case_id}.jsonl"))
 
-        if not os.path.exists(import_file_path):
-            log_to_file(f"import.json file does not exist at {import_file_path}", logging.ERROR)
-            return
 
-        with open(import_file_path, "r") as file:
-            data = json.load(file)
+def append_json_line(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 单次 write 追加一整行，不再读取和重写整个文件
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(json.dumps(entry, ensure_ascii=False) + "\n")
 
-        current_module_id, current_case_id = get_current_test_case()
 
-        if current_module_id and current_case_id:
-            for module in data:
-                if str(module["id"]) == current_module_id:
-                    for case in module.get("caseVoList", []):
-                        if str(case["id"]) == current_case_id:
-                            existing_errors = case.get("httpResult", [])
-                            if isinstance(existing_errors, str):
-                                try:
-                                    existing_errors = json.loads(existing_errors)
-                                except json.JSONDecodeError:
-                                    existing_errors = []
+_sqlite_connection = None
 
-                            if not isinstance(existing_errors, list):
-                                existing_errors = [existing_errors] if existing_errors else []
 
-                            existing_errors.append(error)
-                            case["httpResult"] = json.dumps(existing_errors, ensure_ascii=False)
+def get_sqlite_connection():
+    # GUI 启用 SQLite 存储时，抓包记录直接单行插入 plan.db（WAL 模式，不阻塞 GUI 读取）
+    global _sqlite_connection
+    if _sqlite_connection is None:
+        _sqlite_connection = sqlite3.connect(get_user_data_path("plan.db"), timeout=10, check_same_thread=False)
+    return _sqlite_connection
 
-                            with open(import_file_path, "w") as file:
-                                json.dump(data, file, ensure_ascii=False, indent=4)
 
-                            log_to_file(f"Successfully updated httpResult for case {current_case_id}")
-                            return
+_write_lock = threading.Lock()
 
-            log_to_file(f"Could not find case {current_case_id} in module {current_module_id}")
+
+def write_capture(module_id, case_id, storage, entry):
+    # GUI 未连接时的后备方式：写入抓包日志或 SQLite，由 GUI 之后合并
+    with _write_lock:
+        if storage == "sqlite":
+            connection = get_sqlite_connection()
+            with connection:
+                connection.execute("INSERT INTO http_captures (module_id, case_id, entry) VALUES (?, ?, ?)",
+                                   (module_id, case_id, json.dumps(entry, ensure_ascii=False)))
+            log_to_file(f"Successfully inserted httpResult for case {case_id}")
         else:
+            append_json_line(get_http_journal_path(module_id, case_id), entry)
+            log_to_file(f"Successfully appended httpResult for case {case_id}")
+
+
+def write_har(module_id, case_id, storage, entry):
+    # GUI 未连接时的后备方式：HAR 条目直接追加到 HAR 日志
+    with _write_lock:
+        append_json_line(get_har_journal_path(module_id, case_id), entry)
+
+
+# 通道消息类型对应的后备写入方式
+fallback_writers = {"capture": write_capture, "har": write_har}
+
+
+def write_fallback(kind, module_id, case_id, storage, entry):
+    fallback_writers[kind](module_id, case_id, storage, entry)
+
+
+class GuiChannel:
+    # 与 GUI 的本地通道（Unix 套接字，每行一条 JSON 消息）
+    # GUI 连接后发送当前用例，脚本把抓包记录和 HAR 条目发给 GUI，由 GUI 统一写入
+    # 未连接或发送失败时退回 write_capture / write_har
+    reconnect_interval = 2.0
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.queue = queue.Queue(maxsize=10000)
+        self.connected = threading.Event()
+        self.case = None
+        self.sock = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="gui-channel", daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=5):
+        # mitmdump 退出时调用：断开通道，队列中尚未发出的记录在当前线程同步写入，
+        # 不依赖随进程一起结束的后台线程
+        self.stopped.set()
+        sock = self.sock
+        if sock is not None:
+            self.disconnect(sock)
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self.drain()
+
+    def current_case(self):
+        # (模块ID, 用例ID, 存储方式)，未连接时返回 None
+        return self.case if self.connected.is_set() else None
+
+    def send(self, module_id, case_id, storage, entry, kind="capture"):
+        if self.stopped.is_set() or not self.connected.is_set():
+            return False
+        try:
+            self.queue.put_nowait((kind, module_id, case_id, storage, entry))
+            return True
+        except queue.Full:
+            return False
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.socket_path)
+            except OSError:
+                self.stopped.wait(self.reconnect_interval)
+                continue
+
+            if self.stopped.is_set():
+                sock.close()
+                break
+            self.sock = sock
+            threading.Thread(target=self.read_loop, args=(sock,), name="gui-channel-reader", daemon=True).start()
+            self.write_loop(sock)
+
+            # 通道断开后，队列中剩余的记录写入抓包日志
+            self.drain()
+            self.stopped.wait(self.reconnect_interval)
+
+    def write_loop(self, sock):
+        while self.sock is sock:
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            kind, module_id, case_id, storage, entry = item
+            message = {"type": kind, "module_id": module_id, "case_id": case_id, "entry": entry}
+            try:
+                sock.sendall((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+            except OSError as e:
+                log_to_file(f"GUI channel send failed: {str(e)}", logging.ERROR)
+                self.disconnect(sock)
+                write_fallback(*item)
+
+    def read_loop(self, sock):
+        try:
+            with sock.makefile("rb") as reader:
+                for line in reader:
+                    message = json.loads(line)
+                    if message.get("type") == "case":
+                        case = (message.get("module_id"), message.get("case_id"), message.get("storage", "json"))
+                        if case != self.case:
+                            # GUI 切换了用例，上一个用例的聚合记录立即写出
+                            aggregator.flush()
+                        self.case = case
+                        # 收到当前用例后才开始通过通道发送抓包记录
+                        self.connected.set()
+        except (OSError, ValueError) as e:
+            log_to_file(f"GUI channel read failed: {str(e)}", logging.ERROR)
+        self.disconnect(sock)
+
+    def disconnect(self, sock):
+        if self.sock is not sock:
+            return
+        self.connected.clear()
+        self.sock = None
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def drain(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                write_fallback(*item)
+            except Exception as e:
+                log_to_file(f"Error writing capture: {str(e)}", logging.ERROR)
+
+
+gui_channel = GuiChannel(get_user_data_path("capture.sock"))
+
+
+def running():
+    gui_channel.start()
+    aggregator.start()
+
+
+def emit_capture(module_id, case_id, storage, entry):
+    if not gui_channel.send(module_id, case_id, storage, entry):
+        write_capture(module_id, case_id, storage, entry)
+
+
+def emit_har(module_id, case_id, storage, entry):
+    if not gui_channel.send(module_id, case_id, storage, entry, kind="har"):
+        write_har(module_id, case_id, storage, entry)
+
+
+# URL 路径中的数字、UUID、长十六进制串视为 ID
+_id_segment = re.compile(r"\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{16,}")
+
+
+def normalize_url(url):
+    # 路径中的 ID 替换为 {id}，查询参数只保留参数名（去掉时间戳等缓存参数的值）
+    parts = urlsplit(url)
+    path = "/".join("{id}" if _id_segment.fullmatch(segment) else segment for segment in parts.path.split("/"))
+    query = "&".join(sorted({name for name, _ in parse_qsl(parts.query, keep_blank_values=True)}))
+    return f"{parts.scheme}://{parts.netloc}{path}" + (f"?{query}" if query else "")
+
+
+class FlowAggregator:
+    # 聚合模式：同一用例中 (方法, 归一化 URL, 状态码) 相同的请求合并为一条聚合记录
+    # 错误响应和新出现的响应内容仍保存完整记录；聚合记录带 aggregateKey，
+    # 每次写入的都是累计值，GUI 合并时按 aggregateKey 替换旧的聚合记录
+    # 后台线程定时写出到期的聚合记录，用例结束后没有新请求时也不会一直留在内存中
+    flush_interval = 10
+    check_interval = 1.0
+    max_samples = 3
+    max_distinct = 100
+
+    def __init__(self):
+        self.groups = {}
+        self.current_case = None
+        self.lock = threading.RLock()  # 请求处理、定时线程和通道读取线程都会写出
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="flow-aggregator", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.check_interval)
+            self.flush(due_only=True)
+
+    def add(self, module_id, case_id, storage, error):
+        # 返回 True 表示这条请求仍需保存完整记录
+        with self.lock:
+            if self.current_case != (module_id, case_id):
+                # 切换用例时写出上一个用例的聚合记录
+                self.flush()
+                self.groups = {}
+                self.current_case = (module_id, case_id)
+
+            normalized_url = normalize_url(error["url"])
+            key = f"{error['method']} {normalized_url} {error['status']}"
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = {
+                    "storage": storage,
+                    "seen": set(),
+                    "flushed_at": time.monotonic(),
+                    "dirty": False,
+                    "record": {
+                        "url": normalized_url,
+                        "header": [],
+                        "method": error["method"],
+                        "data": "",
+                        "result": "",
+                        "status": error["status"],
+                        "isSuccess": error["isSuccess"],
+                        "time": error["time"],
+                        "duration": error["duration"],
+                        "aggregateKey": key,
+                        "count": 0,
+                        "firstTime": now,
+                        "lastTime": now,
+                        "minDuration": error["duration"],
+                        "avgDuration": 0,
+                        "maxDuration": error["duration"],
+                        "totalDuration": 0,
+                        "samples": []
+                    }
+                }
+
+            record = group["record"]
+            record["count"] += 1
+            record["time"] = error["time"]
+            record["lastTime"] = now
+            record["minDuration"] = min(record["minDuration"], error["duration"])
+            record["maxDuration"] = max(record["maxDuration"], error["duration"])
+            record["totalDuration"] += error["duration"]
+            record["avgDuration"] = round(record["totalDuration"] / record["count"])
+            record["duration"] = record["avgDuration"]
+            record["result"] = error["result"]
+            group["dirty"] = True
+
+            digest = hashlib.sha1(str(error["result"]).encode("utf-8")).hexdigest()
+            distinct = digest not in group["seen"] and len(group["seen"]) < self.max_distinct
+            if distinct:
+                group["seen"].add(digest)
+                if len(record["samples"]) < self.max_samples:
+                    record["samples"].append(error["result"])
+
+            if time.monotonic() - group["flushed_at"] >= self.flush_interval:
+                self.flush_group(group)
+            return distinct or error["status"] >= 400
+
+    def flush_group(self, group):
+        group["flushed_at"] = time.monotonic()
+        # 只出现过一次的请求已有完整记录，不需要聚合记录
+        if not group["dirty"] or group["record"]["count"] < 2:
+            return
+        group["dirty"] = False
+        module_id, case_id = self.current_case
+        # 记录会继续累计，排队发送的必须是当前值的副本
+        record = group["record"]
+        emit_capture(module_id, case_id, group["storage"], dict(record, samples=list(record["samples"])))
+
+    def flush(self, due_only=False):
+        # due_only 为 True 时只写出距上次写出已超过 flush_interval 的聚合记录
+        with self.lock:
+            now = time.monotonic()
+            for group in self.groups.values():
+                if due_only and now - group["flushed_at"] < self.flush_interval:
+                    continue
+                try:
+                    self.flush_group(group)
+                except Exception as e:
+                    log_to_file(f"Error flushing aggregate record: {str(e)}", logging.ERROR)
+
+
+aggregator = FlowAggregator()
+
+
+def done():
+    # mitmdump 退出前写出尚未保存的聚合记录，再停止通道并同步写入仍在队列中的记录
+    aggregator.flush()
+    gui_channel.stop()
+
+
+def update_error_json_with_error_data(error, har_entry=None):
+    try:
+        # 已连接 GUI 时以通道中的当前用例为准，否则读取 current_test_case.json
+        current_module_id, current_case_id, storage = gui_channel.current_case() or get_current_test_case()
+        if not current_module_id or not current_case_id:
             log_to_file("Current test case information not found", logging.ERROR)
+            return
+
+        # 聚合模式下被合并的轮询请求既不保存完整记录，也不写 HAR 条目
+        if ctx.options.capture_aggregate and not aggregator.add(current_module_id, current_case_id, storage, error):
+            return
+
+        emit_capture(current_module_id, current_case_id, storage, error)
+        if har_entry is not None:
+            emit_har(current_module_id, current_case_id, storage, har_entry)
     except Exception as e:
-        log_to_file(f"Error updating error json: {str(e)}", logging.ERROR)
\ No newline at end of file
+        log_to_file(f"Error updating error json: {str(e)}", logging.ERROR)
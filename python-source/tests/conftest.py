@@ -0,0 +1,75 @@
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+# 按文件路径加载 tool-all-bak.py；没有显示器时使用 offscreen 平台和 pynput 的空后端
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def tool(tmp_path_factory):
+    os.environ["HOME"] = str(tmp_path_factory.mktemp("home"))
+    os.environ["XDG_CONFIG_HOME"] = str(tmp_path_factory.mktemp("config"))  # QSettings 不读写真实配置
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if not os.environ.get("DISPLAY"):
+        os.environ.setdefault("PYNPUT_BACKEND", "dummy")
+    pytest.importorskip("PyQt5")
+    pytest.importorskip("pynput")
+    spec = importlib.util.spec_from_file_location("tool_all_bak", os.path.join(SOURCE_DIR, "tool-all-bak.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def addon(tmp_path_factory):
+    # 代理脚本导入时即在 ~/.auto-test-recorder 下打开日志文件
+    pytest.importorskip("mitmproxy")
+    home = tmp_path_factory.mktemp("addon-home")
+    os.makedirs(home / ".auto-test-recorder")
+    previous_home = os.environ.get("HOME")
+    os.environ["HOME"] = str(home)
+    try:
+        spec = importlib.util.spec_from_file_location("mitmproxy_script",
+                                                      os.path.join(SOURCE_DIR, "mitmproxy_script.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        if previous_home is not None:
+            os.environ["HOME"] = previous_home
+    return module
+
+
+@pytest.fixture(scope="session")
+def qapp(tool):
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+@pytest.fixture
+def user_home(tool, tmp_path, monkeypatch):
+    # 每个用例使用独立的数据目录
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def make_app(tool, qapp, user_home, monkeypatch):
+    # 创建主窗口，不启动 mitmdump 和全局快捷键监听；plan 写入 import.json 后在启动时加载
+    monkeypatch.setattr(tool.ProxyManager, "start", lambda self, *args, **kwargs: None)
+    monkeypatch.setattr(tool.App, "setup_global_hotkey_listener", lambda self: None)
+    apps = []
+
+    def make(plan):
+        with open(tool.get_user_data_path("import.json"), "w", encoding="utf-8") as file:
+            json.dump(plan, file, ensure_ascii=False)
+        app = tool.App()
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        app.close()
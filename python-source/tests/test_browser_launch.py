@@ -0,0 +1,94 @@
+import threading
+
+
+class FakeService:
+    def __init__(self, running):
+        self.process = FakeProcess(running)
+
+
+class FakeProcess:
+    def __init__(self, running):
+        self.running = running
+
+    def poll(self):
+        return None if self.running else 0
+
+
+class FakeDriver:
+    # 记录会话检查所在的线程
+    def __init__(self, running=True):
+        self.service = FakeService(running)
+        self.checked_on = None
+        self.quit_called = False
+
+    @property
+    def current_window_handle(self):
+        self.checked_on = threading.current_thread()
+        return "window-1"
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeDriverManager:
+    def __init__(self):
+        self.acquired = []
+
+    def acquire(self, launch_key):
+        self.acquired.append(launch_key)
+        return FakeDriver()
+
+
+class ReadyProxy:
+    def wait_ready(self, timeout=None):
+        return None
+
+
+def run_launch(tool, qapp, current_driver):
+    driver_manager = FakeDriverManager()
+    launch = tool.BrowserLaunch(driver_manager, ReadyProxy(), ("Chrome", "", "", 0), current_driver)
+    results = []
+    launch.launched.connect(lambda driver, proxy_error: results.append(driver))
+    launch.start()
+    assert launch.wait(10)
+    qapp.processEvents()
+    return driver_manager, results
+
+
+def test_launch_reuses_live_session_checked_off_gui_thread(tool, qapp):
+    current = FakeDriver()
+    driver_manager, results = run_launch(tool, qapp, current)
+
+    assert results == [current]
+    assert not driver_manager.acquired
+    assert current.checked_on is not None and current.checked_on is not threading.main_thread()
+
+
+def test_launch_replaces_dead_session(tool, qapp):
+    current = FakeDriver(running=False)
+    driver_manager, results = run_launch(tool, qapp, current)
+
+    assert current.quit_called
+    assert driver_manager.acquired == [("Chrome", "", "", 0)]
+    assert len(results) == 1 and results[0] is not current
+
+
+def test_prelaunch_is_opt_in(make_app, monkeypatch, tmp_path):
+    app = make_app([{"id": 1, "name": "模块", "caseVoList": []}])
+    prelaunched = []
+    monkeypatch.setattr(app.driver_manager, "prelaunch", prelaunched.append)
+    for name in ("browser", "driver"):
+        (tmp_path / name).touch()
+    settings = {"last_browser": "Chrome", "Chrome_path": str(tmp_path / "browser"),
+                "Chrome_driver_path": str(tmp_path / "driver")}
+    for key, value in settings.items():
+        app.settings.setValue(key, value)
+    try:
+        app.prelaunch_browser()
+        assert not prelaunched
+        app.settings.setValue("prelaunch_browser", True)
+        app.prelaunch_browser()
+        assert len(prelaunched) == 1
+    finally:
+        for key in list(settings) + ["prelaunch_browser"]:
+            app.settings.remove(key)
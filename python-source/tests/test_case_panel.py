@@ -0,0 +1,87 @@
+import json
+
+
+def make_plan(module_count=3, cases_per_module=5):
+    return [{"id": module_id, "name": f"模块 {module_id}",
+             "caseVoList": [{"id": module_id * 100 + case_id, "caseName": f"用例 {case_id}",
+                             "contentMap": [{"describe": "步骤", "expect": "预期结果"}],
+                             "httpResult": None, "imageResult": None, "isTested": False}
+                            for case_id in range(1, cases_per_module + 1)]}
+            for module_id in range(1, module_count + 1)]
+
+
+def count_calls(app, name):
+    calls = []
+    method = getattr(app, name)
+
+    def counted(*args):
+        calls.append(args)
+        return method(*args)
+
+    setattr(app, name, counted)
+    return calls
+
+
+def test_click_rebuilds_panel_once_after_refreshes(make_app):
+    app = make_app(make_plan())
+    # 反复刷新（导入、浏览器关闭、切换状态）不能累积 clicked 连接
+    for _ in range(100):
+        app.load_and_display_data()
+        app.update_status_after_close()
+        app.tree_model.refresh()
+
+    rebuilds = count_calls(app, "display_case_info")
+    case_index = app.tree_model.case_model_index(1, 2)
+    app.tree.clicked.emit(case_index)
+
+    assert len(rebuilds) == 1
+    assert (app.current_module_id, app.current_case_id) == ("2", "203")
+
+
+def test_refresh_notifies_only_changed_row(make_app):
+    app = make_app(make_plan())
+    module_index = app.tree_model.index(0, 0)
+    app.tree_model.fetchMore(module_index)
+    # 视图绘制过的行（读取过 Bug 列）才会在刷新时比较状态
+    for case_pos in range(app.tree_model.rowCount(module_index)):
+        app.tree_model.data(app.tree_model.index(case_pos, 2, module_index))
+
+    changed = []
+    app.tree_model.dataChanged.connect(lambda top_left, bottom_right: changed.append(top_left.row()))
+    app.case_index.set_tested("1", "103", True)
+    app.tree_model.refresh()
+
+    assert changed == [2]
+
+
+def find_traffic_table(app):
+    from PyQt5.QtWidgets import QTableView
+    return next(view for view in app.right_widget.widget().findChildren(QTableView)
+                if view.model() is app.traffic_proxy)
+
+
+def test_traffic_table_sorts_only_on_header_click(tool, make_app, monkeypatch):
+    from PyQt5.QtCore import Qt
+    plan = make_plan()
+    entries = [{"method": "GET", "url": f"https://example.test/{index}", "status": status, "duration": duration}
+               for index, (status, duration) in enumerate([(200, 30), (404, 10), (200, 20), (500, 40)])]
+    plan[0]["caseVoList"][0]["httpResult"] = json.dumps(entries)
+    app = make_app(plan)
+    sort_values = count_calls(app.traffic_model, "sort_value")
+    app.tree.clicked.emit(app.tree_model.case_model_index(0, 0))
+
+    # 打开时保持原有顺序，不计算排序键
+    header = find_traffic_table(app).horizontalHeader()
+    assert header.sortIndicatorSection() == -1
+    assert not sort_values
+    assert [entry["duration"] for entry in app.traffic_model.entries] == [30, 10, 20, 40]
+
+    header.setSortIndicator(3, Qt.DescendingOrder)
+    assert [entry["duration"] for entry in app.traffic_model.entries] == [40, 30, 20, 10]
+    # 过滤仍在代理中进行
+    app.traffic_proxy.set_status_class(2)
+    assert [app.traffic_proxy.index(row, 3).data() for row in range(app.traffic_proxy.rowCount())] == ["30", "20"]
+
+    # 重新打开同一用例保留已解析的记录和排序
+    app.tree.clicked.emit(app.tree_model.case_model_index(0, 0))
+    assert find_traffic_table(app).horizontalHeader().sortIndicatorSection() == 3
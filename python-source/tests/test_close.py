@@ -0,0 +1,59 @@
+import os
+import threading
+import time
+
+
+def test_close_cancels_running_export(tool, make_app, monkeypatch, tmp_path):
+    started = threading.Event()
+
+    def write_json(self, entry):
+        # 模拟一个很大的计划，直到被取消才结束
+        started.set()
+        self.cancel_event.wait(10)
+        raise InterruptedError()
+
+    monkeypatch.setattr(tool.ExportThread, "write_json", write_json)
+    app = make_app([{"id": 1, "name": "模块", "caseVoList": []}])
+    zip_filename = str(tmp_path / "export.zip")
+    app.export_thread = tool.ExportThread([], zip_filename, parent=app)
+    app.export_thread.start()
+    assert started.wait(10)
+
+    app.close()
+
+    assert not app.export_thread.isRunning()
+    assert not os.path.exists(zip_filename + ".part")
+    assert not os.path.exists(zip_filename)
+
+
+class BlockingDriverManager:
+    # 取得会话一直阻塞，直到测试放行
+    def __init__(self):
+        self.release = threading.Event()
+
+    def acquire(self, launch_key):
+        self.release.wait(30)
+        raise RuntimeError("驱动无响应")
+
+
+def test_close_waits_for_cancelled_launch_with_deadline(tool, qapp, make_app):
+    app = make_app([{"id": 1, "name": "模块", "caseVoList": []}])
+    driver_manager = BlockingDriverManager()
+    # 之前已取消、仍在等待驱动的启动线程
+    launch = tool.BrowserLaunch(driver_manager, app.proxy_manager, ("Chrome", "", "", 0))
+    launch.abandon()
+    launch.finished.connect(app.on_browser_launch_finished)
+    app.browser_launches.add(launch)
+    launch.start()
+
+    started = time.monotonic()
+    app.close()
+    assert time.monotonic() - started < 10
+    # 仍在阻塞的启动线程是守护线程，不会在程序退出时被销毁中止
+    assert launch.is_running()
+    assert launch.thread.daemon
+
+    driver_manager.release.set()
+    assert launch.wait(10)
+    qapp.processEvents()
+    assert launch not in app.browser_launches
@@ -0,0 +1,196 @@
+import json
+import os
+import sqlite3
+
+
+def write_journal(tool, module_id, case_id, entries):
+    journal_dir = tool.get_user_data_path(os.path.join("http_journal", module_id))
+    os.makedirs(journal_dir, exist_ok=True)
+    with open(os.path.join(journal_dir, f"{case_id}.jsonl"), "a", encoding="utf-8") as file:
+        for entry in entries:
+            file.write(json.dumps(entry) + "\n")
+
+
+def list_journals(tool):
+    journal_dir = tool.get_user_data_path("http_journal")
+    return [name for _, _, names in os.walk(journal_dir) for name in names]
+
+
+def make_plan():
+    return [{"id": 1, "name": "模块", "caseVoList": [{"id": 2, "caseName": "用例", "httpResult": None}]}]
+
+
+def test_in_flight_journal_is_not_folded_again(tool, user_home):
+    case = make_plan()[0]["caseVoList"][0]
+    find_case = lambda module_id, case_id: case
+    write_journal(tool, "1", "2", [{"url": "https://example.test/a"}])
+
+    consumed = tool.fold_http_journal(find_case)
+    # 写入完成前再次保存（防抖、导出、退出）时跳过已合并的日志
+    assert tool.fold_http_journal(find_case, skip=set(consumed), leftovers=True) == []
+    assert tool.fold_http_journal(find_case) == []
+    assert len(tool.parse_json_list(case["httpResult"])) == 1
+
+
+def test_leftover_journal_is_folded_at_startup(tool, user_home):
+    write_journal(tool, "1", "2", [{"url": "https://example.test/a"}])
+    consumed = tool.fold_http_journal(lambda module_id, case_id: {})
+
+    # 上次运行未删除的日志，重新启动后读取一次
+    case = make_plan()[0]["caseVoList"][0]
+    assert tool.fold_http_journal(lambda module_id, case_id: case, leftovers=True) == consumed
+    assert len(tool.parse_json_list(case["httpResult"])) == 1
+
+
+def test_failed_write_does_not_duplicate_captures(tool, qapp, user_home, monkeypatch):
+    store = tool.JsonPlanStore(tool.get_user_data_path("import.json"))
+    data = make_plan()
+    case_index = tool.CaseIndex()
+    case_index.rebuild(data)
+    persister = tool.PlanPersister(store, lambda: data, case_index.get_case)
+    write_journal(tool, "1", "2", [{"url": "https://example.test/a"}])
+
+    write_json_atomic = tool.write_json_atomic
+    calls = []
+
+    def fail_once(path, snapshot):
+        calls.append(path)
+        if len(calls) == 1:
+            raise OSError("磁盘已满")
+        write_json_atomic(path, snapshot)
+
+    monkeypatch.setattr(tool, "write_json_atomic", fail_once)
+    persister.flush()
+    assert len(list_journals(tool)) == 1
+    # 重试时写入已合并的数据并删除日志，不会再合并一次
+    persister.flush()
+    persister.close()
+
+    saved = tool.load_data(store.file_path)
+    assert len(tool.parse_json_list(saved[0]["caseVoList"][0]["httpResult"])) == 1
+    assert list_journals(tool) == []
+    assert len(calls) == 2
+
+
+def count_writes(store, monkeypatch):
+    writes = []
+    write = store.write
+
+    def counted(*args):
+        writes.append(args)
+        return write(*args)
+
+    monkeypatch.setattr(store, "write", counted)
+    return writes
+
+
+def test_channel_captures_are_appended_without_rewriting_plan(tool, qapp, user_home, monkeypatch):
+    store = tool.JsonPlanStore(tool.get_user_data_path("import.json"))
+    data = make_plan()
+    case_index = tool.CaseIndex()
+    case_index.rebuild(data)
+    persister = tool.PlanPersister(store, lambda: data, case_index.get_case)
+    writes = count_writes(store, monkeypatch)
+
+    for index in range(100):
+        persister.add_captures("1", "2", [{"url": f"https://example.test/{index}"}])
+    persister.append_captures()
+    persister.append_future.result()
+    # 实时抓包记录只追加到抓包日志，不标记修改，不重写 import.json
+    assert writes == []
+    assert not persister.is_dirty() and not persister.timer.isActive()
+    assert len(persister.pending_captures[("1", "2")]) == 100
+
+    # 浏览器关闭时合并，写入一次后删除抓包日志
+    persister.fold_captures()
+    assert persister.pending_captures == {}
+    assert len(tool.parse_json_list(data[0]["caseVoList"][0]["httpResult"])) == 100
+    persister.close()
+    assert len(writes) == 1
+    assert list_journals(tool) == []
+    saved = tool.load_data(store.file_path)
+    assert len(tool.parse_json_list(saved[0]["caseVoList"][0]["httpResult"])) == 100
+
+
+def test_channel_captures_are_inserted_into_sqlite_once(tool, qapp, user_home, monkeypatch):
+    store = tool.SqlitePlanStore(tool.get_user_data_path("plan.db"))
+    store.replace_all(make_plan())
+    data = store.load()
+    case_index = tool.CaseIndex()
+    case_index.rebuild(data)
+    persister = tool.PlanPersister(store, lambda: data, case_index.get_case)
+    writes = count_writes(store, monkeypatch)
+
+    persister.add_captures("1", "2", [{"url": "https://example.test/a"}, {"url": "https://example.test/b"}])
+    persister.close()
+
+    assert writes == []
+    assert len(tool.parse_json_list(data[0]["caseVoList"][0]["httpResult"])) == 2
+    reloaded = tool.SqlitePlanStore(store.db_path).load()
+    assert len(tool.parse_json_list(reloaded[0]["caseVoList"][0]["httpResult"])) == 2
+
+
+def test_failed_sqlite_append_is_retried_not_lost(tool, qapp, user_home, monkeypatch):
+    store = tool.SqlitePlanStore(tool.get_user_data_path("plan.db"))
+    store.replace_all(make_plan())
+    data = store.load()
+    case_index = tool.CaseIndex()
+    case_index.rebuild(data)
+    persister = tool.PlanPersister(store, lambda: data, case_index.get_case)
+
+    append_captures = store.append_captures
+    calls = []
+
+    def fail_once(captures):
+        calls.append(captures)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        append_captures(captures)
+
+    monkeypatch.setattr(store, "append_captures", fail_once)
+    persister.add_captures("1", "2", [{"url": "https://example.test/a"}])
+    persister.fold_captures()
+    # 写入失败的记录没有并入 httpResult（SQLite 不保存它），仍作为未合并记录显示
+    assert data[0]["caseVoList"][0]["httpResult"] is None
+    assert len(persister.pending_captures[("1", "2")]) == 1
+
+    # 退出时重新追加
+    persister.close()
+    assert len(calls) == 2
+    reloaded = tool.SqlitePlanStore(store.db_path).load()
+    assert len(tool.parse_json_list(reloaded[0]["caseVoList"][0]["httpResult"])) == 1
+
+
+class FakeClient:
+    def __init__(self, messages):
+        self.lines = [(json.dumps(message) + "\n").encode("utf-8") for message in messages]
+
+    def canReadLine(self):
+        return bool(self.lines)
+
+    def readLine(self):
+        return self.lines.pop(0)
+
+
+def test_channel_har_entries_are_written_by_gui(tool, qapp, user_home):
+    store = tool.JsonPlanStore(tool.get_user_data_path("import.json"))
+    data = make_plan()
+    case_index = tool.CaseIndex()
+    case_index.rebuild(data)
+    persister = tool.PlanPersister(store, lambda: data, case_index.get_case)
+    channel = tool.CaptureChannel(tool.get_user_data_path("capture.sock"))
+    channel.har_captured.connect(lambda module_id, case_id, entry:
+                                 persister.add_har_entries(module_id, case_id, [entry]))
+
+    channel.read_messages(FakeClient([
+        {"type": "har", "module_id": 1, "case_id": 2, "entry": {"request": {"url": "https://example.test/a"}}},
+        {"type": "capture", "module_id": 1, "case_id": 2, "entry": {"url": "https://example.test/a"}},
+    ]))
+    # 导出前合并时 HAR 条目已写入 HAR 日志，抓包记录没有混进去
+    persister.fold_captures()
+    journals = tool.get_har_journals()
+    assert [name for name, _, _ in journals] == ["har/1_2.har"]
+    with open(journals[0][1], encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == [{"request": {"url": "https://example.test/a"}}]
+    persister.close()
+    channel.close()
@@ -0,0 +1,153 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def make_flow():
+    from mitmproxy.test import tflow
+
+    def make(path, method="GET"):
+        flow = tflow.tflow(resp=True)
+        flow.request.method = method
+        flow.request.path = path
+        return flow
+
+    return make
+
+
+def test_path_regex_searches_path_without_query(addon, make_flow):
+    rule = addon.CaptureRule({"path_regex": "/poll$"})
+    assert rule.matches(make_flow("/x/poll?since=1"))
+    assert not rule.matches(make_flow("/x/poll/status"))
+
+
+def test_path_glob_and_regex_must_both_match(addon, make_flow):
+    rule = addon.CaptureRule({"path": "/api/*", "path_regex": "/orders/"})
+    assert rule.matches(make_flow("/api/orders/1"))
+    # 只满足其中一个条件时不匹配
+    assert not rule.matches(make_flow("/api/users/1"))
+    assert not rule.matches(make_flow("/web/orders/1"))
+
+
+def test_path_glob_stays_case_insensitive_with_regex(addon, make_flow):
+    rule = addon.CaptureRule({"path": "/API/*", "path_regex": "x"})
+    assert rule.matches(make_flow("/api/x"))
+    assert not addon.CaptureRule({"path": "/API/*", "path_regex": "zzz"}).matches(make_flow("/api/x"))
+
+
+@pytest.fixture
+def options(addon):
+    # 通过 mitmproxy 的测试上下文注册脚本的选项，ctx.options 在用例中可用
+    from mitmproxy.test import taddons
+    with taddons.context(addon) as tctx:
+        def configure(**values):
+            tctx.configure(addon, **values)
+        yield configure
+
+
+def make_exchange(request_headers=(), response_headers=()):
+    from mitmproxy.test import tflow, tutils
+    return tflow.tflow(req=tutils.treq(method=b"POST", headers=list(request_headers), content=b""),
+                       resp=tutils.tresp(headers=list(response_headers), content=b""))
+
+
+def stream_chunks(stream, chunks):
+    # stream 必须原样转发每个分块
+    for chunk in chunks:
+        assert stream(chunk) is chunk
+
+
+def test_chunked_response_keeps_only_prefix(addon, options):
+    options(capture_response_limit=10)
+    flow = make_exchange(response_headers=[(b"Content-Type", b"application/json"),
+                                           (b"Transfer-Encoding", b"chunked")])
+    addon.responseheaders(flow)
+    chunks = [b'{"items": [', b"1, " * 1000, b"2]}"]
+    stream_chunks(flow.response.stream, chunks)
+
+    assert bytes(flow.metadata["capture_prefix"]) == b''.join(chunks)[:10]
+    assert addon.get_response_size(flow) == sum(len(chunk) for chunk in chunks)
+    assert addon.get_response_result(flow) == '{"items": '
+
+
+def test_compressed_response_is_streamed_without_prefix(addon, options):
+    import gzip
+    options(capture_compressed=False)
+    flow = make_exchange(response_headers=[(b"Content-Type", b"application/json"),
+                                           (b"Content-Encoding", b"gzip")])
+    addon.responseheaders(flow)
+    body = gzip.compress(b'{"ok": true}' * 100)
+    stream_chunks(flow.response.stream, [body[:50], body[50:]])
+
+    assert bytes(flow.metadata["capture_prefix"]) == b""
+    assert addon.get_response_size(flow) == len(body)
+    assert addon.get_response_result(flow) == "<压缩的响应体: gzip>"
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_captured_compressed_response_is_decoded_and_capped(addon, options, encoding):
+    options(capture_compressed=True, capture_response_limit=8)
+    flow = make_exchange(response_headers=[(b"Content-Type", b"application/json"),
+                                           (b"Content-Encoding", encoding.encode())])
+    # 设置 content 时按 Content-Encoding 压缩，raw_content 为压缩后的内容
+    flow.response.content = '{"名称": "值"}'.encode("utf-8") * 100
+    assert not flow.response.raw_content.startswith(b'{"')
+    addon.responseheaders(flow)
+
+    # 需要完整响应体才能解压，不流式转发
+    assert not flow.response.stream
+    # 按字节截断后解码，截断处不完整的多字节字符被丢弃
+    assert addon.get_response_result(flow) == '{"名称'
+
+
+def test_chunked_request_keeps_only_prefix(addon, options):
+    options(capture_request_limit=16)
+    flow = make_exchange(request_headers=[(b"Content-Type", b"application/json"),
+                                          (b"Transfer-Encoding", b"chunked")])
+    addon.requestheaders(flow)
+    chunks = [b'{"upload": "', b"x" * 100000, b'"}']
+    stream_chunks(flow.request.stream, chunks)
+
+    assert len(flow.metadata["capture_request_prefix"]) == 16
+    assert addon.get_request_size(flow) == sum(len(chunk) for chunk in chunks)
+    assert addon.get_request_data(flow) == '{"upload": "xxxx'
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_compressed_request_is_streamed_without_prefix(addon, options, encoding):
+    options(capture_compressed=False)
+    flow = make_exchange(request_headers=[(b"Content-Type", b"application/json"),
+                                          (b"Content-Encoding", encoding.encode()),
+                                          (b"Content-Length", b"64")])
+    addon.requestheaders(flow)
+    stream_chunks(flow.request.stream, [b"a" * 32, b"b" * 32])
+
+    assert bytes(flow.metadata["capture_request_prefix"]) == b""
+    assert addon.get_request_size(flow) == 64
+    assert addon.get_request_data(flow) == f"<压缩的请求体: {encoding}>"
+
+
+def test_decode_prefix_drops_split_multibyte_character(addon):
+    raw = "中文".encode("utf-8")
+    assert addon.decode_prefix(raw, "text/plain; charset=utf-8", 4) == "中"
+    assert addon.decode_prefix("中文".encode("gbk"), "text/plain; charset=gbk", 3) == "中"
+
+
+def test_har_entries_go_through_gui_channel(addon, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    channel = addon.GuiChannel(str(tmp_path / "capture.sock"))
+    monkeypatch.setattr(addon, "gui_channel", channel)
+    har_path = addon.get_har_journal_path("1", "2")
+
+    # 已连接 GUI 时排队发给 GUI，代理脚本自己不写 HAR 日志
+    channel.connected.set()
+    addon.emit_har("1", "2", "json", {"request": {"url": "https://example.test/a"}})
+    assert channel.queue.queue[0][0] == "har"
+    assert not os.path.exists(har_path)
+
+    # 通道断开后队列中剩余的条目才由脚本写入
+    channel.drain()
+    with open(har_path, encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == [{"request": {"url": "https://example.test/a"}}]
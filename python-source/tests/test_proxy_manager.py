@@ -0,0 +1,72 @@
+import socket
+
+
+def test_start_refuses_port_held_by_another_process(tool, tmp_path, monkeypatch):
+    def popen(*args, **kwargs):
+        raise AssertionError("端口被占用时不应启动 mitmdump")
+
+    monkeypatch.setattr(tool.subprocess, "Popen", popen)
+    manager = tool.ProxyManager("mitmproxy_script.py", str(tmp_path / "mitmproxy.log"))
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        manager.start(sock.getsockname()[1])
+        assert "已被其他程序占用" in manager.wait_ready(timeout=1)
+    assert not manager.is_running()
+
+
+class ExitedProcess:
+    returncode = 1
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        pass
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+
+def test_restart_picks_new_port_when_previous_auto_port_is_taken(tool, tmp_path, monkeypatch):
+    commands = []
+
+    def popen(command, **kwargs):
+        commands.append(command)
+        return ExitedProcess()
+
+    monkeypatch.setattr(tool.subprocess, "Popen", popen)
+    manager = tool.ProxyManager("mitmproxy_script.py", str(tmp_path / "mitmproxy.log"))
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        # 上次自动选择的端口现在被其他程序占用：不是设置的端口，不报错，另选端口
+        manager.port = sock.getsockname()[1]
+        manager.start()
+        assert manager.port != sock.getsockname()[1]
+    assert commands and str(manager.port) in commands[0]
+    manager.stop()
+
+
+class ExitingProcess:
+    # 第一次 poll 时仍在运行，之后已退出：模拟 mitmdump 在探测连接期间因绑定失败退出
+    def __init__(self):
+        self.polls = 0
+        self.returncode = None
+
+    def poll(self):
+        self.polls += 1
+        if self.polls > 1:
+            self.returncode = 1
+        return self.returncode
+
+
+def test_probe_reports_exited_process_even_if_port_answers(tool, tmp_path):
+    # 连接成功但 mitmdump 已退出：应答的是占用端口的其他进程
+    manager = tool.ProxyManager("mitmproxy_script.py", str(tmp_path / "mitmproxy.log"))
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        manager.probe(ExitingProcess(), sock.getsockname()[1], timeout=5)
+    assert "已被其他程序占用" in manager.error
+    assert manager.ready.is_set()
@@ -0,0 +1,77 @@
+import json
+import os
+
+
+def make_plan(image_name):
+    image_result = json.dumps([{"imageName": image_name, "remark": "Bug"}])
+    return [{"id": 1, "name": "模块", "caseVoList": [
+        {"id": case_id, "caseName": f"用例 {case_id}", "contentMap": [], "httpResult": None,
+         "imageResult": image_result, "isTested": False} for case_id in (101, 102)]}]
+
+
+def test_shared_screenshot_is_deleted_with_last_reference(tool, make_app, monkeypatch):
+    image_name = "0" * 64 + ".png"
+    app = make_app(make_plan(image_name))
+    screenshot_path = os.path.join(tool.get_user_data_path("screenshots"), image_name)
+    os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
+    open(screenshot_path, "wb").close()
+    assert app.case_index.image_refs[image_name] == 2
+    # 详情面板为截图添加右键删除菜单
+    app.tree.clicked.emit(app.tree_model.case_model_index(0, 0))
+
+    def rescan(data):
+        raise AssertionError("删除截图时不应重新统计整个计划")
+
+    monkeypatch.setattr(tool, "count_image_references", rescan)
+    app.delete_screenshot("1", "101", 0)
+    # 另一个用例仍引用同一张截图
+    assert app.case_index.get_case("1", "101")["imageResult"] is None
+    assert app.case_index.image_refs[image_name] == 1
+    assert os.path.exists(screenshot_path)
+
+    app.delete_screenshot("1", "102", 0)
+    assert app.case_index.image_refs[image_name] == 0
+    assert not os.path.exists(screenshot_path)
+    assert {("1", "101"), ("1", "102")} <= app.persister.dirty_cases
+
+
+def test_added_screenshot_is_counted(tool, make_app):
+    app = make_app(make_plan("a.png"))
+    app.current_module_id, app.current_case_id = "1", "101"
+    app.append_screenshot_result({"imageName": "b.png", "remark": "Bug"})
+    assert app.case_index.image_refs["b.png"] == 1
+    assert len(tool.parse_json_list(app.case_index.get_case("1", "101")["imageResult"])) == 2
+
+
+def write_thumbnail(cache, key, size, mtime):
+    path = cache.disk_path(key)
+    with open(path, "wb") as file:
+        file.write(b"\0" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_thumbnail_disk_cache_is_pruned(tool, qapp, user_home, monkeypatch):
+    cache = tool.ThumbnailCache()
+    screenshots_dir = tool.get_user_data_path("screenshots")
+    os.makedirs(screenshots_dir, exist_ok=True)
+    paths = []
+    for name in ("a.png", "b.png", "c.png"):
+        paths.append(os.path.join(screenshots_dir, name))
+        with open(paths[-1], "wb") as file:
+            file.write(name.encode("ascii"))
+
+    old = write_thumbnail(cache, cache.key_for(paths[0]), 100, 1000)
+    recent = write_thumbnail(cache, cache.key_for(paths[1]), 100, 2000)
+    # c.png 被重新编码，旧缩略图的键不再对应任何截图；另有一张已删除截图的缩略图
+    stale = write_thumbnail(cache, cache.key_for(paths[2]), 100, 3000)
+    with open(paths[2], "wb") as file:
+        file.write(b"re-encoded")
+    orphan = write_thumbnail(cache, "f" * 40, 100, 3000)
+
+    monkeypatch.setattr(cache, "max_disk_bytes", 150)
+    cache.prune_disk(paths)
+    # 无效缩略图全部删除，有效缩略图超出上限时先删最久未使用的
+    assert not os.path.exists(stale) and not os.path.exists(orphan)
+    assert not os.path.exists(old)
+    assert os.path.exists(recent)
@@ -1,34 +1,35 @@
 import subprocess
 import sys
 from PyQt5.QtWidgets import QMessageBox, QFileDialog, QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, \
-    QPushButton, QTreeWidget, QTreeWidgetItem, QScrollArea, QLabel, QSplitter, QLineEdit, QInputDialog, QDialog, \
+    QPushButton, QTreeView, QScrollArea, QLabel, QSplitter, QLineEdit, QInputDialog, QDialog, \
     QTableWidget, QTableWidgetItem, QHeaderView, QFrame, QShortcut, QCheckBox, QToolButton, QTextEdit, QComboBox, \
-    QColorDialog
+    QColorDialog, QProgressDialog, QActionGroup, QTableView, QSpinBox, QMenu
 from PyQt5.QtCore import QMetaObject, Q_ARG, pyqtSlot, Qt, QTimer, QPoint, QThread, pyqtSignal, QRect, QSettings, \
-    QObject, QSize, QLocale
+    QObject, QSize, QLocale, QAbstractItemModel, QModelIndex, QThreadPool, QRunnable, QAbstractTableModel, \
+    QSortFilterProxyModel
 from PyQt5.QtGui import QPainter, QPen, QColor, QBrush, QFont, QPixmap, QKeySequence, QIcon, QGuiApplication, \
-    QFontMetrics, QTextBlockFormat, QCursor
+    QFontMetrics, QTextBlockFormat, QCursor, QImage, QImageReader
+from PyQt5.QtNetwork import QLocalServer
 import json
+import io
+import codecs
 import os
-from selenium.webdriver import Firefox, Chrome
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from selenium.webdriver.chrome.service import Service as ChromeService
 import threading
+import socket
 import time
-from selenium.common.exceptions import WebDriverException
+import select
 from pynput import keyboard as pynput_keyboard
 import tempfile
-from mss import mss, tools
 import datetime
 import shutil
+import sqlite3
 import zipfile
-import copy
+import uuid
+import hashlib
+from collections import OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from logging.handlers import RotatingFileHandler
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
 import warnings
 
 warnings.filterwarnings("ignore", category=DeprecationWarning, message="sipPyTypeDict() is deprecated")
@@ -85,10 +86,34 @@ def check_mitmproxy():
         logger.error("错误：未找到 mitmdump。请确保程序正确安装。")
         return False
 
+    # 运行 mitmdump --version 需要启动一个完整的 Python 解释器，
+    # 检查结果按可执行文件的路径、修改时间和大小缓存，文件未变化时直接使用
+    cache_path = os.path.join(user_home, '.auto-test-recorder', 'mitmdump_check.json')
+    try:
+        stat = os.stat(os.path.realpath(mitmdump_path))
+        cache_key = {"path": os.path.realpath(mitmdump_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    except OSError as e:
+        logger.error(f"错误：无法读取 mitmdump 文件信息：{str(e)}")
+        return False
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get("key") == cache_key:
+            logger.info(f"找到 mitmdump: {mitmdump_path}（使用缓存的检查结果）")
+            logger.info(f"mitmdump 版本: {cached.get('version', '')}")
+            return True
+    except (OSError, ValueError, AttributeError):
+        pass
+
     try:
         result = subprocess.run([mitmdump_path, "--version"], check=True, capture_output=True, text=True)
         logger.info(f"找到 mitmdump: {mitmdump_path}")
         logger.info(f"mitmdump 版本: {result.stdout.strip()}")
+        try:
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump({"key": cache_key, "version": result.stdout.strip()}, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"保存 mitmdump 检查结果失败: {e}")
         return True
     except subprocess.CalledProcessError as e:
         logger.error(f"错误：mitmdump 运行失败。错误信息：{e.stderr}")
@@ -98,10 +123,13 @@ def check_mitmproxy():
         return False
 
 
-# 在主程序开始时调用此函数
-if not check_mitmproxy():
-    logger.critical("mitmproxy 检查失败，程序将退出。")
-    sys.exit(1)
+class MitmproxyCheckThread(QThread):
+    # 启动时在后台检查 mitmdump，不阻塞主窗口显示，失败时通知界面退出
+    failed = pyqtSignal()
+
+    def run(self):
+        if not check_mitmproxy():
+            self.failed.emit()
 
 
 def get_app_path():
@@ -179,6 +207,8 @@ class HotkeyListener(QThread):
         self.screenshot_hotkey = settings.value("screenshot_hotkey", "f4")
         self.prev_function_hotkey = settings.value("prev_function_hotkey", "f5")
         self.next_function_hotkey = settings.value("next_function_hotkey", "f6")
+        self.listener = None
+        self.stop_requested = False
 
     def run(self):
         def on_press(key):
@@ -199,8 +229,18 @@ class HotkeyListener(QThread):
                 pass
 
         with pynput_keyboard.Listener(on_press=on_press) as listener:
+            self.listener = listener
+            if self.stop_requested:
+                listener.stop()
             listener.join()
 
+    def stop(self):
+        # 重新设置快捷键时停止旧的监听线程，避免同一按键触发多次
+        self.stop_requested = True
+        if self.listener is not None:
+            self.listener.stop()
+        self.wait(1000)
+
 
 class TestStatusWindow(QWidget):
     def __init__(self, parent=None):
@@ -265,23 +305,25 @@ class TestStatusWindow(QWidget):
             self.steps_table.setItem(row, 1, QTableWidgetItem(step['expect']))
 
 
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-
-
-class ScreenshotHandler(FileSystemEventHandler):
+class ScreenshotHandler:
+    # 外部截图工具直接生成 .png，进程内截图先写 .part 再改名，两种情况都只处理 .png
+    # watchdog 只调用 dispatch，不继承 FileSystemEventHandler，启动时无需导入 watchdog
     def __init__(self, callback):
         self.callback = callback
 
-    def on_created(self, event):
-        if not event.is_directory:
+    def dispatch(self, event):
+        if event.is_directory:
+            return
+        if event.event_type == "created" and event.src_path.endswith('.png'):
             self.callback(event.src_path)
+        elif event.event_type == "moved" and event.dest_path.endswith('.png'):
+            self.callback(event.dest_path)
 
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None, hotkey='f4', prev_hotkey='f1', next_hotkey='f2',
                  toggle_tested_hotkey='f3', prev_function_hotkey='f5', next_function_hotkey='f6',
-                 show_confirmation=True):
+                 show_confirmation=True, prelaunch_browser=False, proxy_port=0):
         super().__init__(parent)
         self.setWindowTitle("设置")
         self.screenshot_hotkey_edit = QLineEdit(hotkey)
@@ -291,6 +333,13 @@ class SettingsDialog(QDialog):
         self.next_function_hotkey_edit = QLineEdit(next_function_hotkey)
         self.toggle_tested_hotkey_edit = QLineEdit(toggle_tested_hotkey)
         self.show_toggle_confirmation_checkbox = QCheckBox("显示确认弹窗", checked=show_confirmation)
+        self.prelaunch_browser_checkbox = QCheckBox("后台预启动上次使用的浏览器", checked=prelaunch_browser)
+        # 预启动的浏览器已经通过代理上网，其后台请求会记录到当前用例
+        self.prelaunch_browser_checkbox.setToolTip("浏览器会提前通过抓包代理启动，其后台请求可能记录到当前用例")
+        self.proxy_port_spin = QSpinBox()
+        self.proxy_port_spin.setRange(0, 65535)
+        self.proxy_port_spin.setSpecialValueText("自动")
+        self.proxy_port_spin.setValue(proxy_port)
         self.init_ui()
 
     def init_ui(self):
@@ -302,6 +351,8 @@ class SettingsDialog(QDialog):
         layout.addLayout(self.hotkey_setting_layout("下一个功能快捷键:", self.next_function_hotkey_edit))
         layout.addLayout(self.hotkey_setting_layout("切换测试状态快捷键:", self.toggle_tested_hotkey_edit))
         layout.addWidget(self.show_toggle_confirmation_checkbox)
+        layout.addWidget(self.prelaunch_browser_checkbox)
+        layout.addLayout(self.hotkey_setting_layout("抓包代理端口:", self.proxy_port_spin))
         buttons_layout = QHBoxLayout()
         buttons_layout.addWidget(QPushButton("确定", clicked=self.accept))
         buttons_layout.addWidget(QPushButton("取消", clicked=self.reject))
@@ -321,8 +372,1719 @@ class SettingsDialog(QDialog):
             'prev_function_hotkey': self.prev_function_hotkey_edit.text(),
             'next_function_hotkey': self.next_function_hotkey_edit.text(),
             'toggle_tested_hotkey': self.toggle_tested_hotkey_edit.text(),
-            'show_toggle_confirmation': self.show_toggle_confirmation_checkbox.isChecked()
+            'show_toggle_confirmation': self.show_toggle_confirmation_checkbox.isChecked(),
+            'prelaunch_browser': self.prelaunch_browser_checkbox.isChecked(),
+            'proxy_port': self.proxy_port_spin.value()
+        }
+
+
+class JsonPlanStore:
+    # import.json 存储：抓包记录来自 mitmproxy 追加写入的 JSONL 日志
+    name = "json"
+    saves_http_result = True  # httpResult 随计划一起写入 import.json
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def has_plan(self):
+        return os.path.exists(self.file_path)
+
+    def load(self):
+        return load_data(self.file_path)
+
+    def collect_captures(self, find_case, skip=(), leftovers=False):
+        return fold_http_journal(find_case, skip, leftovers)
+
+    def has_pending_captures(self):
+        return has_http_journal()
+
+    def append_captures(self, captures):
+        # 界面通过本地通道收到的抓包记录同样追加到抓包日志，合并时与代理脚本写入的记录一起读取
+        for (module_id, case_id), entries in captures.items():
+            append_json_lines(get_http_journal_path(module_id, case_id), entries)
+
+    def clear_captures(self):
+        discard_http_journal()
+
+    def write(self, snapshot, dirty_cases, cleanup):
+        write_json_atomic(self.file_path, snapshot)
+        remove_journal_files(cleanup)
+
+    def replace_all(self, data):
+        write_json_atomic(self.file_path, snapshot_plan(data))
+
+    def begin_import(self):
+        return JsonPlanImportWriter(self.file_path)
+
+
+class JsonPlanImportWriter:
+    # 流式导入时逐个模块写入临时文件，全部成功后再原子替换 import.json
+    def __init__(self, file_path):
+        self.file_path = file_path
+        fd, self.temp_path = tempfile.mkstemp(prefix=".import-", suffix=".tmp", dir=os.path.dirname(file_path))
+        self.file = os.fdopen(fd, "w", encoding="utf-8")
+        self.file.write("[")
+        self.count = 0
+
+    def add_module(self, module):
+        self.file.write(",\n" if self.count else "\n")
+        json.dump(module, self.file, ensure_ascii=False, indent=4)
+        self.count += 1
+
+    def commit(self, modules):
+        # 文件中的模块顺序无关紧要，load_data 读取时会重新排序
+        self.file.write("\n]")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.temp_path, self.file_path)
+        discard_http_journal()
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+
+
+class SqlitePlanStore:
+    # SQLite（WAL 模式）存储：mitmproxy 对 http_captures 单行插入，读写互不阻塞
+    name = "sqlite"
+    saves_http_result = False  # httpResult 只来自 http_captures，write 不保存它
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS modules (
+            id TEXT PRIMARY KEY, position INTEGER, name TEXT, extra TEXT);
+        CREATE TABLE IF NOT EXISTS cases (
+            module_id TEXT, id TEXT, position INTEGER, case_name TEXT, is_tested INTEGER,
+            completion INTEGER, extra TEXT, PRIMARY KEY (module_id, id));
+        CREATE TABLE IF NOT EXISTS steps (
+            module_id TEXT, case_id TEXT, position INTEGER, describe TEXT, expect TEXT, extra TEXT,
+            PRIMARY KEY (module_id, case_id, position));
+        CREATE TABLE IF NOT EXISTS http_captures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, module_id TEXT, case_id TEXT, entry TEXT);
+        CREATE INDEX IF NOT EXISTS http_captures_case ON http_captures (module_id, case_id);
+        CREATE TABLE IF NOT EXISTS screenshots (
+            module_id TEXT, case_id TEXT, position INTEGER, image_name TEXT, remark TEXT, extra TEXT,
+            PRIMARY KEY (module_id, case_id, position));
+    """
+
+    # 这些字段单独建表或建列保存，其余字段原样保存在 extra 中，导出时还原
+    case_fields = ("httpResult", "imageResult", "isTested", "completion")
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.last_capture_id = 0
+        self.connection().executescript(self.schema)
+
+    def connection(self):
+        # sqlite3 连接不能跨线程使用，界面线程和写入线程各自持有一个
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def has_plan(self):
+        return self.connection().execute("SELECT 1 FROM modules LIMIT 1").fetchone() is not None
+
+    def migrate_from_json(self, json_path):
+        # 一次性迁移：读取 import.json 并合并遗留的抓包日志
+        data = load_data(json_path)
+        cases = {(str(module["id"]), str(case["id"])): case
+                 for module in data for case in module.get("caseVoList", [])}
+        consumed = fold_http_journal(lambda module_id, case_id: cases.get((module_id, case_id)), leftovers=True)
+        self.replace_all(data)
+        remove_journal_files(consumed)
+        logger.info(f"已将 {json_path} 迁移到 {self.db_path}")
+
+    def load(self):
+        conn = self.connection()
+        captures = {}
+        for capture_id, module_id, case_id, entry in conn.execute(
+                "SELECT id, module_id, case_id, entry FROM http_captures ORDER BY id"):
+            captures.setdefault((module_id, case_id), []).append(json.loads(entry))
+            self.last_capture_id = capture_id
+
+        steps = {}
+        for module_id, case_id, extra in conn.execute(
+                "SELECT module_id, case_id, extra FROM steps ORDER BY module_id, case_id, position"):
+            steps.setdefault((module_id, case_id), []).append(json.loads(extra))
+
+        screenshots = {}
+        for module_id, case_id, extra in conn.execute(
+                "SELECT module_id, case_id, extra FROM screenshots ORDER BY module_id, case_id, position"):
+            screenshots.setdefault((module_id, case_id), []).append(json.loads(extra))
+
+        data = []
+        modules = {}
+        for module_id, extra in conn.execute("SELECT id, extra FROM modules ORDER BY position"):
+            module = json.loads(extra)
+            module["caseVoList"] = []
+            modules[module_id] = module
+            data.append(module)
+
+        for module_id, case_id, is_tested, completion, extra in conn.execute(
+                "SELECT module_id, id, is_tested, completion, extra FROM cases ORDER BY module_id, position"):
+            case = json.loads(extra)
+            key = (module_id, case_id)
+            if "contentMap" not in case:
+                case["contentMap"] = steps.get(key, [])
+            http_results = merge_http_results([], captures.get(key, []))
+            image_results = screenshots.get(key)
+            case["httpResult"] = json.dumps(http_results, ensure_ascii=False) if http_results else None
+            case["imageResult"] = json.dumps(image_results, ensure_ascii=False) if image_results else None
+            case["isTested"] = bool(is_tested)
+            case["completion"] = completion
+            modules[module_id]["caseVoList"].append(case)
+        return data
+
+    def collect_captures(self, find_case, skip=(), leftovers=False):
+        # 读取 mitmproxy 新插入的抓包记录并追加到内存中的 httpResult
+        rows = self.connection().execute(
+            "SELECT id, module_id, case_id, entry FROM http_captures WHERE id > ? ORDER BY id",
+            (self.last_capture_id,)).fetchall()
+        new_entries = {}
+        for capture_id, module_id, case_id, entry in rows:
+            self.last_capture_id = capture_id
+            new_entries.setdefault((module_id, case_id), []).append(json.loads(entry))
+
+        for (module_id, case_id), entries in new_entries.items():
+            case = find_case(module_id, case_id)
+            if case is None:
+                logger.error(f"抓包记录对应的用例不存在: 模块 {module_id}, 用例 {case_id}")
+                continue
+            case["httpResult"] = json.dumps(merge_http_results(parse_json_list(case.get("httpResult")), entries),
+                                            ensure_ascii=False)
+        return []
+
+    def has_pending_captures(self):
+        return False
+
+    def append_captures(self, captures):
+        # 界面通过本地通道收到的抓包记录单行插入，合并时与代理脚本插入的记录一起读取
+        conn = self.connection()
+        with conn:
+            conn.executemany("INSERT INTO http_captures (module_id, case_id, entry) VALUES (?, ?, ?)",
+                             [(module_id, case_id, json.dumps(entry, ensure_ascii=False))
+                              for (module_id, case_id), entries in captures.items() for entry in entries])
+
+    def clear_captures(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM http_captures")
+
+    def case_rows(self, module_id, case_id, position, case):
+        extra = {key: value for key, value in case.items() if key not in self.case_fields}
+        content_map = case.get("contentMap")
+        step_rows = []
+        if isinstance(content_map, list):
+            del extra["contentMap"]
+            step_rows = [(module_id, case_id, step_pos, step.get("describe"), step.get("expect"),
+                          json.dumps(step, ensure_ascii=False))
+                         for step_pos, step in enumerate(content_map)]
+        screenshot_rows = [(module_id, case_id, image_pos, image.get("imageName"), image.get("remark"),
+                            json.dumps(image, ensure_ascii=False))
+                           for image_pos, image in enumerate(parse_json_list(case.get("imageResult")))]
+        case_row = (module_id, case_id, position, case.get("caseName"), int(bool(case.get("isTested"))),
+                    case.get("completion"), json.dumps(extra, ensure_ascii=False))
+        return case_row, step_rows, screenshot_rows
+
+    def write(self, snapshot, dirty_cases, cleanup):
+        conn = self.connection()
+        with conn:
+            if dirty_cases is None:
+                self.write_plan(conn, snapshot)
+                return
+
+            # 只更新被修改过的用例
+            for module_pos, module in enumerate(snapshot):
+                module_id = str(module["id"])
+                for case_pos, case in enumerate(module.get("caseVoList", [])):
+                    case_id = str(case["id"])
+                    if (module_id, case_id) not in dirty_cases:
+                        continue
+                    case_row, _, screenshot_rows = self.case_rows(module_id, case_id, case_pos, case)
+                    conn.execute("UPDATE cases SET is_tested = ?, completion = ?, extra = ? "
+                                 "WHERE module_id = ? AND id = ?",
+                                 (case_row[4], case_row[5], case_row[6], module_id, case_id))
+                    conn.execute("DELETE FROM screenshots WHERE module_id = ? AND case_id = ?",
+                                 (module_id, case_id))
+                    conn.executemany("INSERT INTO screenshots VALUES (?, ?, ?, ?, ?, ?)", screenshot_rows)
+
+    def write_plan(self, conn, data):
+        for table in ("modules", "cases", "steps", "screenshots"):
+            conn.execute(f"DELETE FROM {table}")
+        for module_pos, module in enumerate(data):
+            self.insert_module(conn, module_pos, module)
+
+    def insert_module(self, conn, module_pos, module):
+        module_id = str(module["id"])
+        extra = {key: value for key, value in module.items() if key != "caseVoList"}
+        conn.execute("INSERT INTO modules VALUES (?, ?, ?, ?)",
+                     (module_id, module_pos, module.get("name"), json.dumps(extra, ensure_ascii=False)))
+        for case_pos, case in enumerate(module.get("caseVoList", [])):
+            case_row, step_rows, screenshot_rows = self.case_rows(module_id, str(case["id"]), case_pos, case)
+            conn.execute("INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?, ?)", case_row)
+            conn.executemany("INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?)", step_rows)
+            conn.executemany("INSERT INTO screenshots VALUES (?, ?, ?, ?, ?, ?)", screenshot_rows)
+
+    def insert_captures(self, conn, module):
+        # 抓包记录从 httpResult 中拆分为单行
+        for case in module.get("caseVoList", []):
+            conn.executemany(
+                "INSERT INTO http_captures (module_id, case_id, entry) VALUES (?, ?, ?)",
+                [(str(module["id"]), str(case["id"]), json.dumps(entry, ensure_ascii=False))
+                 for entry in parse_json_list(case.get("httpResult"))])
+
+    def update_last_capture_id(self, conn):
+        self.last_capture_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM http_captures").fetchone()[0]
+
+    def replace_all(self, data):
+        # 整体替换计划和抓包记录
+        conn = self.connection()
+        with conn:
+            self.write_plan(conn, snapshot_plan(data))
+            conn.execute("DELETE FROM http_captures")
+            for module in data:
+                self.insert_captures(conn, module)
+        self.update_last_capture_id(conn)
+
+    def begin_import(self):
+        return SqlitePlanImportWriter(self)
+
+
+class SqlitePlanImportWriter:
+    # 流式导入时逐个模块插入，整个导入在一个事务中完成，失败时回滚
+    def __init__(self, store):
+        self.store = store
+        self.conn = store.connection()
+        for table in ("modules", "cases", "steps", "screenshots", "http_captures"):
+            self.conn.execute(f"DELETE FROM {table}")
+        self.count = 0
+
+    def add_module(self, module):
+        self.store.insert_module(self.conn, self.count, module)
+        self.store.insert_captures(self.conn, module)
+        self.count += 1
+
+    def commit(self, modules):
+        # 模块按 ID 排序后更新位置
+        self.conn.executemany("UPDATE modules SET position = ? WHERE id = ?",
+                              [(module_pos, str(module["id"])) for module_pos, module in enumerate(modules)])
+        self.conn.commit()
+        self.store.update_last_capture_id(self.conn)
+
+    def abort(self):
+        self.conn.rollback()
+
+
+class PlanImporter(QObject):
+    # 在持久化线程中流式导入用例文件：逐个模块解析、校验并写入当前存储
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)  # 整个计划按引用传递，list 类型会被逐项转换为 QVariantList
+    failed = pyqtSignal(str)
+
+    def __init__(self, persister, parent=None):
+        super().__init__(parent)
+        self.persister = persister
+
+    def start(self, file_path):
+        # 与持久化写入共用同一个线程，避免和后台保存交错
+        self.persister.suspend()
+        self.persister.executor.submit(self.run, self.persister.store, file_path)
+
+    def run(self, store, file_path):
+        writer = None
+        try:
+            total = max(os.path.getsize(file_path), 1)
+            writer = store.begin_import()
+            modules = []
+            last_percent = -1
+            for module, bytes_read in iter_json_array(file_path):
+                validate_module(module, len(modules))
+                writer.add_module(module)
+                modules.append(module)
+                percent = int(bytes_read * 100 / total)
+                if percent != last_percent:
+                    last_percent = percent
+                    self.progress.emit(percent)
+            modules.sort(key=lambda x: x['id'])
+            writer.commit(modules)
+            self.finished.emit(modules)
+        except Exception as e:
+            if writer is not None:
+                writer.abort()
+            logger.error(f"导入文件时发生错误: {str(e)}")
+            self.failed.emit(str(e))
+
+
+class PlanPersister(QObject):
+    # 计划持久化：记录脏用例，短暂防抖后合并为一次后台写入
+    # 本地通道收到的抓包记录不标记脏用例，只在后台追加写入，浏览器关闭、导出和退出时才合并进 httpResult
+    # HAR 条目也由代理脚本经通道发来，在同一个写入线程中追加到 HAR 日志
+    def __init__(self, store, get_data, find_case, parent=None, debounce_ms=300):
+        super().__init__(parent)
+        self.store = store
+        self.get_data = get_data
+        self.find_case = find_case
+        self.dirty_cases = set()
+        self.all_dirty = False
+        # 尚未合并的实时抓包记录，只用于显示；unwritten_captures 为还没交给写入线程的部分
+        self.pending_captures = {}
+        self.unwritten_captures = {}
+        self.failed_captures = {}
+        self.unwritten_har = {}
+        self.failed_har = {}
+        self.captures_lock = threading.Lock()
+        self.append_future = None
+        # 已合并进内存、等待写入成功后删除的抓包日志；写入完成前再次合并时跳过它们
+        self.consumed_journals = set()
+        self.consumed_lock = threading.Lock()
+        self.leftovers_folded = False
+        self.suspended = False
+        self.future = None
+        self.executor = ThreadPoolExecutor(max_workers=1)  # 单线程保证写入顺序
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.save_in_background)
+
+        self.append_timer = QTimer(self)
+        self.append_timer.setSingleShot(True)
+        self.append_timer.setInterval(debounce_ms)
+        self.append_timer.timeout.connect(self.append_captures)
+
+    def mark_dirty(self, module_id=None, case_id=None):
+        if case_id is None:
+            self.all_dirty = True
+        else:
+            self.dirty_cases.add((module_id, case_id))
+        self.schedule()
+
+    def add_captures(self, module_id, case_id, entries):
+        # 代理脚本通过本地通道实时发来的抓包记录，防抖后成批追加写入，不重写计划
+        self.pending_captures.setdefault((module_id, case_id), []).extend(entries)
+        self.unwritten_captures.setdefault((module_id, case_id), []).extend(entries)
+        if not self.append_timer.isActive():
+            self.append_timer.start()
+
+    def add_har_entries(self, module_id, case_id, entries):
+        # HAR 条目只在导出时使用，不显示，与抓包记录一起防抖追加
+        self.unwritten_har.setdefault((module_id, case_id), []).extend(entries)
+        if not self.append_timer.isActive():
+            self.append_timer.start()
+
+    def append_captures(self):
+        self.append_timer.stop()
+        # 上次追加失败的 HAR 条目排在前面重新写入
+        with self.captures_lock:
+            failed_har, self.failed_har = self.failed_har, {}
+        for key, entries in failed_har.items():
+            self.unwritten_har.setdefault(key, [])[:0] = entries
+        if not (self.unwritten_captures or self.unwritten_har):
+            return
+        captures, self.unwritten_captures = self.unwritten_captures, {}
+        har_entries, self.unwritten_har = self.unwritten_har, {}
+        self.append_future = self.executor.submit(self.write_captures, self.store, captures, har_entries)
+
+    def write_captures(self, store, captures, har_entries):
+        if captures:
+            try:
+                store.append_captures(captures)
+            except Exception as e:
+                # 写入失败的记录在合并时处理：随计划一起保存，或重新排队追加
+                logger.error(f"保存抓包记录时发生错误: {e}")
+                with self.captures_lock:
+                    for key, entries in captures.items():
+                        self.failed_captures.setdefault(key, []).extend(entries)
+        for (module_id, case_id), entries in har_entries.items():
+            try:
+                append_json_lines(get_har_journal_path(module_id, case_id), entries)
+            except OSError as e:
+                logger.error(f"保存 HAR 条目时发生错误: {e}")
+                with self.captures_lock:
+                    self.failed_har.setdefault((module_id, case_id), []).extend(entries)
+
+    def fold_captures(self):
+        # 浏览器关闭、导出和退出时调用：等实时抓包记录写完，再与代理脚本写入的记录一起合并进 httpResult
+        if self.get_data() is None or self.suspended:
+            return
+        if not self.store.saves_http_result:
+            self.retry_failed_captures()
+        self.append_captures()
+        if self.append_future is not None:
+            self.append_future.result()
+            self.append_future = None
+
+        # 上次运行遗留的 .compacting 日志只在启动后第一次合并时读取
+        with self.consumed_lock:
+            in_flight = set(self.consumed_journals)
+        consumed = self.store.collect_captures(self.find_case, in_flight, not self.leftovers_folded)
+        self.leftovers_folded = True
+        self.pending_captures = {}
+
+        if self.store.saves_http_result:
+            with self.captures_lock:
+                failed, self.failed_captures = self.failed_captures, {}
+        else:
+            # SQLite 不保存 httpResult，并入内存会在退出时丢失；留到下次合并（包括退出时）重新追加，
+            # 期间仍作为未合并记录显示
+            with self.captures_lock:
+                retry = {key: list(entries) for key, entries in self.failed_captures.items()}
+            for key, entries in retry.items():
+                self.pending_captures.setdefault(key, []).extend(entries)
+            failed = {}
+        for (module_id, case_id), entries in failed.items():
+            case = self.find_case(module_id, case_id)
+            if case is None:
+                logger.error(f"抓包记录对应的用例不存在: 模块 {module_id}, 用例 {case_id}")
+                continue
+            case["httpResult"] = json.dumps(merge_http_results(parse_json_list(case.get("httpResult")), entries),
+                                            ensure_ascii=False)
+            self.dirty_cases.add((module_id, case_id))
+
+        if consumed:
+            with self.consumed_lock:
+                self.consumed_journals.update(consumed)
+        if consumed or failed:
+            self.schedule()
+
+    def retry_failed_captures(self):
+        # 之前追加失败的记录重新排队，仍在 pending_captures 中显示
+        with self.captures_lock:
+            failed, self.failed_captures = self.failed_captures, {}
+        for key, entries in failed.items():
+            self.unwritten_captures.setdefault(key, [])[:0] = entries
+
+    def discard_captures(self):
+        # 重置测试结果前调用：丢弃尚未合并的抓包记录，等待写入线程中的追加完成后再清空存储
+        self.append_timer.stop()
+        self.pending_captures = {}
+        self.unwritten_captures = {}
+        self.unwritten_har = {}
+        if self.append_future is not None:
+            self.append_future.result()
+            self.append_future = None
+        with self.captures_lock:
+            self.failed_captures = {}
+            self.failed_har = {}
+        with self.consumed_lock:
+            self.consumed_journals.clear()
+
+    def schedule(self):
+        # 计时器已启动时不再重新计时，连续的修改合并到同一次写入
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def is_dirty(self):
+        return self.all_dirty or bool(self.dirty_cases)
+
+    def suspend(self):
+        # 导入期间暂停保存，先把已有修改写入
+        self.flush()
+        self.suspended = True
+
+    def resume(self, discard_changes=False):
+        self.suspended = False
+        if discard_changes:
+            # 计划已被整体替换，旧数据上的修改不再需要保存
+            self.dirty_cases = set()
+            self.all_dirty = False
+            self.discard_captures()
+        elif self.is_dirty():
+            self.schedule()
+
+    def save_in_background(self):
+        self.timer.stop()
+        data = self.get_data()
+        if data is None or self.suspended:
+            return
+
+        # 之前写入失败的日志也一起清理，写入成功后才删除
+        with self.consumed_lock:
+            cleanup = list(self.consumed_journals)
+        if not (self.is_dirty() or cleanup):
+            return
+        # 在界面线程中做浅拷贝，后台线程只负责序列化和写盘
+        snapshot = snapshot_plan(data)
+
+        dirty_cases = None if self.all_dirty else self.dirty_cases
+        self.dirty_cases = set()
+        self.all_dirty = False
+        self.future = self.executor.submit(self.write, self.store, snapshot, dirty_cases, cleanup)
+
+    def write(self, store, snapshot, dirty_cases, cleanup):
+        try:
+            store.write(snapshot, dirty_cases, cleanup)
+            with self.consumed_lock:
+                self.consumed_journals.difference_update(cleanup)
+            logger.info(f"计划已保存 ({store.name})，修改用例数: "
+                        f"{'全部' if dirty_cases is None else len(dirty_cases)}")
+        except Exception as e:
+            logger.error(f"保存计划时发生错误: {e}")
+
+    def wait(self):
+        if self.future is not None:
+            self.future.result()
+
+    def flush(self):
+        # 合并抓包记录后立即写入并等待完成，用于导出和退出前
+        self.fold_captures()
+        self.save_in_background()
+        self.wait()
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown(wait=True)
+        if self.failed_captures:
+            lost = sum(len(entries) for entries in self.failed_captures.values())
+            logger.error(f"退出时仍有 {lost} 条抓包记录无法保存")
+        if self.failed_har:
+            lost = sum(len(entries) for entries in self.failed_har.values())
+            logger.error(f"退出时仍有 {lost} 条 HAR 条目无法保存")
+
+
+class ThumbnailTask(QRunnable):
+    # 在线程池中按目标尺寸解码截图并写入磁盘缓存
+    def __init__(self, cache, image_path, key):
+        super().__init__()
+        self.cache = cache
+        self.image_path = image_path
+        self.key = key
+
+    def run(self):
+        size = self.cache.thumbnail_size
+        reader = QImageReader(self.image_path)
+        reader.setAutoTransform(True)
+        original_size = reader.size()
+        if original_size.isValid():
+            reader.setScaledSize(original_size.scaled(size, size, Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            logger.error(f"生成缩略图失败: {self.image_path}: {reader.errorString()}")
+        elif not image.save(self.cache.disk_path(self.key), "PNG"):
+            logger.error(f"保存缩略图失败: {self.image_path}")
+        self.cache.image_ready.emit(self.image_path, self.key, image)
+
+
+class ThumbnailPruneTask(QRunnable):
+    # 在线程池中清理磁盘缩略图缓存
+    def __init__(self, cache, image_paths, pending):
+        super().__init__()
+        self.cache = cache
+        self.image_paths = image_paths
+        self.pending = pending
+
+    def run(self):
+        try:
+            self.cache.prune_disk(self.image_paths, self.pending)
+        except OSError as e:
+            logger.error(f"清理缩略图缓存失败: {e}")
+
+
+class ThumbnailCache(QObject):
+    # 截图缩略图缓存：内存 LRU + ~/.auto-test-recorder/thumbs 磁盘缓存，未命中时在后台生成
+    # 磁盘缓存在启动和导出后清理：删除源截图已删除或已变化的缩略图，再按最近使用时间限制总大小
+    image_ready = pyqtSignal(str, str, QImage)
+    thumbnail_loaded = pyqtSignal(str, QPixmap)
+
+    max_disk_bytes = 200 * 1024 * 1024
+
+    def __init__(self, thumbnail_size=300, max_entries=200, parent=None):
+        super().__init__(parent)
+        self.thumbnail_size = thumbnail_size
+        self.max_entries = max_entries
+        self.thumbs_dir = get_user_data_path("thumbs")
+        os.makedirs(self.thumbs_dir, exist_ok=True)
+        self.memory = OrderedDict()
+        self.pending = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.image_ready.connect(self.on_image_ready)
+
+    def key_for(self, image_path):
+        # 以路径、修改时间和大小为键，截图被替换后自动失效
+        stat = os.stat(image_path)
+        raw_key = f"{image_path}:{stat.st_mtime_ns}:{stat.st_size}:{self.thumbnail_size}"
+        return hashlib.sha1(raw_key.encode("utf-8")).hexdigest()
+
+    def disk_path(self, key):
+        return os.path.join(self.thumbs_dir, f"{key}.png")
+
+    def remember(self, key, pixmap):
+        self.memory[key] = pixmap
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, image_path):
+        # 命中缓存时直接返回缩略图，否则返回 None 并在后台生成，完成后发出 thumbnail_loaded
+        try:
+            key = self.key_for(image_path)
+        except OSError:
+            return None
+
+        pixmap = self.memory.get(key)
+        if pixmap is not None:
+            self.memory.move_to_end(key)
+            return pixmap
+
+        disk_path = self.disk_path(key)
+        if os.path.exists(disk_path):
+            pixmap = QPixmap(disk_path)
+            if not pixmap.isNull():
+                self.remember(key, pixmap)
+                # 修改时间记录最近一次使用，清理时先删除最久未使用的
+                try:
+                    os.utime(disk_path)
+                except OSError:
+                    pass
+                return pixmap
+
+        if key not in self.pending:
+            self.pending.add(key)
+            self.pool.start(ThumbnailTask(self, image_path, key))
+        return None
+
+    def on_image_ready(self, image_path, key, image):
+        self.pending.discard(key)
+        if image.isNull():
+            return
+        # QPixmap 只能在界面线程中创建
+        pixmap = QPixmap.fromImage(image)
+        self.remember(key, pixmap)
+        self.thumbnail_loaded.emit(image_path, pixmap)
+
+    def prune(self, image_paths):
+        # image_paths 为仍被引用的截图，在后台清理；正在生成的缩略图也保留
+        self.pool.start(ThumbnailPruneTask(self, list(image_paths), set(self.pending)))
+
+    def prune_disk(self, image_paths, pending=()):
+        live_keys = set()
+        for image_path in image_paths:
+            try:
+                live_keys.add(self.key_for(image_path))
+            except OSError:
+                continue
+        live_keys.update(pending)
+
+        # 键由路径、修改时间和大小算出，源截图删除或重新编码后旧键不会再被使用
+        kept = []
+        for name in os.listdir(self.thumbs_dir):
+            path = os.path.join(self.thumbs_dir, name)
+            try:
+                if name.endswith(".png") and name[:-len(".png")] in live_keys:
+                    stat = os.stat(path)
+                    kept.append((stat.st_mtime_ns, stat.st_size, path))
+                else:
+                    os.remove(path)
+            except OSError as e:
+                logger.error(f"删除缩略图失败: {name}: {e}")
+
+        total = sum(size for _, size, _ in kept)
+        for _, size, path in sorted(kept):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                logger.error(f"删除缩略图失败: {path}: {e}")
+
+
+class ExportThread(QThread):
+    # 后台导出：import.json 直接流式写入压缩包，截图不再压缩，完成后原子改名
+    # 增量导出时只打包清单中没有或内容有变化的截图，导出成功后才更新清单
+    progress = pyqtSignal(int)
+    succeeded = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    canceled = pyqtSignal()
+
+    chunk_size = 1024 * 1024
+
+    def __init__(self, snapshot, zip_filename, delta=False, parent=None):
+        super().__init__(parent)
+        self.snapshot = snapshot
+        self.zip_filename = zip_filename
+        self.delta = delta
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        part_path = self.zip_filename + ".part"
+        try:
+            screenshots_dir = get_user_data_path('screenshots')
+            manifest = load_export_manifest()
+            exported_at = datetime.datetime.now().isoformat(timespec='seconds')
+            screenshots = []
+            for name in get_export_screenshots(self.snapshot):
+                if self.cancel_event.is_set():
+                    raise InterruptedError()
+                path = os.path.join(screenshots_dir, name)
+                stat = os.stat(path)
+                entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                shipped = manifest.get(name)
+                if self.delta and shipped:
+                    if shipped.get("size") == stat.st_size and shipped.get("mtime_ns") == stat.st_mtime_ns:
+                        continue
+                    # 时间戳变了但内容可能没变，比较哈希后再决定
+                    entry["sha256"] = file_sha256(path)
+                    if entry["sha256"] == shipped.get("sha256"):
+                        manifest[name] = dict(shipped, **entry)
+                        continue
+                screenshots.append((name, path, entry))
+
+            har_journals = get_har_journals()
+
+            # 进度按字节计算，import.json 按一张截图的权重估算
+            total = (sum(entry["size"] for _, _, entry in screenshots)
+                     + sum(size for _, _, size in har_journals) + self.chunk_size)
+            done = 0
+
+            with zipfile.ZipFile(part_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zipf:
+                with io.TextIOWrapper(zipf.open("import.json", 'w', force_zip64=True), encoding='utf-8') as entry:
+                    self.write_json(entry)
+                done += self.chunk_size
+                self.progress.emit(int(done * 100 / total))
+
+                # 每个用例一个 HAR 文件，逐条从抓包日志拼接，不在内存中构建
+                for arcname, path, size in har_journals:
+                    with io.TextIOWrapper(zipf.open(arcname, 'w', force_zip64=True), encoding='utf-8') as entry:
+                        self.write_har(entry, path)
+                    done += size
+                    self.progress.emit(int(done * 100 / total))
+
+                # 将图片文件添加到ZIP文件的image文件夹下，PNG 已压缩，直接存储
+                for name, path, entry in screenshots:
+                    zinfo = zipfile.ZipInfo.from_file(path, arcname=os.path.join('image', name))
+                    zinfo.compress_type = zipfile.ZIP_STORED
+                    digest = hashlib.sha256()
+                    with open(path, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+                        while True:
+                            if self.cancel_event.is_set():
+                                raise InterruptedError()
+                            chunk = src.read(self.chunk_size)
+                            if not chunk:
+                                break
+                            dst.write(chunk)
+                            digest.update(chunk)
+                            done += len(chunk)
+                            self.progress.emit(int(done * 100 / total))
+                    entry["sha256"] = digest.hexdigest()
+                    entry["exported_at"] = exported_at
+                    manifest[name] = entry
+
+            os.replace(part_path, self.zip_filename)
+            write_json_atomic(get_user_data_path('export_manifest.json'), {"files": manifest})
+            self.succeeded.emit(self.zip_filename)
+        except InterruptedError:
+            self.remove_part(part_path)
+            self.canceled.emit()
+        except Exception as e:
+            self.remove_part(part_path)
+            self.failed.emit(str(e))
+
+    def write_json(self, entry):
+        # 逐个模块写出，快照中的用例是浅拷贝，可以直接修正字段，无需深度拷贝
+        entry.write("[")
+        for module_pos, module in enumerate(self.snapshot):
+            if self.cancel_event.is_set():
+                raise InterruptedError()
+            # 预处理数据,确保httpResult字段为null或有效的数组，并修正completion字段
+            for case in module.get("caseVoList", []):
+                if not case.get("httpResult"):
+                    case["httpResult"] = None
+                if case.get("completion") is None:
+                    case["completion"] = 0
+            entry.write(",\n" if module_pos else "\n")
+            json.dump(module, entry, ensure_ascii=False, indent=4)
+        entry.write("\n]")
+
+    def write_har(self, entry, journal_path):
+        entry.write('{"log": {"version": "1.2", "creator": {"name": "auto-test-recorder", "version": "1.0"}, '
+                    '"pages": [], "entries": [')
+        count = 0
+        with open(journal_path, 'r', encoding='utf-8') as journal:
+            for line in journal:
+                if self.cancel_event.is_set():
+                    raise InterruptedError()
+                # 没有换行结尾的是写了一半的最后一行，跳过
+                if not line.endswith("\n") or not line.strip():
+                    continue
+                entry.write(",\n" if count else "\n")
+                entry.write(line.rstrip("\n"))
+                count += 1
+        entry.write("\n]}}\n")
+
+    def remove_part(self, part_path):
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+
+
+class ScreenshotTask(QRunnable):
+    # 截图后处理：校验、按需重新编码，再按内容哈希存入截图目录（<sha256>.png）
+    # 收件箱中的原文件在界面线程记录结果后才删除，中途退出时重新执行结果相同
+    def __init__(self, processor, job):
+        super().__init__()
+        self.processor = processor
+        self.job = job
+
+    def run(self):
+        job = self.job
+        try:
+            source = job["source"]
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"截图文件不存在: {source}")
+
+            reader = QImageReader(source)
+            if not reader.canRead() or not reader.size().isValid():
+                raise ValueError(f"截图文件无效: {reader.errorString()}")
+
+            # 重新编码的结果写在截图目录中，避免收件箱监听把临时文件当成新截图
+            stored_path = source
+            if job.get("reencode"):
+                image = reader.read()
+                if image.isNull():
+                    raise ValueError(f"截图文件无效: {reader.errorString()}")
+                stored_path = os.path.join(self.processor.screenshots_dir, f".{job['id']}.reencode")
+                if not image.save(stored_path, "PNG", 0):  # PNG 质量 0 即最高压缩
+                    raise IOError(f"重新编码截图失败: {source}")
+
+            try:
+                image_name = f"{file_sha256(stored_path)}.png"
+                dest_path = os.path.join(self.processor.screenshots_dir, image_name)
+                # 相同内容的截图只保存一份
+                if not os.path.exists(dest_path):
+                    temp_path = dest_path + ".part"
+                    try:
+                        os.link(stored_path, temp_path)
+                    except OSError:
+                        shutil.copyfile(stored_path, temp_path)
+                    os.replace(temp_path, dest_path)
+            finally:
+                if stored_path != source:
+                    os.remove(stored_path)
+
+            job["imageName"] = image_name
+            self.processor.processed.emit(job)
+        except Exception as e:
+            self.processor.failed.emit(job, str(e))
+
+
+class CaptureTask(QRunnable):
+    # 进程内截图：在线程池中用 mss 抓取屏幕并编码为 PNG，写完后改名到收件箱
+    def __init__(self, capturer, screenshot_path, mode, cursor_pos, driver):
+        super().__init__()
+        self.capturer = capturer
+        self.screenshot_path = screenshot_path
+        self.mode = mode
+        self.cursor_pos = cursor_pos
+        self.driver = driver
+
+    def run(self):
+        part_path = self.screenshot_path + ".part"
+        try:
+            # mss 实例不能跨线程使用，每次截图单独创建；首次截图时才导入
+            from mss import mss, tools
+            with mss() as sct:
+                shot = sct.grab(self.capture_region(sct))
+            tools.to_png(shot.rgb, shot.size, output=part_path)
+            os.replace(part_path, self.screenshot_path)
+        except Exception as e:
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            self.capturer.failed.emit(self.screenshot_path, str(e))
+
+    def capture_region(self, sct):
+        # monitors[0] 是所有屏幕拼成的整体区域
+        if self.mode == "monitor":
+            x, y = self.cursor_pos
+            for monitor in sct.monitors[1:]:
+                if (monitor["left"] <= x < monitor["left"] + monitor["width"]
+                        and monitor["top"] <= y < monitor["top"] + monitor["height"]):
+                    return monitor
+        elif self.mode == "browser" and self.driver is not None:
+            # 只有浏览器区域截图才用到 selenium
+            from selenium.common.exceptions import WebDriverException
+            try:
+                rect = self.driver.get_window_rect()
+                if rect["width"] > 0 and rect["height"] > 0:
+                    return {"left": rect["x"], "top": rect["y"], "width": rect["width"], "height": rect["height"]}
+            except WebDriverException as e:
+                logger.warning(f"获取浏览器窗口位置失败，改为全屏截图: {e}")
+        return sct.monitors[0]
+
+
+class ScreenCapturer(QObject):
+    # 截图后端：external 调用系统截图工具，mss 在进程内截图
+    # 两种方式都把截图放进收件箱，由 ScreenshotHandler 统一触发描述对话框
+    failed = pyqtSignal(str, str)
+
+    backends = ("external", "mss")
+    modes = ("fullscreen", "monitor", "browser")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+    def capture(self, backend, mode, screenshot_path, driver=None):
+        if backend == "mss":
+            cursor = QCursor.pos()
+            self.pool.start(CaptureTask(self, screenshot_path, mode, (cursor.x(), cursor.y()), driver))
+        else:
+            subprocess.Popen(["/usr/bin/deepin-screen-recorder", "-n", "-s", screenshot_path])
+
+
+class ScreenshotPostProcessor(QObject):
+    # 截图后处理队列：任务在线程池中执行，完成后通过信号交给界面线程记录结果
+    # 未完成的任务保存在 pending_screenshots.json 中，重启后继续处理
+    processed = pyqtSignal(dict)
+    failed = pyqtSignal(dict, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.queue_path = get_user_data_path("pending_screenshots.json")
+        self.screenshots_dir = get_user_data_path("screenshots")
+        os.makedirs(self.screenshots_dir, exist_ok=True)
+        self.jobs = OrderedDict()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)  # 按提交顺序处理，保证同一用例的截图顺序
+        self.load_queue()
+
+    def load_queue(self):
+        if not os.path.exists(self.queue_path):
+            return
+        try:
+            with open(self.queue_path, "r", encoding="utf-8") as file:
+                for job in json.load(file):
+                    self.jobs[job["id"]] = job
+        except Exception as e:
+            logger.error(f"读取截图处理队列失败: {e}")
+
+    def save_queue(self):
+        try:
+            write_json_atomic(self.queue_path, list(self.jobs.values()))
+        except Exception as e:
+            logger.error(f"保存截图处理队列失败: {e}")
+
+    def resume_pending(self):
+        for job in self.jobs.values():
+            logger.info(f"继续处理未完成的截图: {job['source']}")
+            self.pool.start(ScreenshotTask(self, job))
+
+    def submit(self, source, module_id, case_id, remark, reencode=False):
+        job = {
+            "id": uuid.uuid4().hex,
+            "source": source,
+            "imageName": None,
+            "module_id": module_id,
+            "case_id": case_id,
+            "remark": remark,
+            "reencode": reencode
         }
+        self.jobs[job["id"]] = job
+        self.save_queue()
+        self.pool.start(ScreenshotTask(self, job))
+
+    def complete(self, job):
+        self.jobs.pop(job["id"], None)
+        self.save_queue()
+        try:
+            os.remove(job["source"])
+        except OSError:
+            pass
+
+    def is_pending(self, path):
+        return any(job["source"] == path for job in self.jobs.values())
+
+    def pending_images(self):
+        # 已存入截图目录但结果尚未记录的截图，回收时不能删除
+        return {job["imageName"] for job in self.jobs.values() if job.get("imageName")}
+
+
+class ProxyManager:
+    # mitmdump 进程管理：使用配置的端口或自动选择空闲端口，启动后在后台探测监听是否就绪
+    probe_interval = 0.05
+
+    def __init__(self, script_path, log_path):
+        self.script_path = script_path
+        self.log_path = log_path
+        self.process = None
+        self.log_file = None
+        self.port = None
+        self.error = None
+        self.ready = threading.Event()
+
+    @staticmethod
+    def pick_free_port():
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    @staticmethod
+    def is_port_taken(port):
+        # 试绑定端口；Windows 上 SO_REUSEADDR 允许抢占已监听的端口，只在其他平台设置（避开 TIME_WAIT）
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            if os.name != "nt":
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind(("127.0.0.1", port))
+            except OSError:
+                return True
+        return False
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, configured_port=0, extra_args=(), timeout=15):
+        # 立即返回，端口已确定，可以先用它启动浏览器；需要时调用 wait_ready 等待监听
+        # configured_port 只来自设置中的 proxy_port，为 0 时自动选择端口
+        previous_port = self.port
+        self.stop()
+        self.error = None
+        self.ready.clear()
+        if configured_port:
+            self.port = configured_port
+            if self.is_port_taken(self.port):
+                # 端口被其他进程占用时连接探测也会成功，不能启动后再判断
+                self.error = f"设置的代理端口 {self.port} 已被其他程序占用，请在设置中更换代理端口"
+                logger.error(self.error)
+                self.ready.set()
+                return
+        elif previous_port and not self.is_port_taken(previous_port):
+            # 重启时沿用上次自动选择的端口，已打开的浏览器仍可使用；已被占用时另选
+            self.port = previous_port
+        else:
+            self.port = self.pick_free_port()
+        self.log_file = open(self.log_path, "a")
+        command = ["mitmdump", "--listen-host", "127.0.0.1", "--listen-port", str(self.port),
+                   "-s", self.script_path] + list(extra_args)
+        self.process = subprocess.Popen(command, stdout=self.log_file, stderr=self.log_file)
+        threading.Thread(target=self.probe, args=(self.process, self.port, timeout),
+                         name="proxy-probe", daemon=True).start()
+        logger.info(f"mitmdump 已启动，端口 {self.port}")
+
+    def probe(self, process, port, timeout):
+        # 连接探测有总时长限制；进程提前退出通常是端口被占用
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                self.error = f"mitmdump 已退出（退出码 {process.returncode}），端口 {port} 可能已被占用"
+                break
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                    pass
+            except OSError:
+                time.sleep(self.probe_interval)
+                continue
+            # 连上的可能是占用端口的其他进程，mitmdump 此时会因绑定失败退出
+            if process.poll() is not None:
+                self.error = f"mitmdump 已退出（退出码 {process.returncode}），端口 {port} 已被其他程序占用"
+            else:
+                logger.info(f"mitmdump 监听就绪，耗时 {(time.perf_counter() - started) * 1000:.0f} ms")
+            break
+        else:
+            self.error = f"等待 mitmdump 监听端口 {port} 超时"
+        if self.error:
+            logger.error(self.error)
+        self.ready.set()
+
+    def wait_ready(self, timeout=None):
+        # 返回 None 表示已就绪，否则返回错误信息
+        if not self.ready.wait(timeout):
+            return f"等待 mitmdump 监听端口 {self.port} 超时"
+        return self.error
+
+    def stop(self):
+        if self.process:
+            try:
+                self.process.terminate()
+                self.process.wait(timeout=5)  # 等待进程终止，最多等待5秒
+            except subprocess.TimeoutExpired:
+                self.process.kill()  # 如果无法正常终止，强制结束进程
+            except Exception as e:
+                logger.error(f"Error stopping mitmproxy: {e}")
+            finally:
+                self.process = None
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+
+
+class DriverManager:
+    # WebDriver 会话管理：在后台预启动上次使用的浏览器（最小化），开始测试时直接取用
+    # 预启动的会话以 (浏览器, 浏览器路径, 驱动路径, 代理端口) 为键，任一项变化时丢弃重建
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.warm = None
+
+    def prelaunch(self, launch_key):
+        with self.lock:
+            if self.warm is not None and self.warm["key"] == launch_key:
+                return
+            stale, self.warm = self.warm, None
+            entry = {"key": launch_key, "driver": None, "error": None, "done": threading.Event()}
+            self.warm = entry
+        self.discard(stale)
+        threading.Thread(target=self.launch_warm, args=(entry,), name="driver-prelaunch", daemon=True).start()
+
+    def launch_warm(self, entry):
+        try:
+            entry["driver"] = self.launch(entry["key"], "预启动")
+            entry["driver"].minimize_window()
+        except Exception as e:
+            entry["error"] = e
+            logger.error(f"预启动浏览器失败: {e}")
+        entry["done"].set()
+
+    def launch(self, launch_key, reason):
+        browser_choice, browser_path, driver_path, proxy_port = launch_key
+        started = time.perf_counter()
+        driver = create_webdriver(browser_choice, browser_path, driver_path, proxy_port)
+        logger.info(f"浏览器 {browser_choice} {reason}耗时: {(time.perf_counter() - started) * 1000:.0f} ms")
+        return driver
+
+    def acquire(self, launch_key):
+        # 优先使用预启动的会话（仍在启动中时等待其完成），否则立即启动新会话
+        with self.lock:
+            entry, self.warm = self.warm, None
+        if entry is not None and entry["key"] == launch_key:
+            entry["done"].wait()
+            driver = entry["driver"]
+            if driver is not None and is_session_alive(driver):
+                logger.info(f"使用预启动的浏览器 {launch_key[0]}")
+                return driver
+            self.discard(entry)
+        else:
+            self.discard(entry)
+        return self.launch(launch_key, "启动")
+
+    def discard(self, entry):
+        # 在后台关闭不再使用的预启动会话
+        if entry is None:
+            return
+
+        def quit_driver():
+            entry["done"].wait()
+            if entry["driver"] is not None:
+                try:
+                    entry["driver"].quit()
+                except Exception as e:
+                    logger.error(f"关闭预启动浏览器失败: {e}")
+
+        threading.Thread(target=quit_driver, name="driver-discard", daemon=True).start()
+
+    def discard_warm(self):
+        with self.lock:
+            entry, self.warm = self.warm, None
+        self.discard(entry)
+
+    def shutdown(self):
+        with self.lock:
+            entry, self.warm = self.warm, None
+        if entry is not None and entry["done"].wait(5) and entry["driver"] is not None:
+            try:
+                entry["driver"].quit()
+            except Exception as e:
+                logger.error(f"关闭预启动浏览器失败: {e}")
+
+
+class BrowserLaunch(QObject):
+    # 在后台守护线程中取得浏览器会话并等待代理就绪，结果通过信号交给界面线程
+    # 界面取消或超时后结果不再需要，启动完成的浏览器在线程中关闭
+    # 驱动无响应时线程可能一直阻塞，守护线程在程序退出时直接结束，不会像 QThread 那样在销毁时中止程序
+    launched = pyqtSignal(object, str)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, driver_manager, proxy_manager, launch_key, current_driver=None):
+        super().__init__()
+        self.driver_manager = driver_manager
+        self.proxy_manager = proxy_manager
+        self.launch_key = launch_key
+        self.current_driver = current_driver  # 同一浏览器正在运行的会话，仍可用时直接复用
+        self.abandoned = False
+        self.thread = threading.Thread(target=self.run, name="browser-launch", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def wait(self, timeout=None):
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def abandon(self):
+        self.abandoned = True
+
+    def run(self):
+        try:
+            self.launch()
+        finally:
+            self.finished.emit()
+
+    def launch(self):
+        if self.current_driver is not None:
+            # 会话检查要请求驱动，驱动无响应时阻塞的是这个线程而不是界面
+            try:
+                alive = is_session_alive(self.current_driver)
+            except Exception as e:
+                logger.error(f"检查浏览器状态时发生错误: {e}")
+                alive = False
+            if alive:
+                if not self.abandoned:
+                    self.launched.emit(self.current_driver, "")
+                return
+            try:
+                self.current_driver.quit()
+            except Exception as e:
+                logger.error(f"关闭已失效的浏览器会话失败: {e}")
+
+        try:
+            driver = self.driver_manager.acquire(self.launch_key)
+        except Exception as e:
+            if not self.abandoned:
+                self.failed.emit(str(e))
+            return
+
+        if self.abandoned:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.error(f"关闭已取消启动的浏览器失败: {e}")
+            return
+
+        proxy_error = self.proxy_manager.wait_ready(timeout=10)
+        self.launched.emit(driver, proxy_error or "")
+
+
+class CaptureChannel(QObject):
+    # 与代理脚本之间的本地通道（Unix 套接字，每行一条 JSON 消息）
+    # 向脚本发送当前用例，接收实时抓包记录和 HAR 条目；计划和 HAR 日志只由界面写入
+    captured = pyqtSignal(str, str, dict)
+    har_captured = pyqtSignal(str, str, dict)
+
+    def __init__(self, socket_path, parent=None):
+        super().__init__(parent)
+        self.clients = []
+        self.current_case = {"type": "case", "module_id": None, "case_id": None, "storage": "json"}
+        self.server = QLocalServer(self)
+        QLocalServer.removeServer(socket_path)
+        if not self.server.listen(socket_path):
+            logger.error(f"本地抓包通道启动失败，将使用抓包日志: {self.server.errorString()}")
+        self.server.newConnection.connect(self.on_new_connection)
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            client = self.server.nextPendingConnection()
+            self.clients.append(client)
+            client.readyRead.connect(lambda client=client: self.read_messages(client))
+            client.disconnected.connect(lambda client=client: self.on_disconnected(client))
+            self.write_message(client, self.current_case)
+
+    def on_disconnected(self, client):
+        if client in self.clients:
+            self.clients.remove(client)
+        client.deleteLater()
+
+    def read_messages(self, client):
+        while client.canReadLine():
+            line = bytes(client.readLine())
+            try:
+                message = json.loads(line)
+            except ValueError:
+                logger.error(f"无法解析的抓包通道消息: {line[:200]}")
+                continue
+            if not isinstance(message.get("entry"), dict):
+                continue
+            if message.get("type") == "capture":
+                self.captured.emit(str(message["module_id"]), str(message["case_id"]), message["entry"])
+            elif message.get("type") == "har":
+                self.har_captured.emit(str(message["module_id"]), str(message["case_id"]), message["entry"])
+
+    def write_message(self, client, message):
+        client.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        client.flush()
+
+    def send_case(self, module_id, case_id, storage):
+        self.current_case = {"type": "case", "module_id": module_id, "case_id": case_id, "storage": storage}
+        for client in self.clients:
+            self.write_message(client, self.current_case)
+
+    def close(self):
+        # 代理进程退出后读取缓冲区中剩余的消息，再关闭通道
+        for client in list(self.clients):
+            while client.waitForReadyRead(50):
+                pass
+            self.read_messages(client)
+        self.server.close()
+
+
+class TrafficTableModel(QAbstractTableModel):
+    # 当前用例的抓包记录表：直接引用解析后的记录，只在视图绘制可见行时取值
+    # 打开用例时保持记录原有顺序，点击表头时才在本模型中排序
+    columns = ("方法", "状态", "URL", "耗时(ms)", "次数", "时间")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.case = None
+        self.http_result = None
+        self.entries = []
+        self.aggregate_rows = {}
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+
+    def set_entries(self, case, entries, http_result=None):
+        self.beginResetModel()
+        self.case = case
+        self.http_result = http_result
+        self.entries = [entry for entry in entries if isinstance(entry, dict)]
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.index_aggregates()
+        self.endResetModel()
+
+    def index_aggregates(self):
+        self.aggregate_rows = {entry["aggregateKey"]: row for row, entry in enumerate(self.entries)
+                               if entry.get("aggregateKey")}
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # 先算出整列的排序键再排一次序，不经过代理模型逐对调用 data() 比较
+        self.sort_column = column
+        self.sort_order = order
+        if column < 0 or len(self.entries) < 2:
+            return
+        self.layoutAboutToBeChanged.emit()
+        keys = [self.sort_value(entry, column) for entry in self.entries]
+        descending = order == Qt.DescendingOrder
+        try:
+            rows = sorted(range(len(keys)), key=keys.__getitem__, reverse=descending)
+        except TypeError:
+            # 同一列中混有不同类型的值（如 null）时按文本排序
+            keys = [str(key) for key in keys]
+            rows = sorted(range(len(keys)), key=keys.__getitem__, reverse=descending)
+        new_rows = [0] * len(rows)
+        for new_row, old_row in enumerate(rows):
+            new_rows[old_row] = new_row
+        self.entries = [self.entries[row] for row in rows]
+        self.index_aggregates()
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(new_rows[index.row()], index.column()) for index in persistent])
+        self.layoutChanged.emit()
+
+    def append_entry(self, entry):
+        # 聚合记录是累计值，替换已有的同一条记录，其余记录追加到末尾（已排序时再次点击表头重新排序）
+        key = entry.get("aggregateKey")
+        if key and key in self.aggregate_rows:
+            row = self.aggregate_rows[key]
+            self.entries[row] = entry
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
+            return
+        row = len(self.entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.entries.append(entry)
+        if key:
+            self.aggregate_rows[key] = row
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.columns[section]
+        return None
+
+    def sort_value(self, entry, column):
+        if column == 0:
+            return entry.get("method", "")
+        if column == 1:
+            return entry.get("status") or 0
+        if column == 2:
+            return entry.get("url", "")
+        if column == 3:
+            return entry.get("duration", -1)
+        if column == 4:
+            return entry.get("count", 1)
+        return entry.get("lastTime") or entry.get("time", "")
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            value = self.sort_value(entry, column)
+            if column == 3 and value < 0:
+                return ""
+            return str(value)
+        if role == Qt.ToolTipRole and column == 2:
+            return entry.get("url", "")
+        if role == Qt.ForegroundRole and column == 1 and (entry.get("status") or 0) >= 400:
+            return QBrush(QColor("#c0392b"))
+        return None
+
+
+class TrafficFilterProxyModel(QSortFilterProxyModel):
+    # 按状态码类别、URL 关键字和最小耗时过滤，直接读取源模型中的记录，不复制行
+    # 排序交给源模型，代理自身不排序（sortColumn 始终为 -1），新增的行只做过滤
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.status_class = 0
+        self.url_text = ""
+        self.min_duration = 0
+        self.setDynamicSortFilter(True)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def set_status_class(self, status_class):
+        self.status_class = status_class
+        self.invalidateFilter()
+
+    def set_url_text(self, text):
+        self.url_text = text.strip().lower()
+        self.invalidateFilter()
+
+    def set_min_duration(self, min_duration):
+        self.min_duration = min_duration
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        entry = self.sourceModel().entries[source_row]
+        if self.status_class and (entry.get("status") or 0) // 100 != self.status_class:
+            return False
+        if self.url_text and self.url_text not in entry.get("url", "").lower():
+            return False
+        if self.min_duration and entry.get("duration", -1) < self.min_duration:
+            return False
+        return True
+
+
+class CaseTreeModel(QAbstractItemModel):
+    # 左侧用例树的数据模型：直接读取内存中的计划，用例节点在展开时按批加载
+    # internalId 为 0 表示模块节点，否则为 模块位置 + 1 的用例节点
+    fetch_batch = 500
+
+    def __init__(self, checked_icon, unchecked_icon, parent=None):
+        super().__init__(parent)
+        self.checked_icon = checked_icon
+        self.unchecked_icon = unchecked_icon
+        self.plan = []
+        self.fetched = []
+        self.row_states = {}
+
+    def set_plan(self, data):
+        self.beginResetModel()
+        self.plan = data or []
+        self.fetched = [0] * len(self.plan)
+        self.row_states = {}
+        self.endResetModel()
+
+    def row_state(self, case):
+        # 行显示内容的依据：测试状态、标题和截图结果
+        return case.get("isTested", False), case["caseName"], case.get("imageResult")
+
+    def bug_count(self, module_pos, case_pos):
+        # Bug 数在行加载或变化时计算一次，绘制时不再解析 imageResult
+        key = (module_pos, case_pos)
+        state = self.row_states.get(key)
+        if state is None:
+            case = self.cases_of(module_pos)[case_pos]
+            state = self.row_states[key] = (self.row_state(case), len(parse_json_list(case.get("imageResult"))))
+        return state[1]
+
+    def cases_of(self, module_pos):
+        return self.plan[module_pos].get("caseVoList") or []
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        if parent.internalId() == 0:
+            return self.createIndex(row, column, parent.row() + 1)
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        if not parent.isValid():
+            return len(self.plan)
+        if parent.internalId() == 0:
+            return self.fetched[parent.row()]
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 3
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self.plan)
+        if parent.internalId() == 0:
+            return bool(self.cases_of(parent.row()))
+        return False
+
+    def canFetchMore(self, parent):
+        if not parent.isValid() or parent.internalId() != 0:
+            return False
+        return self.fetched[parent.row()] < len(self.cases_of(parent.row()))
+
+    def fetchMore(self, parent):
+        module_pos = parent.row()
+        start = self.fetched[module_pos]
+        end = min(start + self.fetch_batch, len(self.cases_of(module_pos)))
+        if end <= start:
+            return
+        self.beginInsertRows(parent, start, end - 1)
+        self.fetched[module_pos] = end
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if index.internalId() == 0:
+            module = self.plan[index.row()]
+            if role == Qt.DisplayRole:
+                return [str(module["id"]), module["name"], ""][index.column()]
+            return None
+
+        case = self.cases_of(index.internalId() - 1)[index.row()]
+        if role == Qt.DisplayRole:
+            if index.column() == 2:
+                count = self.bug_count(index.internalId() - 1, index.row())
+                return str(count) if count else ""
+            return str(case["id"]) if index.column() == 0 else case["caseName"]
+        if role == Qt.DecorationRole and index.column() == 1:  # 设置图标在第二列
+            return self.checked_icon if case.get("isTested", False) else self.unchecked_icon
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return ["ID", "名称", "Bug"][section]
+        return None
+
+    def case_ids(self, index):
+        # 返回 (模块ID, 用例ID)，模块节点返回 None
+        if not index.isValid() or index.internalId() == 0:
+            return None
+        module_pos = index.internalId() - 1
+        case = self.cases_of(module_pos)[index.row()]
+        return str(self.plan[module_pos]["id"]), str(case["id"])
+
+    def case_model_index(self, module_pos, case_pos, column=0):
+        module_index = self.index(module_pos, 0)
+        # 目标用例尚未加载时先加载到该位置
+        while self.fetched[module_pos] <= case_pos and self.canFetchMore(module_index):
+            self.fetchMore(module_index)
+        return self.index(case_pos, column, module_index)
+
+    def case_changed(self, module_pos, case_pos):
+        # 只通知一行变化，未加载的行在加载时自然读取最新数据
+        self.row_states.pop((module_pos, case_pos), None)
+        if case_pos < self.fetched[module_pos]:
+            module_index = self.index(module_pos, 0)
+            self.dataChanged.emit(self.index(case_pos, 0, module_index), self.index(case_pos, 2, module_index))
+
+    def refresh(self):
+        # 对比已加载且已计算过状态的行，只通知显示内容有变化的行
+        for (module_pos, case_pos), (state, _) in list(self.row_states.items()):
+            if self.row_state(self.cases_of(module_pos)[case_pos]) != state:
+                self.case_changed(module_pos, case_pos)
+
+
+class CaseIndex:
+    # 用例索引：(模块ID, 用例ID) -> 用例字典、用例位置和模块位置（也是树模型中的行号）
+    # 同时维护每个模块未测试的用例数，状态窗口显示剩余数量时不再遍历整个计划
+    # 以及每张截图（按内容哈希命名）被多少条截图结果引用，删除截图时不再遍历整个计划
+    def __init__(self):
+        self.cases = {}
+        self.modules = {}
+        self.remaining_cases = 0
+        self.remaining_modules = 0
+        self.image_refs = Counter()
+
+    def rebuild(self, data):
+        self.cases = {}
+        self.modules = {}
+        self.remaining_cases = 0
+        self.remaining_modules = 0
+        self.image_refs = count_image_references(data)
+        for module_pos, module in enumerate(data or []):
+            module_id = str(module["id"])
+            untested = 0
+            for case_pos, case in enumerate(module.get("caseVoList", [])):
+                self.cases[(module_id, str(case["id"]))] = {
+                    "case": case,
+                    "case_pos": case_pos,
+                    "module_pos": module_pos
+                }
+                if not case.get("isTested"):
+                    untested += 1
+            self.modules[module_id] = {"module": module, "module_pos": module_pos, "untested": untested}
+            self.remaining_cases += untested
+            if untested:
+                self.remaining_modules += 1
+
+    def set_tested(self, module_id, case_id, is_tested):
+        # 修改测试状态都经过这里，剩余数量随之增减
+        entry = self.cases.get((module_id, case_id))
+        if entry is None:
+            return
+        was_tested = bool(entry["case"].get("isTested"))
+        entry["case"]["isTested"] = is_tested
+        if was_tested == bool(is_tested):
+            return
+        module_entry = self.modules[module_id]
+        delta = -1 if is_tested else 1
+        module_entry["untested"] += delta
+        self.remaining_cases += delta
+        # 模块的未测试数在 0 和 1 之间变化时，剩余模块数随之变化
+        if module_entry["untested"] == (0 if is_tested else 1):
+            self.remaining_modules += delta
+
+    def set_images(self, case, images):
+        # 修改截图结果都经过这里，引用计数随之增减
+        self.image_refs.subtract(iter_image_names(case.get("imageResult")))
+        case["imageResult"] = json.dumps(images, ensure_ascii=False) if images else None
+        self.image_refs.update(iter_image_names(images))
+
+    def get(self, module_id, case_id):
+        return self.cases.get((module_id, case_id))
+
+    def get_case(self, module_id, case_id):
+        entry = self.cases.get((module_id, case_id))
+        return entry["case"] if entry else None
+
+    def module_position(self, module_id):
+        entry = self.modules.get(module_id)
+        return entry["module_pos"] if entry else -1
 
 
 # noinspection PyUnresolvedReferences
@@ -343,13 +2105,22 @@ class App(QMainWindow):
         self.monitor_stop_event = threading.Event()
         self.driver = None
 
+        self.settings = QSettings("MyCompany", "MyApp")
+
         self.data = None
+        self.case_index = CaseIndex()
+        self.store = self.create_store(self.settings.value("storage_backend", "json"))
+        self.persister = PlanPersister(self.store, lambda: self.data, self.case_index.get_case, self)
         self.load_data_if_exists()
 
         # 确保这些属性在任何方法调用之前就被初始化
         self.current_case_id = None
         self.current_module_id = None
 
+        # 截图后端，设置菜单中需要显示当前选择
+        self.capture_backend = self.settings.value("capture_backend", "external")
+        self.capture_mode = self.settings.value("capture_mode", "fullscreen")
+
         self.create_widgets()
 
         # 创建状态窗口
@@ -366,13 +2137,23 @@ class App(QMainWindow):
         self.firefox_binary_path = ""
         self.chrome_binary_path = ""
         self.default_browser = 'Chrome'
-        self.settings = QSettings("MyCompany", "MyApp")
         self.load_settings()
 
-        # 初始化mitmproxy
-        self.mitmproxy_process = None
+        # 初始化mitmproxy，先启动本地通道再启动代理
+        self.capture_channel = CaptureChannel(get_user_data_path("capture.sock"), self)
+        self.capture_channel.captured.connect(self.on_http_captured)
+        self.capture_channel.har_captured.connect(self.on_har_captured)
+        self.proxy_manager = ProxyManager(get_resource_path("mitmproxy_script.py"),
+                                          get_user_data_path("mitmproxy.log"))
         self.start_mitmproxy()
 
+        # 浏览器会话：启动后在后台预启动上次使用的浏览器
+        self.driver_manager = DriverManager()
+        self.current_browser = None
+        self.browser_launch = None
+        self.browser_launches = set()  # 进行中（包括已取消）的启动，线程结束前保持引用
+        QTimer.singleShot(0, self.prelaunch_browser)
+
         # 加载快捷键设置或使用默认值
         self.prev_case_hotkey = self.settings.value("prev_case_hotkey", "f1")
         self.next_case_hotkey = self.settings.value("next_case_hotkey", "f2")
@@ -385,20 +2166,43 @@ class App(QMainWindow):
         self.custom_text = ""
 
         # 设置全局热键监听
+        self.hotkey_listener = None
         self.setup_global_hotkey_listener()
 
         # 连接信号
-        self.browserClosed.connect(self.load_and_display_data)
-        self.hotkey_listener.toggle_tested_signal.connect(self.toggle_tested)
         self.request_update_status.connect(self.delayed_update_status)  # 连接新的信号到槽
 
         self.settings_dialog = None
 
+        # 截图缩略图缓存
+        self.thumbnail_labels = {}
+        self.thumbnail_cache = ThumbnailCache(parent=self)
+        self.thumbnail_cache.thumbnail_loaded.connect(self.on_thumbnail_loaded)
+        self.prune_thumbnails()
+
         self.init_browser_settings()
 
         logger.info("App initialization completed")  # 添加这行来确认初始化完成
 
-        self.screenshot_temp_dir = tempfile.mkdtemp()
+        # 截图先保存在持久目录中，未处理完的截图在重启后仍然存在
+        self.screenshot_temp_dir = get_user_data_path("screenshot_inbox")
+        os.makedirs(self.screenshot_temp_dir, exist_ok=True)
+        self.screenshot_processor = ScreenshotPostProcessor(self)
+        self.screenshot_processor.processed.connect(self.on_screenshot_processed)
+        self.screenshot_processor.failed.connect(self.on_screenshot_failed)
+        self.screenshot_processor.resume_pending()
+
+        # 截图后端及从按下快捷键到弹出描述对话框的耗时
+        self.capture_started = {}
+        self.screen_capturer = ScreenCapturer(self)
+        self.screen_capturer.failed.connect(self.on_capture_failed)
+
+        # watchdog 在窗口显示后再导入和启动
+        self.screenshot_observer = None
+        QTimer.singleShot(0, self.start_screenshot_observer)
+
+    def start_screenshot_observer(self):
+        from watchdog.observers import Observer
         self.screenshot_observer = Observer()
         self.screenshot_handler = ScreenshotHandler(self.on_screenshot_taken)
         self.screenshot_observer.schedule(self.screenshot_handler, self.screenshot_temp_dir, recursive=False)
@@ -422,33 +2226,39 @@ class App(QMainWindow):
             logger.info(f"{browser} 路径: {self.settings.value(f'{browser}_path')}")
             logger.info(f"{browser} 驱动路径: {self.settings.value(f'{browser}_driver_path', '未设置')}")
 
+    def create_store(self, backend):
+        if backend == "sqlite":
+            store = SqlitePlanStore(get_user_data_path("plan.db"))
+            import_json_path = get_user_data_path("import.json")
+            # 首次启用 SQLite 时从 import.json 迁移
+            if not store.has_plan() and os.path.exists(import_json_path):
+                store.migrate_from_json(import_json_path)
+            return store
+        return JsonPlanStore(get_user_data_path("import.json"))
+
     def load_data_if_exists(self):
-        import_json_path = get_user_data_path("import.json")
-        if os.path.exists(import_json_path):
-            self.data = load_data(import_json_path)
+        if self.store.has_plan():
+            self.data = self.store.load()
+            self.case_index.rebuild(self.data)
+            # 合并上次运行遗留的抓包日志
+            if self.data and self.store.has_pending_captures():
+                self.persister.fold_captures()
         else:
             logger.info("No existing configuration found. Please import a configuration file.")
 
     def start_mitmproxy(self):
-        log_file = open(get_user_data_path("mitmproxy.log"), "a")
-        self.mitmproxy_process = subprocess.Popen(
-            ["mitmdump", "--listen-port", "8080", "-s", get_resource_path("mitmproxy_script.py")],
-            stdout=log_file, stderr=log_file)
+        extra_args = []
+        # 抓包内容的大小限制，未设置时使用脚本中的默认值
+        for option in ("capture_request_limit", "capture_response_limit", "capture_max_body_size",
+                       "capture_compressed", "capture_aggregate"):
+            value = self.settings.value(option)
+            if value is not None:
+                extra_args += ["--set", f"{option}={value}"]
+        # proxy_port 为 0 或未设置时自动选择空闲端口
+        self.proxy_manager.start(self.settings.value("proxy_port", 0, type=int), extra_args)
 
     def stop_mitmproxy(self):
-        if self.mitmproxy_process:
-            try:
-                self.mitmproxy_process.terminate()
-                self.mitmproxy_process.wait(timeout=5)  # 等待进程终止，最多等待5秒
-            except subprocess.TimeoutExpired:
-                self.mitmproxy_process.kill()  # 如果无法正常终止，强制结束进程
-            except Exception as e:
-                logger.error(f"Error stopping mitmproxy: {e}")
-            finally:
-                # 安全地关闭日志文件（如果存在）
-                if hasattr(self.mitmproxy_process, 'stdout') and self.mitmproxy_process.stdout:
-                    self.mitmproxy_process.stdout.close()
-                self.mitmproxy_process = None
+        self.proxy_manager.stop()
 
     def delayed_update_status(self):
         QTimer.singleShot(100, self.update_status_after_close)  # 在主线程中延迟执行
@@ -465,32 +2275,25 @@ class App(QMainWindow):
                 if reply != QMessageBox.Yes:
                     return
 
-            current_case['isTested'] = not current_status
+            self.case_index.set_tested(self.current_module_id, self.current_case_id, not current_status)
             current_case['completion'] = 1 if not current_status else 0
-            self.save_data()
+            self.persister.mark_dirty(self.current_module_id, self.current_case_id)
             self.save_current_test_case()
 
             # 更新树状图中的图标
             self.update_tree_item_icon(self.current_module_id, self.current_case_id, not current_status)
 
             self.update_status_windows()
-        self.load_and_display_data()
 
         # 切换回浏览器窗口
         if hasattr(self, 'driver') and self.driver:
             self.focus_browser_window()
 
     def update_tree_item_icon(self, module_id, case_id, is_tested):
-        root = self.tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            module_item = root.child(i)
-            if module_item.text(0) == module_id:
-                for j in range(module_item.childCount()):
-                    case_item = module_item.child(j)
-                    if case_item.text(0) == case_id:
-                        icon = self.checked_icon if is_tested else self.unchecked_icon
-                        case_item.setIcon(1, icon)
-                        return
+        # 图标由模型根据 isTested 提供，这里只通知该行刷新
+        entry = self.case_index.get(module_id, case_id)
+        if entry:
+            self.tree_model.case_changed(entry["module_pos"], entry["case_pos"])
 
     def focus_browser_window(self):
         try:
@@ -499,23 +2302,29 @@ class App(QMainWindow):
             logger.error(f"Error focusing browser window: {e}")
 
     def get_current_case(self):
-        # 从数据中查找当前激活的用例
-        if self.current_module_id and self.current_case_id:
-            for module in self.data:
-                if str(module["id"]) == self.current_module_id:
-                    for case in module.get("caseVoList", []):
-                        if str(case["id"]) == self.current_case_id:
-                            return case
-        return None
+        # 从索引中查找当前激活的用例
+        return self.case_index.get_case(self.current_module_id, self.current_case_id)
 
     def save_data(self):
-        # 保存数据到文件
-        for module in self.data:
-            for case in module.get("caseVoList", []):
-                case["completion"] = 1 if case.get("isTested", False) else 0
+        # 合并抓包记录并保存整个计划，由 persister 防抖后在后台写入
+        self.persister.mark_dirty()
 
-        with open(get_user_data_path("import.json"), "w") as file:
-            json.dump(self.data, file, indent=4)
+    def switch_storage_backend(self, use_sqlite):
+        backend = "sqlite" if use_sqlite else "json"
+        if backend == self.store.name:
+            return
+
+        # 先把当前存储中的修改和抓包记录收齐，再整体写入新的存储
+        self.persister.flush()
+        store = self.create_store(backend)
+        if self.data:
+            store.replace_all(self.data)
+        self.store = store
+        self.persister.store = store
+        self.settings.setValue("storage_backend", backend)
+        if self.current_module_id and self.current_case_id:
+            self.save_current_test_case()
+        logger.info(f"存储方式已切换为 {backend}")
 
     def init_main_window(self):
         screen = QApplication.primaryScreen()
@@ -544,7 +2353,9 @@ class App(QMainWindow):
                 self.toggle_tested_hotkey,
                 self.prev_function_hotkey,  # 添加上一个功能快捷键
                 self.next_function_hotkey,  # 添加下一个功能快捷键
-                self.settings.value("show_toggle_confirmation", True, type=bool)
+                self.settings.value("show_toggle_confirmation", True, type=bool),
+                self.settings.value("prelaunch_browser", False, type=bool),
+                self.settings.value("proxy_port", 0, type=int)
             )
         if self.settings_dialog.exec_():
             settings = self.settings_dialog.get_settings()
@@ -561,37 +2372,42 @@ class App(QMainWindow):
             self.settings.setValue("prev_function_hotkey", self.prev_function_hotkey)  # 保存上一个功能快捷键设置
             self.settings.setValue("next_function_hotkey", self.next_function_hotkey)  # 保存下一个功能快捷键设置
             self.settings.setValue("show_toggle_confirmation", settings['show_toggle_confirmation'])
+            self.settings.setValue("prelaunch_browser", settings['prelaunch_browser'])
+            if settings['proxy_port'] != self.settings.value("proxy_port", 0, type=int):
+                self.settings.setValue("proxy_port", settings['proxy_port'])
+                # 浏览器正在使用代理时不重启，关闭浏览器后下次开始测试时生效
+                if self.driver is None and self.browser_launch is None:
+                    self.start_mitmproxy()
+            if settings['prelaunch_browser']:
+                self.prelaunch_browser()
+            else:
+                self.driver_manager.discard_warm()
             self.setup_global_hotkey_listener()
 
     def prev_case(self):
-        if self.current_module_id and self.current_case_id:
-            for module in self.data:
-                if str(module["id"]) == self.current_module_id:
-                    cases = module.get("caseVoList", [])
-                    index = next((i for i, case in enumerate(cases) if str(case["id"]) == self.current_case_id), -1)
-                    if index > 0:
-                        self.current_case_id = str(cases[index - 1]["id"])
-                        self.save_current_test_case()
-                        self.update_status_windows()
+        entry = self.case_index.get(self.current_module_id, self.current_case_id)
+        if entry:
+            cases = self.data[entry["module_pos"]].get("caseVoList", [])
+            index = entry["case_pos"]
+            if index > 0:
+                self.current_case_id = str(cases[index - 1]["id"])
+                self.save_current_test_case()
 
         self.update_status_windows()
 
     def next_case(self):
-        if self.current_module_id and self.current_case_id:
-            for module in self.data:
-                if str(module["id"]) == self.current_module_id:
-                    cases = module.get("caseVoList", [])
-                    index = next((i for i, case in enumerate(cases) if str(case["id"]) == self.current_case_id), -1)
-                    if index < len(cases) - 1:
-                        self.current_case_id = str(cases[index + 1]["id"])
-                        self.save_current_test_case()
-                        self.update_status_windows()
+        entry = self.case_index.get(self.current_module_id, self.current_case_id)
+        if entry:
+            cases = self.data[entry["module_pos"]].get("caseVoList", [])
+            index = entry["case_pos"]
+            if index < len(cases) - 1:
+                self.current_case_id = str(cases[index + 1]["id"])
+                self.save_current_test_case()
 
         self.update_status_windows()
 
     def prev_function(self):
-        current_module_index = next((index for index, module in enumerate(self.data)
-                                     if str(module["id"]) == self.current_module_id), -1)
+        current_module_index = self.case_index.module_position(self.current_module_id)
         if current_module_index > 0:
             prev_module = self.data[current_module_index - 1]
             self.current_module_id = str(prev_module["id"])
@@ -603,8 +2419,7 @@ class App(QMainWindow):
             self.update_status_windows()
 
     def next_function(self):
-        current_module_index = next((index for index, module in enumerate(self.data)
-                                     if str(module["id"]) == self.current_module_id), -1)
+        current_module_index = self.case_index.module_position(self.current_module_id)
         if current_module_index < len(self.data) - 1:
             next_module = self.data[current_module_index + 1]
             self.current_module_id = str(next_module["id"])
@@ -616,13 +2431,39 @@ class App(QMainWindow):
             self.update_status_windows()
 
     def closeEvent(self, event):
+        # 放弃正在进行的启动，最多等待 3 秒让启动线程（包括之前取消的）结束后再关闭会话
+        self.cancel_browser_launch()
+        deadline = time.monotonic() + 3
+        for launch in list(self.browser_launches):
+            if not launch.wait(max(0, deadline - time.monotonic())):
+                logger.warning(f"启动 {launch.launch_key[0]} 的线程仍未结束，不再等待（守护线程随程序退出）")
+        export_thread = getattr(self, 'export_thread', None)
+        if export_thread is not None and export_thread.isRunning():
+            # 取消未完成的导出，线程删除 .zip.part 后才退出
+            export_thread.cancel()
+            export_thread.wait()
+        self.driver_manager.shutdown()
+        # 先停止代理并收完通道中的抓包记录，再写入计划
         self.stop_mitmproxy()
+        self.capture_channel.close()
+        self.persister.close()
         self.status_window.close()
-        self.screenshot_observer.stop()
-        self.screenshot_observer.join()
-        shutil.rmtree(self.screenshot_temp_dir, ignore_errors=True)
+        if self.screenshot_observer is not None:
+            self.screenshot_observer.stop()
+            self.screenshot_observer.join()
+        self.clean_screenshot_inbox()
         super().closeEvent(event)
 
+    def clean_screenshot_inbox(self):
+        # 保留仍在处理队列中的截图，其余为已取消的截图
+        for name in os.listdir(self.screenshot_temp_dir):
+            path = os.path.join(self.screenshot_temp_dir, name)
+            if not self.screenshot_processor.is_pending(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.error(f"删除临时截图失败: {path}: {e}")
+
     def save_bug_info(self, filename, description):
         try:
             bug_info = {"imageName": os.path.basename(filename), "remark": description}
@@ -631,14 +2472,62 @@ class App(QMainWindow):
         except Exception as e:
             logger.error(f"Error saving bug info: {e}")
 
-    def delete_screenshot(self, filename):
-        if filename and os.path.exists(filename):
+    def delete_screenshot(self, module_id, case_id, position):
+        # 从用例中删除一条截图结果；截图按内容共享，只有没有用例再引用时才删除文件
+        case = self.case_index.get_case(module_id, case_id)
+        if case is None:
+            return
+        images = parse_json_list(case.get("imageResult"))
+        if not 0 <= position < len(images):
+            return
+        image = images[position]
+        self.case_index.set_images(case, images[:position] + images[position + 1:])
+        self.persister.mark_dirty(module_id, case_id)
+        self.tree_model.refresh()
+
+        image_name = image.get("imageName") if isinstance(image, dict) else None
+        if not image_name or self.case_index.image_refs[image_name] > 0:
+            return
+        if image_name in self.screenshot_processor.pending_images():
+            return
+        filename = os.path.join(get_user_data_path('screenshots'), image_name)
+        if os.path.exists(filename):
             try:
                 os.remove(filename)
                 logger.info(f"Deleted screenshot: {filename}")
             except Exception as e:
                 logger.error(f"Error deleting screenshot: {e}")
 
+    def confirm_delete_screenshot(self, module_id, case_id, position):
+        reply = QMessageBox.question(self, "删除截图", "确定删除这条 Bug 描述和截图吗？",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        self.delete_screenshot(module_id, case_id, position)
+        case = self.case_index.get_case(module_id, case_id)
+        if case is not None:
+            self.display_case_info(case)
+
+    def collect_unreferenced_screenshots(self):
+        # 删除截图目录中引用计数为 0 的截图，包括旧版本的 screenshot_时间戳.png
+        screenshots_dir = get_user_data_path('screenshots')
+        if not os.path.exists(screenshots_dir):
+            return
+        references = self.case_index.image_refs
+        pending = self.screenshot_processor.pending_images()
+        for name in os.listdir(screenshots_dir):
+            if name.endswith('.png') and references[name] == 0 and name not in pending:
+                try:
+                    os.remove(os.path.join(screenshots_dir, name))
+                except OSError as e:
+                    logger.error(f"删除截图失败: {name}: {e}")
+
+    def prune_thumbnails(self):
+        # 只保留仍被用例引用的截图的缩略图
+        screenshots_dir = get_user_data_path('screenshots')
+        self.thumbnail_cache.prune(os.path.join(screenshots_dir, name)
+                                   for name, count in self.case_index.image_refs.items() if count > 0)
+
     def load_settings(self):
         self.chrome_path = self.settings.value("chrome_path", "")
         self.firefox_path = self.settings.value("firefox_path", "")
@@ -653,6 +2542,8 @@ class App(QMainWindow):
 
     # 更新 setup_global_hotkey_listener 方法
     def setup_global_hotkey_listener(self):
+        if self.hotkey_listener is not None:
+            self.hotkey_listener.stop()
         self.hotkey_listener = HotkeyListener(
             self.settings  # 传递 QSettings 对象
         )
@@ -661,6 +2552,7 @@ class App(QMainWindow):
         self.hotkey_listener.next_case_signal.connect(self.next_case)
         self.hotkey_listener.prev_function_signal.connect(self.prev_function)
         self.hotkey_listener.next_function_signal.connect(self.next_function)
+        self.hotkey_listener.toggle_tested_signal.connect(self.toggle_tested)
         self.hotkey_listener.start()
 
     def update_hotkeys(self, new_screenshot_hotkey, new_prev_case_hotkey, new_next_case_hotkey,
@@ -673,9 +2565,27 @@ class App(QMainWindow):
         self.setup_global_hotkey_listener()
 
     def trigger_global_screenshot(self):
-        timestamp = int(time.time())
-        screenshot_path = os.path.join(self.screenshot_temp_dir, f"screenshot_{timestamp}.png")
-        subprocess.Popen(["/usr/bin/deepin-screen-recorder", "-n", "-s", screenshot_path])
+        # 临时文件名只需唯一，正式文件名在后处理时按内容哈希确定
+        screenshot_path = os.path.join(self.screenshot_temp_dir,
+                                       f"capture_{time.time_ns()}_{uuid.uuid4().hex[:8]}.png")
+        self.capture_started[screenshot_path] = (self.capture_backend, time.perf_counter())
+        self.screen_capturer.capture(self.capture_backend, self.capture_mode, screenshot_path, self.driver)
+
+    def on_capture_failed(self, screenshot_path, message):
+        self.capture_started.pop(screenshot_path, None)
+        logger.error(f"截图失败: {message}")
+        QMessageBox.warning(self, "截图错误", f"截图失败: {message}")
+
+    def set_capture_aggregate(self, enabled):
+        self.settings.setValue("capture_aggregate", enabled)
+        self.stop_mitmproxy()
+        self.start_mitmproxy()
+
+    def set_capture_backend(self, backend, mode):
+        self.capture_backend = backend
+        self.capture_mode = mode
+        self.settings.setValue("capture_backend", backend)
+        self.settings.setValue("capture_mode", mode)
 
     def on_screenshot_taken(self, screenshot_path):
         # This method will be called when a new screenshot is detected
@@ -683,6 +2593,11 @@ class App(QMainWindow):
 
     @pyqtSlot(str)
     def show_bug_description_dialog(self, screenshot_path):
+        started = self.capture_started.pop(screenshot_path, None)
+        if started:
+            backend, started_at = started
+            logger.info(f"截图耗时[{backend}]: 快捷键到弹出对话框 {(time.perf_counter() - started_at) * 1000:.0f} ms")
+
         dialog = CustomInputDialog(self)
         if dialog.exec_() == QDialog.Accepted:
             bug_desc = dialog.get_input()
@@ -697,30 +2612,68 @@ class App(QMainWindow):
         self.focus_browser_window()
 
     def process_screenshot(self, screenshot_path, bug_desc):
-        # Move the screenshot to the correct location
-        dest_dir = get_user_data_path('screenshots')
-        os.makedirs(dest_dir, exist_ok=True)
-        dest_path = os.path.join(dest_dir, os.path.basename(screenshot_path))
-        shutil.move(screenshot_path, dest_path)
+        # 移动、校验和记录在后台完成，对话框关闭后立即切回浏览器
+        self.screenshot_processor.submit(screenshot_path, self.current_module_id, self.current_case_id, bug_desc,
+                                         self.settings.value("screenshot_reencode", False, type=bool))
 
+    def on_screenshot_processed(self, job):
         # Update the bug info
-        bug_info = {"imageName": os.path.basename(dest_path), "remark": bug_desc}
-        self.append_screenshot_result(bug_info)
+        bug_info = {"imageName": job["imageName"], "remark": job["remark"]}
+        self.append_screenshot_result(bug_info, job["module_id"], job["case_id"])
+        self.screenshot_processor.complete(job)
 
-        self.update_status_windows()
-        self.load_and_display_data()
+        if job["module_id"] == self.current_module_id and job["case_id"] == self.current_case_id:
+            self.update_status_windows()
+            self.refresh_current_case()
+        else:
+            entry = self.case_index.get(job["module_id"], job["case_id"])
+            if entry:
+                self.tree_model.case_changed(entry["module_pos"], entry["case_pos"])
+
+    def on_screenshot_failed(self, job, message):
+        logger.error(f"截图处理失败: {job['source']}: {message}")
+        self.screenshot_processor.complete(job)
+        QMessageBox.warning(self, "截图错误", f"截图处理失败: {message}")
+
+    def refresh_current_case(self):
+        # 只刷新当前用例：树中的一行（图标、标题、Bug 数）和右侧详情
+        entry = self.case_index.get(self.current_module_id, self.current_case_id)
+        if entry:
+            self.tree_model.case_changed(entry["module_pos"], entry["case_pos"])
+            self.display_case_info(entry["case"])
 
     def save_current_test_case(self):
         current_test_case = {
             "module_id": self.current_module_id,
-            "case_id": self.current_case_id
+            "case_id": self.current_case_id,
+            "storage": self.store.name  # mitmproxy 据此选择写入抓包日志还是 SQLite
         }
-        with open(get_user_data_path("current_test_case.json"), "w") as file:
+        # 先写临时文件再原子替换，mitmproxy 通过 inode 变化感知用例切换
+        current_test_case_path = get_user_data_path("current_test_case.json")
+        temp_path = current_test_case_path + ".tmp"
+        with open(temp_path, "w") as file:
             json.dump(current_test_case, file)
+        os.replace(temp_path, current_test_case_path)
+        # 代理脚本已连接时直接通过通道通知，上面的文件在通道断开时使用
+        self.capture_channel.send_case(self.current_module_id, self.current_case_id, self.store.name)
+
+    def on_http_captured(self, module_id, case_id, entry):
+        self.persister.add_captures(module_id, case_id, [entry])
+        # 正在查看的用例实时追加到抓包记录表
+        case = self.case_index.get_case(module_id, case_id)
+        if case is not None and case is self.traffic_model.case:
+            self.traffic_model.append_entry(entry)
+
+    def on_har_captured(self, module_id, case_id, entry):
+        self.persister.add_har_entries(module_id, case_id, [entry])
 
     def start_test(self):
         logger.info("开始测试方法被调用")
 
+        if self.browser_launch is not None:
+            QMessageBox.information(self, "启动浏览器", "浏览器正在启动，请稍候。")
+            return
+
         # 获取可用的浏览器列表
         available_browsers = ['firefox', '红莲花', '奇安信']
         browser_paths = {
@@ -758,26 +2711,46 @@ class App(QMainWindow):
             QMessageBox.warning(self, "警告", f"请先在设置中配置{browser_choice}的驱动路径。")
             return
 
-        selected_items = self.tree.selectedItems()
-        if not selected_items:
+        selected_rows = self.tree.selectionModel().selectedRows()
+        if not selected_rows:
             logger.info("未选择测试用例")
             return
 
-        item = selected_items[0]
-        if item.parent() is None:
+        selected_case = self.tree_model.case_ids(selected_rows[0])
+        if selected_case is None:
             logger.info("选择的是模块，而不是用例")
             return
 
-        case_id, module_id = item.text(0), item.parent().text(0)
+        module_id, case_id = selected_case
         logger.info(f"选择的用例 ID: {case_id}, 模块 ID: {module_id}")
 
         self.current_case_id = case_id
         self.current_module_id = module_id
 
+        # 代理未运行时（如已崩溃）或没有浏览器在用且设置的端口已修改时先重新启动，
+        # 端口立即确定，浏览器启动与代理启动同时进行
+        configured_port = self.settings.value("proxy_port", 0, type=int)
+        if not self.proxy_manager.is_running() or (
+                self.driver is None and configured_port and configured_port != self.proxy_manager.port):
+            self.start_mitmproxy()
+
+        if self.driver is not None and self.current_browser == browser_choice:
+            # 浏览器未变化：由启动线程检查会话，仍在运行时直接复用，否则关闭后重新启动
+            self.init_browser(browser_choice, self.driver)
+            return
+
+        if self.driver is not None:
+            # 换了浏览器，先停止监控再关闭旧会话
+            self.monitor_stop_event.set()
+            if self.monitor_thread is not None and self.monitor_thread.is_alive():
+                self.monitor_thread.join()
+            self.close_browser()
+        # 浏览器在后台启动，完成后由 on_browser_launched 继续
         logger.info("正在初始化浏览器...")
         self.init_browser(browser_choice)
-        logger.info("浏览器初始化完成")
 
+    def start_test_session(self, browser_choice):
+        # 浏览器就绪后记录当前用例并启动浏览器关闭监控
         # 记录浏览器窗口名字
         self.browser_window_title = self.get_browser_window_title(browser_choice)
         logger.info(f"浏览器窗口名字: {self.browser_window_title}")
@@ -815,22 +2788,129 @@ class App(QMainWindow):
             return "Google Chrome"
 
     def monitor_browser_and_update(self):
-        while not self.monitor_stop_event.is_set():
-            if hasattr(self, 'driver') and self.driver:
-                try:
-                    if self.driver.service.process is None:
-                        logger.info("浏览器进程已结束")
-                        self.close_browser()
-                        self.request_update_status.emit()  # 使用信号来请求更新状态
-                        self.monitor_stop_event.set()
-                        break
-                    _ = self.driver.current_window_handle
-                except WebDriverException:
-                    logger.info("浏览器已关闭,正在更新测试状态...")
-                    self.close_browser()
-                    self.request_update_status.emit()  # 使用信号来请求更新状态
-                    self.monitor_stop_event.set()
+        # 阻塞等待浏览器/驱动进程退出，拿不到进程时退化为逐步放慢的轮询
+        driver = self.driver
+        if driver is None:
+            return
+
+        pids = self.get_browser_pids(driver)
+        closed = False
+        while not closed and not self.monitor_stop_event.is_set():
+            if pids:
+                exited = self.wait_for_process_exit(pids)
+                if exited is None:
                     break
+                # 进程退出后确认一次会话是否仍然可用（启动脚本可能先于浏览器退出）
+                closed = not self.is_browser_alive(driver)
+                if not closed:
+                    logger.info(f"进程 {exited} 已退出但浏览器仍在运行，改为轮询")
+                    pids = []
+            else:
+                closed = self.poll_browser_until_closed(driver)
+
+        if closed and not self.monitor_stop_event.is_set():
+            logger.info("浏览器已关闭,正在更新测试状态...")
+            self.close_browser()
+            self.request_update_status.emit()  # 使用信号来请求更新状态
+            self.monitor_stop_event.set()
+
+    def get_browser_pids(self, driver):
+        # 驱动进程和浏览器进程，任一退出都说明测试会话结束
+        # 找不到浏览器进程时返回空列表，由调用方改为轮询：只等待驱动进程无法发现浏览器被关闭
+        service_process = getattr(driver.service, "process", None)
+        if service_process is None:
+            return []
+        browser_pid = driver.capabilities.get("moz:processID")  # geckodriver 直接给出浏览器进程号
+        browser_pids = [int(browser_pid)] if browser_pid else self.get_child_pids(service_process.pid)
+        if not browser_pids:
+            return []
+        return [service_process.pid] + browser_pids
+
+    def get_child_pids(self, pid):
+        # chromedriver 不提供浏览器进程号，从 /proc 中查找驱动的子进程
+        # 浏览器由驱动的会话线程启动，要读取每个线程的 children
+        children = []
+        try:
+            task_ids = os.listdir(f"/proc/{pid}/task")
+        except OSError:
+            return []
+        for task_id in task_ids:
+            try:
+                with open(f"/proc/{pid}/task/{task_id}/children") as file:
+                    children.extend(int(child) for child in file.read().split())
+            except (OSError, ValueError):
+                continue
+        return children
+
+    def wait_for_process_exit(self, pids):
+        # 返回先退出的进程号，监控被停止时返回 None
+        pidfds = {}
+        try:
+            for pid in pids:
+                try:
+                    pidfds[os.pidfd_open(pid)] = pid
+                except ProcessLookupError:
+                    return pid
+                except (AttributeError, OSError):
+                    # 旧内核或旧版 Python 不支持 pidfd
+                    return self.poll_process_exit(pids)
+
+            poller = select.poll()
+            for pidfd in pidfds:
+                poller.register(pidfd, select.POLLIN)
+            while not self.monitor_stop_event.is_set():
+                # 进程退出时 pidfd 变为可读；超时只用于响应停止请求
+                events = poller.poll(200)
+                if events:
+                    return pidfds[events[0][0]]
+            return None
+        finally:
+            for pidfd in pidfds:
+                os.close(pidfd)
+
+    def poll_process_exit(self, pids):
+        while not self.monitor_stop_event.wait(0.1):
+            for pid in pids:
+                if not self.is_process_running(pid):
+                    return pid
+        return None
+
+    def is_process_running(self, pid):
+        try:
+            with open(f"/proc/{pid}/stat") as file:
+                # 已退出但尚未被回收的进程状态为 Z
+                return file.read().rsplit(")", 1)[1].split()[0] != "Z"
+        except (OSError, IndexError):
+            return False
+
+    def is_browser_alive(self, driver):
+        try:
+            return is_session_alive(driver)
+        except Exception as e:
+            logger.error(f"检查浏览器状态时发生错误: {e}")
+            return False
+
+    def poll_browser_until_closed(self, driver):
+        # 通过 WebDriver 轮询，间隔从 50ms 逐步放慢到 200ms
+        interval = 0.05
+        while not self.monitor_stop_event.wait(interval):
+            if not self.is_browser_alive(driver):
+                return True
+            interval = min(interval * 2, 0.2)
+        return False
+
+    def prelaunch_browser(self):
+        # 默认关闭：预启动的浏览器在开始测试前就通过代理上网，其后台请求会记录到当前用例
+        if not self.settings.value("prelaunch_browser", False, type=bool) or self.driver is not None:
+            return
+        browser_choice = self.settings.value("last_browser", "")
+        if not browser_choice:
+            return
+        browser_path = self.settings.value(f"{browser_choice}_path")
+        driver_path = self.settings.value(f"{browser_choice}_driver_path")
+        if not browser_path or not os.path.exists(browser_path) or not driver_path or not os.path.exists(driver_path):
+            return
+        self.driver_manager.prelaunch((browser_choice, browser_path, driver_path, self.proxy_manager.port))
 
     def close_browser(self):
         if hasattr(self, 'driver') and self.driver:
@@ -846,27 +2926,23 @@ class App(QMainWindow):
 
     def update_status_after_close(self):
         try:
-            # 暂时断开树形视图的信号连接，防止不必要的触发
-            self.tree.itemClicked.disconnect(self.display_case_details)
+            # 合并浏览器运行期间的抓包记录
+            if self.data:
+                self.persister.fold_captures()
 
-            # 重新加载数据
-            self.data = load_data(get_user_data_path("import.json"))
+            # 为下一个用例预启动浏览器
+            self.prelaunch_browser()
 
-            # 更新UI
-            self.load_and_display_data()
+            # 只刷新状态有变化的行
+            self.tree_model.refresh()
 
             # 更新状态窗口
             self.update_status_windows()
 
             # 如果当前有选中的用例，更新其显示
-            if self.current_case_id and self.current_module_id:
-                for module in self.data:
-                    if str(module["id"]) == self.current_module_id:
-                        for case in module.get("caseVoList", []):
-                            if str(case["id"]) == self.current_case_id:
-                                self.display_case_info(case)
-                                break
-                        break
+            current_case = self.get_current_case()
+            if current_case:
+                self.display_case_info(current_case)
 
             # 更新树形视图的选中状态
             self.update_tree_selection()
@@ -874,22 +2950,12 @@ class App(QMainWindow):
             logger.info("状态已更新")  # 用于调试
         except Exception as e:
             logger.error(f"更新状态时发生错误: {e}")  # 错误日志
-        finally:
-            # 重新连接树形视图的信号
-            self.tree.itemClicked.connect(self.display_case_details)
 
     def update_tree_selection(self):
         # 更新树形视图的选中状态
-        if self.current_module_id and self.current_case_id:
-            root = self.tree.invisibleRootItem()
-            for i in range(root.childCount()):
-                module_item = root.child(i)
-                if module_item.text(0) == self.current_module_id:
-                    for j in range(module_item.childCount()):
-                        case_item = module_item.child(j)
-                        if case_item.text(0) == self.current_case_id:
-                            self.tree.setCurrentItem(case_item)
-                            return
+        entry = self.case_index.get(self.current_module_id, self.current_case_id)
+        if entry:
+            self.tree.setCurrentIndex(self.tree_model.case_model_index(entry["module_pos"], entry["case_pos"]))
 
     def update_status_windows(self):
         current_module, current_case, total_cases = self.get_current_module_case()
@@ -910,36 +2976,23 @@ class App(QMainWindow):
         logger.info("update_status_windows completed")  # 添加这行来确认方法执行完成
 
     def get_current_module_case(self):
-        if self.current_module_id and self.current_case_id:
-            for module in self.data:
-                if str(module["id"]) == self.current_module_id:
-                    for index, case in enumerate(module.get("caseVoList", []), start=1):
-                        if str(case["id"]) == self.current_case_id:
-                            return module["name"], index, len(module.get("caseVoList", []))
+        entry = self.case_index.get(self.current_module_id, self.current_case_id)
+        if entry:
+            module = self.data[entry["module_pos"]]
+            return module["name"], entry["case_pos"] + 1, len(module.get("caseVoList", []))
         return "-", "-", "-"
 
     def get_remaining_modules_cases(self):
-        remaining_modules = 0
-        remaining_cases = 0
-        for module in self.data:
-            module_has_remaining = False
-            for case in module.get("caseVoList", []):
-                if not case.get("isTested"):
-                    remaining_cases += 1
-                    module_has_remaining = True
-            if module_has_remaining:
-                remaining_modules += 1
-        return remaining_modules, remaining_cases
+        # 剩余数量由索引随测试状态的修改增量维护
+        return self.case_index.remaining_modules, self.case_index.remaining_cases
 
     def get_current_steps(self):
-        if self.current_case_id:
-            for module in self.data:
-                for case in module.get('caseVoList', []):
-                    if str(case['id']) == self.current_case_id:
-                        content_map = case.get('contentMap', [])
-                        if content_map is None:
-                            content_map = []
-                        return content_map
+        case = self.get_current_case()
+        if case:
+            content_map = case.get('contentMap', [])
+            if content_map is None:
+                content_map = []
+            return content_map
         return []
 
     def init_error_json_from_export(self, export_file_path, error_file_path):
@@ -953,11 +3006,7 @@ class App(QMainWindow):
         with open(error_file_path, "w") as file:
             json.dump(data, file, indent=4)
 
-    def init_browser(self, browser_choice):
-        x, y, width, height = self.geometry().getRect()
-        height += int(height * 0.1)
-        y -= int(y * 0.5)
-
+    def init_browser(self, browser_choice, current_driver=None):
         browser_path = self.settings.value(f"{browser_choice}_path")
         driver_path = self.settings.value(f"{browser_choice}_driver_path")
 
@@ -975,51 +3024,107 @@ class App(QMainWindow):
             QMessageBox.warning(self, "错误", f"{browser_choice} 驱动路径无效或未设置。")
             return
 
-        # 在调用Firefox前设置LD_LIBRARY_PATH，以包含额外的库目录
-        if browser_choice == "firefox":
+        # 浏览器与上次相同且代理端口未变时直接使用后台预启动的会话
+        launch_key = (browser_choice, browser_path, driver_path, self.proxy_manager.port)
+        self.browser_launch = BrowserLaunch(self.driver_manager, self.proxy_manager, launch_key, current_driver)
+        self.browser_launch.launched.connect(self.on_browser_launched)
+        self.browser_launch.failed.connect(self.on_browser_launch_failed)
+        self.browser_launch.finished.connect(self.on_browser_launch_finished)
+        self.browser_launches.add(self.browser_launch)
+
+        # 非模态进度框，启动期间主窗口、用例树和快捷键仍可使用
+        self.browser_launch_progress = QProgressDialog(f"正在启动 {browser_choice}...", "取消", 0, 0, self)
+        self.browser_launch_progress.setWindowTitle("启动浏览器")
+        self.browser_launch_progress.setWindowModality(Qt.NonModal)
+        self.browser_launch_progress.setMinimumDuration(0)
+        self.browser_launch_progress.canceled.connect(self.cancel_browser_launch)
+        self.browser_launch_progress.show()
+
+        timeout_seconds = self.settings.value("browser_launch_timeout", 60, type=int)
+        self.browser_launch_timer = QTimer(self)
+        self.browser_launch_timer.setSingleShot(True)
+        self.browser_launch_timer.timeout.connect(self.on_browser_launch_timeout)
+        self.browser_launch_timer.start(timeout_seconds * 1000)
+
+        self.browser_launch.start()
+
+    def finish_browser_launch(self):
+        self.browser_launch_timer.stop()
+        self.browser_launch_progress.canceled.disconnect(self.cancel_browser_launch)
+        self.browser_launch_progress.close()
+        self.browser_launch_progress.deleteLater()
+        self.browser_launch_timer.deleteLater()
+        self.browser_launch = None
+
+    def on_browser_launch_finished(self):
+        self.browser_launches.discard(self.sender())
+
+    def on_browser_launched(self, driver, proxy_error):
+        launch = self.sender()
+        if launch is not self.browser_launch:
+            # 取消与启动完成同时发生，结果已无人使用（复用的会话仍由界面管理）
+            if driver is not launch.current_driver:
+                threading.Thread(target=driver.quit, daemon=True).start()
+            return
+        browser_choice = launch.launch_key[0]
+        self.finish_browser_launch()
 
-            firefox_options = FirefoxOptions()
-            firefox_options.binary_location = browser_path
-            firefox_options.set_preference('network.proxy.type', 1)
-            firefox_options.set_preference('network.proxy.http', 'localhost')
-            firefox_options.set_preference('network.proxy.http_port', 8080)
-            firefox_options.set_preference('network.proxy.ssl', 'localhost')
-            firefox_options.set_preference('network.proxy.ssl_port', 8080)
-
-            # 将 FirefoxOptions 的日志级别设为 trace 以获取更详细信息
-            firefox_options.log.level = "trace"
-
-            # 不指定 log_path，让 geckodriver 日志直接输出到终端
-            firefox_service = FirefoxService(
-                executable_path=driver_path,
-                log_path='geckodriver.log',  # 将日志输出到本地文件中
-                service_args=["--log", "trace"]  # 设置日志级别为trace，获得更详细的日志信息
-            )
+        if driver is launch.current_driver:
+            logger.info("复用正在运行的浏览器会话")
+            self.start_test_session(browser_choice)
+            return
+        if launch.current_driver is not None and self.driver is launch.current_driver:
+            # 原会话已失效并已在启动线程中关闭，停止它的监控
+            self.monitor_stop_event.set()
+            if self.monitor_thread is not None and self.monitor_thread.is_alive():
+                self.monitor_thread.join()
+            self.driver = None
 
-            try:
-                self.driver = Firefox(service=firefox_service, options=firefox_options)
-            except Exception as e:
-                # 在终端中打印异常信息
-                print(f"启动 Firefox 时发生错误: {str(e)}")
-                QMessageBox.warning(self, "错误", f"启动 Firefox 失败: {str(e)}")
-                return
+        x, y, width, height = self.geometry().getRect()
+        height += int(height * 0.1)
+        y -= int(y * 0.5)
 
+        self.driver = driver
+        self.current_browser = browser_choice
+        self.settings.setValue("last_browser", browser_choice)
+        try:
+            self.driver.set_window_position(x, y)
+            self.driver.set_window_size(width, height)
+        except Exception as e:
+            logger.error(f"调整浏览器窗口失败: {e}")
+        logger.info("浏览器初始化完成")
 
-        else:
-            chrome_options = ChromeOptions()
-            chrome_options.binary_location = browser_path
-            chrome_options.add_argument('--proxy-server=http://localhost:8080')
-            chrome_service = ChromeService(executable_path=driver_path)
-            try:
-                self.driver = Chrome(service=chrome_service, options=chrome_options)
-            except Exception as e:
-                logger.error(f"启动 Chrome 时发生错误: {str(e)}")
-                QMessageBox.warning(self, "错误", f"启动 Chrome 失败: {str(e)}")
-                return
+        # 浏览器启动后再确认代理已经在监听，避免丢失最初的请求
+        if proxy_error:
+            QMessageBox.warning(self, "代理错误", f"抓包代理未就绪: {proxy_error}")
 
-        self.driver.set_window_position(x, y)
-        self.driver.set_window_size(width, height)
-        logger.info("浏览器初始化完成")
+        self.start_test_session(browser_choice)
+
+    def on_browser_launch_failed(self, message):
+        launch = self.sender()
+        if launch is not self.browser_launch:
+            return
+        browser_choice = launch.launch_key[0]
+        self.finish_browser_launch()
+        logger.error(f"启动 {browser_choice} 时发生错误: {message}")
+        QMessageBox.warning(self, "错误", f"启动 {browser_choice} 失败: {message}")
+
+    def cancel_browser_launch(self):
+        if self.browser_launch is None:
+            return
+        logger.info("已取消启动浏览器")
+        # 线程无法强行中断，启动完成后由线程自行关闭浏览器
+        self.browser_launch.abandon()
+        self.finish_browser_launch()
+
+    def on_browser_launch_timeout(self):
+        if self.browser_launch is None:
+            return
+        browser_choice = self.browser_launch.launch_key[0]
+        self.browser_launch.abandon()
+        self.finish_browser_launch()
+        logger.error(f"启动 {browser_choice} 超时")
+        QMessageBox.warning(self, "错误", f"启动 {browser_choice} 超时，请检查浏览器和驱动。")
 
     # 在 BrowserSettingsDialog 类中修改 set_browser_path 方法
     def set_browser_path(self, browser_name):
@@ -1048,21 +3153,17 @@ class App(QMainWindow):
         layout = QHBoxLayout(central_widget)
 
         # 设置左侧树状图样式
-        self.tree = QTreeWidget()
-        self.tree.setColumnCount(2)
-        self.tree.setHeaderLabels(['ID', '名称'])
-        self.tree.header().setSectionResizeMode(0, QHeaderView.ResizeToContents)  # 根据内容自适应调整第一列的宽度
-        self.tree.header().setSectionResizeMode(1, QHeaderView.Stretch)  # 第二列填充剩余空间
+        self.tree = QTreeView()
         self.tree.setStyleSheet("""
-            QTreeWidget {
+            QTreeView {
                 font-size: 16px; /* 调整字体大小 */
                 color: #333; /* 文字颜色 */
             }
-            QTreeWidget::item {
+            QTreeView::item {
                 border-bottom: 1px solid #e0e0e0; /* 每项下方的分界线 */
                 padding: 5px; /* 项内边距 */
             }
-            QTreeWidget::item:selected {
+            QTreeView::item:selected {
                 background-color: #a0a0a0; /* 选中项背景色 */
             }
             QHeaderView::section {
@@ -1085,13 +3186,21 @@ class App(QMainWindow):
         test_btn.clicked.connect(self.start_test)
         left_layout.addWidget(test_btn)
 
-        self.tree = QTreeWidget(left_widget)
-        self.tree.setColumnCount(2)
-        self.tree.setHeaderLabels(['ID', '名称'])
+        self.tree_model = CaseTreeModel(self.checked_icon, self.unchecked_icon, self)
+        self.tree = QTreeView(left_widget)
+        self.tree.setModel(self.tree_model)
+        self.tree.setUniformRowHeights(True)  # 大量用例时避免逐行计算高度
         self.tree.header().setSectionResizeMode(0, QHeaderView.ResizeToContents)  # 根据内容自适应调整第一列的宽度
         self.tree.header().setSectionResizeMode(1, QHeaderView.Stretch)  # 第二列填充剩余空间
+        self.tree.header().setSectionResizeMode(2, QHeaderView.ResizeToContents)  # Bug 数
+        self.tree.clicked.connect(self.display_case_details)  # 只连接一次
         left_layout.addWidget(self.tree)
 
+        # 抓包记录表的模型在切换用例时复用，详情面板只重建视图
+        self.traffic_model = TrafficTableModel(self)
+        self.traffic_proxy = TrafficFilterProxyModel(self)
+        self.traffic_proxy.setSourceModel(self.traffic_model)
+
         self.right_widget = QScrollArea(central_widget)
         self.right_widget.setWidgetResizable(True)
         layout.addWidget(self.right_widget)
@@ -1117,7 +3226,11 @@ class App(QMainWindow):
 
         # 导出数据菜单项
         export_action = data_menu.addAction('导出文件')
-        export_action.triggered.connect(self.export_data)
+        export_action.triggered.connect(lambda: self.export_data())
+
+        # 增量导出：只打包上次导出之后新增或变化的截图
+        export_delta_action = data_menu.addAction('增量导出')
+        export_delta_action.triggered.connect(self.export_delta)
 
         # 添加重置测试结果的菜单项
         reset_results_action = data_menu.addAction('重置测试结果')
@@ -1134,72 +3247,104 @@ class App(QMainWindow):
         set_hotkey_action = self.settings_menu.addAction('设置全局快捷键')
         set_hotkey_action.triggered.connect(self.show_settings_dialog)
 
+        # 存储方式菜单项
+        sqlite_action = self.settings_menu.addAction('使用SQLite存储')
+        sqlite_action.setCheckable(True)
+        sqlite_action.setChecked(self.store.name == "sqlite")
+        sqlite_action.toggled.connect(self.switch_storage_backend)
+
+        # 聚合重复的轮询请求，修改后重启代理生效
+        aggregate_action = self.settings_menu.addAction('聚合重复请求')
+        aggregate_action.setCheckable(True)
+        aggregate_action.setChecked(self.settings.value("capture_aggregate", False, type=bool))
+        aggregate_action.toggled.connect(self.set_capture_aggregate)
+
+        # 截图方式：外部截图工具或进程内 mss 截图
+        capture_menu = self.settings_menu.addMenu('截图方式')
+        capture_group = QActionGroup(self)
+        for title, backend, mode in (('系统截图工具', 'external', 'fullscreen'),
+                                     ('全屏截图', 'mss', 'fullscreen'),
+                                     ('鼠标所在屏幕', 'mss', 'monitor'),
+                                     ('浏览器窗口', 'mss', 'browser')):
+            action = capture_menu.addAction(title)
+            action.setCheckable(True)
+            action.setChecked(backend == self.capture_backend
+                              and (backend == 'external' or mode == self.capture_mode))
+            action.triggered.connect(lambda checked, b=backend, m=mode: self.set_capture_backend(b, m))
+            capture_group.addAction(action)
+
     def show_browser_settings(self):
         dialog = BrowserSettingsDialog(self)
         dialog.exec_()
 
     def reset_test_results(self):
-        error_file_path = get_user_data_path("import.json")
-
-        with open(error_file_path, "r") as file:
-            data = json.load(file)
+        if not self.data:
+            return
 
-        for module in data:
+        for module in self.data:
             for case in module.get("caseVoList", []):
                 case["httpResult"] = []  # 将httpResult字段重置为空数组
                 case["imageResult"] = None
                 case["isTested"] = False  # 将测试状态设置为未测试
+                case["completion"] = 0
+        self.case_index.rebuild(self.data)
 
-        with open(error_file_path, "w") as file:
-            json.dump(data, file, indent=4)
+        # 丢弃尚未合并的抓包记录和 HAR 记录
+        self.persister.discard_captures()
+        self.store.clear_captures()
+        discard_har_journal()
+        self.save_data()
 
-        # 删除用户数据目录下所有符合screenshot_时间戳.png格式的图片文件
-        screenshots_dir = get_user_data_path('screenshots')
-        if os.path.exists(screenshots_dir):
-            files = os.listdir(screenshots_dir)
-            screenshots = [file for file in files if file.startswith('screenshot_') and file.endswith('.png')]
-            for screenshot in screenshots:
-                os.remove(os.path.join(screenshots_dir, screenshot))
+        # 所有截图的引用都已清除，回收截图目录中的文件
+        self.collect_unreferenced_screenshots()
 
-        self.data = load_data(get_user_data_path("import.json"))
         self.load_and_display_data()
 
     def import_data(self):
         filename, _ = QFileDialog.getOpenFileName(self, "导入数据文件", "", "JSON files (*.json)")
         if filename:
-            try:
-                with open(filename, 'r', encoding='utf-8') as file:
-                    imported_data = json.load(file)
-
-                # 处理导入的数据，可能需要进行一些验证或转换
-                self.data = imported_data
-
-                # 保存导入的数据到用户数据目录
-                import_json_path = get_user_data_path("import.json")
-                with open(import_json_path, 'w', encoding='utf-8') as file:
-                    json.dump(self.data, file, ensure_ascii=False, indent=4)
-
-                logger.info(f"Data imported and saved to {import_json_path}")
-                self.load_and_display_data()  # 更新UI显示
-            except Exception as e:
-                logger.error(f"导入文件时发生错误: {str(e)}")
-                QMessageBox.warning(self, "导入错误", f"导入文件时发生错误: {str(e)}")
-
-    def export_data(self):
-        # 创建 self.data 的深度拷贝
-        export_data = copy.deepcopy(self.data)
-
-        # 预处理数据,确保httpResult字段为null或有效的数组，并修正completion字段
-        for module in export_data:
-            for case in module.get("caseVoList", []):
-                if not case.get("httpResult"):
-                    case["httpResult"] = None
-                if case.get("completion") is None:
-                    case["completion"] = 0
+            # 后台流式导入，界面只显示进度
+            self.import_progress = QProgressDialog("正在导入用例文件...", None, 0, 100, self)
+            self.import_progress.setWindowTitle("导入")
+            self.import_progress.setWindowModality(Qt.WindowModal)
+            self.import_progress.setMinimumDuration(0)
+            self.import_progress.setValue(0)
+
+            self.importer = PlanImporter(self.persister, self)
+            self.importer.progress.connect(self.import_progress.setValue)
+            self.importer.finished.connect(self.on_import_finished)
+            self.importer.failed.connect(self.on_import_failed)
+            self.import_filename = filename
+            self.importer.start(filename)
+
+    def on_import_finished(self, modules):
+        self.import_progress.close()
+
+        # 处理导入的数据
+        self.data = modules
+        self.case_index.rebuild(self.data)
+        self.persister.resume(discard_changes=True)
+        discard_har_journal()
+
+        logger.info(f"Data imported from {self.import_filename}")
+        self.load_and_display_data()  # 更新UI显示
+
+    def on_import_failed(self, message):
+        self.import_progress.close()
+        self.persister.resume()
+        QMessageBox.warning(self, "导入错误", f"导入文件时发生错误: {message}")
+
+    def export_delta(self):
+        self.export_data(delta=True)
+
+    def export_data(self, delta=False):
+        if getattr(self, 'export_thread', None) is not None and self.export_thread.isRunning():
+            QMessageBox.information(self, "导出", "正在导出，请稍候。")
+            return
 
         # 生成默认的文件名
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H_%M_%S")
-        default_filename = f"export_{timestamp}.zip"
+        default_filename = f"export_delta_{timestamp}.zip" if delta else f"export_{timestamp}.zip"
 
         # 打开文件选择对话框
         zip_filename, _ = QFileDialog.getSaveFileName(
@@ -1212,42 +3357,43 @@ class App(QMainWindow):
         if not zip_filename:  # 用户取消了选择
             return
 
-        try:
-            # 创建一个临时目录
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # 将修改后的数据写入临时的 JSON 文件
-                temp_json_path = os.path.join(temp_dir, "import.json")
-                with open(temp_json_path, 'w', encoding='utf-8') as temp_file:
-                    json.dump(export_data, temp_file, ensure_ascii=False, indent=4)
-
-                # 创建 ZIP 文件
-                with zipfile.ZipFile(zip_filename, 'w') as zipf:
-                    # 添加临时 JSON 文件到 ZIP
-                    zipf.write(temp_json_path, arcname="import.json")
-
-                    # 获取screenshots文件夹下所有文件
-                    screenshots_dir = get_user_data_path('screenshots')
-                    if os.path.exists(screenshots_dir):
-                        files = os.listdir(screenshots_dir)
-                        # 筛选出符合条件的图片文件
-                        screenshots = [file for file in files if
-                                       file.startswith('screenshot_') and file.endswith('.png')]
-                        # 如果有符合条件的图片文件
-                        if screenshots:
-                            # 将图片文件添加到ZIP文件的image文件夹下
-                            for screenshot in screenshots:
-                                zipf.write(os.path.join(screenshots_dir, screenshot),
-                                           arcname=os.path.join('image', screenshot))
-
-            logger.info(f"数据已成功导出到 {zip_filename}")
-            QMessageBox.information(self, "导出成功", f"数据已成功导出到 {zip_filename}")
-        except Exception as e:
-            logger.error(f"导出数据时发生错误: {str(e)}")
-            QMessageBox.critical(self, "导出错误", f"导出数据时发生错误: {str(e)}")
+        # 先合并抓包记录，再对计划做浅拷贝交给导出线程
+        snapshot = []
+        if self.data:
+            self.persister.fold_captures()
+            self.persister.save_in_background()
+            snapshot = snapshot_plan(self.data)
+
+        self.export_progress = QProgressDialog("正在导出...", "取消", 0, 100, self)
+        self.export_progress.setWindowTitle("导出")
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.setValue(0)
+
+        self.export_thread = ExportThread(snapshot, zip_filename, delta, self)
+        self.export_thread.progress.connect(self.export_progress.setValue)
+        self.export_thread.succeeded.connect(self.on_export_succeeded)
+        self.export_thread.failed.connect(self.on_export_failed)
+        self.export_thread.canceled.connect(self.on_export_canceled)
+        self.export_progress.canceled.connect(self.export_thread.cancel)
+        self.export_thread.start()
+
+    def on_export_succeeded(self, zip_filename):
+        self.export_progress.close()
+        logger.info(f"数据已成功导出到 {zip_filename}")
+        self.prune_thumbnails()
+        QMessageBox.information(self, "导出成功", f"数据已成功导出到 {zip_filename}")
+
+    def on_export_failed(self, message):
+        self.export_progress.close()
+        logger.error(f"导出数据时发生错误: {message}")
+        QMessageBox.critical(self, "导出错误", f"导出数据时发生错误: {message}")
+
+    def on_export_canceled(self):
+        self.export_progress.close()
+        logger.info("导出已取消")
 
     def load_and_display_data(self):
         logger.info("Starting load_and_display_data")  # 添加日志
-        self.tree.clear()
         if self.right_widget.widget() is not None:
             self.right_widget.widget().deleteLater()
             self.right_widget.setWidget(None)
@@ -1260,17 +3406,10 @@ class App(QMainWindow):
             logger.error("Error: Status window not initialized")  # 添加错误检查
             return
 
-        if self.data:  # 只在有数据时执行以下操作
-            for module in self.data:
-                module_item = QTreeWidgetItem([str(module['id']), module['name']])
-                self.tree.addTopLevelItem(module_item)
-                for case in module.get('caseVoList', []):
-                    case_item = QTreeWidgetItem([str(case['id']), case['caseName']])
-                    icon = self.checked_icon if case.get('isTested', False) else self.unchecked_icon
-                    case_item.setIcon(1, icon)  # 设置图标在第二列
-                    module_item.addChild(case_item)
-            self.tree.itemClicked.connect(self.display_case_details)
+        # 模型直接引用内存中的计划，用例节点在展开时才加载
+        self.tree_model.set_plan(self.data)
 
+        if self.data:  # 只在有数据时执行以下操作
             # 只在有数据时更新状态窗口
             self.update_status_windows()
         else:
@@ -1278,21 +3417,35 @@ class App(QMainWindow):
 
         logger.info("load_and_display_data completed")  # 添加这行来确认方法执行完成
 
-    def display_case_details(self, item):
-        if item.parent() is None:
+    def display_case_details(self, index):
+        selected_case = self.tree_model.case_ids(index)
+        if selected_case is None:
             return
 
-        case_id = item.text(0)
-        for module in self.data:
-            for case in module.get('caseVoList', []):
-                if str(case['id']) == case_id:
-                    self.current_case_id = case_id
-                    self.current_module_id = str(module['id'])
-                    self.display_case_info(case)
-                    self.update_status_windows()
-                    break
+        module_id, case_id = selected_case
+        case = self.case_index.get_case(module_id, case_id)
+        if case:
+            self.current_case_id = case_id
+            self.current_module_id = module_id
+            self.display_case_info(case)
+            self.update_status_windows()
+
+    def on_thumbnail_loaded(self, image_path, pixmap):
+        for label in self.thumbnail_labels.pop(image_path, []):
+            try:
+                label.setMinimumHeight(0)
+                label.setPixmap(pixmap)
+            except RuntimeError:
+                # 详情面板已被替换，标签已销毁
+                pass
 
     def display_case_info(self, case):
+        # 旧面板中的占位标签即将销毁
+        self.thumbnail_labels = {}
+        case_ids = (self.current_module_id, self.current_case_id)
+        if self.case_index.get_case(*case_ids) is not case:
+            case_ids = None
+
         content_widget = QWidget()
         content_layout = QVBoxLayout(content_widget)
 
@@ -1393,20 +3546,26 @@ class App(QMainWindow):
                 # 截图
                 image_path = os.path.join(get_user_data_path('screenshots'), image_result['imageName'])
                 if os.path.exists(image_path):
-                    pixmap = QPixmap(image_path)
                     screenshot_label = QLabel()
 
-                    # 设置一个固定的宽度和高度
-                    fixed_width = 300  # 例如，设置为300像素宽
-                    fixed_height = 300  # 例如，设置为300像素高
-
-                    # 调整截图大小以适应固定尺寸
-                    resized_pixmap = pixmap.scaled(fixed_width, fixed_height, Qt.KeepAspectRatio,
-                                                   Qt.SmoothTransformation)
-                    screenshot_label.setPixmap(resized_pixmap)
+                    # 使用缓存中 300x300 以内的缩略图，未生成时先显示占位文字
+                    thumbnail = self.thumbnail_cache.get(image_path)
+                    if thumbnail is not None:
+                        screenshot_label.setPixmap(thumbnail)
+                    else:
+                        screenshot_label.setText("缩略图加载中...")
+                        screenshot_label.setMinimumHeight(self.thumbnail_cache.thumbnail_size)
+                        self.thumbnail_labels.setdefault(image_path, []).append(screenshot_label)
                     screenshot_label.setAlignment(Qt.AlignCenter)
-                    screenshot_label.mousePressEvent = lambda event, path=image_path: self.show_image(path)
+                    screenshot_label.mousePressEvent = lambda event, path=image_path: (
+                        self.show_image(path) if event.button() == Qt.LeftButton else None)
                     desc_content_layout.addWidget(screenshot_label)
+                    if case_ids is not None:
+                        # 右键菜单删除这条截图结果
+                        screenshot_label.setContextMenuPolicy(Qt.CustomContextMenu)
+                        screenshot_label.customContextMenuRequested.connect(
+                            lambda pos, label=screenshot_label, position=index:
+                            self.show_screenshot_menu(label, pos, case_ids, position))
                 else:
                     logger.error(f"Image file not found: {image_path}")
 
@@ -1418,9 +3577,81 @@ class App(QMainWindow):
         main_layout.setStretchFactor(steps_widget, 1)
         main_layout.setStretchFactor(desc_widget, 1)
         content_layout.addWidget(main_widget)
+        content_layout.addWidget(self.create_traffic_panel(case))
         content_widget.setLayout(content_layout)
         self.right_widget.setWidget(content_widget)
 
+    def create_traffic_panel(self, case):
+        # 抓包记录：已合并的 httpResult 加上本地通道中尚未保存的记录，浏览器打开时实时追加
+        # 重新打开同一用例且 httpResult 未被合并替换时，模型中的记录（含实时追加的）仍然有效，不重新解析
+        http_result = case.get("httpResult")
+        if case is not self.traffic_model.case or http_result is not self.traffic_model.http_result:
+            entries = parse_json_list(http_result)
+            if self.case_index.get_case(self.current_module_id, self.current_case_id) is case:
+                pending = self.persister.pending_captures.get((self.current_module_id, self.current_case_id))
+                if pending:
+                    entries = merge_http_results(entries, pending)
+            self.traffic_model.set_entries(case, entries, http_result)
+
+        traffic_widget = QWidget()
+        traffic_layout = QVBoxLayout(traffic_widget)
+        traffic_layout.setContentsMargins(20, 10, 20, 10)
+
+        traffic_label = QLabel("接口请求")
+        traffic_label.setFont(QFont("Arial", 14, QFont.Bold))
+        traffic_label.setAlignment(Qt.AlignCenter)
+        traffic_layout.addWidget(traffic_label)
+
+        filter_layout = QHBoxLayout()
+        status_combo = QComboBox()
+        status_combo.addItems(["全部状态", "2xx", "3xx", "4xx", "5xx"])
+        status_combo.setCurrentIndex(self.traffic_proxy.status_class - 1 if self.traffic_proxy.status_class else 0)
+        status_combo.currentIndexChanged.connect(
+            lambda index: self.traffic_proxy.set_status_class(index + 1 if index else 0))
+        filter_layout.addWidget(status_combo)
+
+        url_edit = QLineEdit(self.traffic_proxy.url_text)
+        url_edit.setPlaceholderText("URL 关键字")
+        url_edit.textChanged.connect(self.traffic_proxy.set_url_text)
+        filter_layout.addWidget(url_edit)
+
+        duration_spin = QSpinBox()
+        duration_spin.setRange(0, 600000)
+        duration_spin.setSingleStep(100)
+        duration_spin.setPrefix("耗时 ≥ ")
+        duration_spin.setSuffix(" ms")
+        duration_spin.setValue(self.traffic_proxy.min_duration)
+        duration_spin.valueChanged.connect(self.traffic_proxy.set_min_duration)
+        filter_layout.addWidget(duration_spin)
+        traffic_layout.addLayout(filter_layout)
+
+        traffic_table = QTableView()
+        traffic_table.setModel(self.traffic_proxy)
+        # 不用 setSortingEnabled：它会立即按第一列排序；打开时不排序，点击表头时才排序
+        traffic_header = traffic_table.horizontalHeader()
+        traffic_header.setSortIndicator(self.traffic_model.sort_column, self.traffic_model.sort_order)
+        traffic_header.setSortIndicatorShown(True)
+        traffic_header.setSectionsClickable(True)
+        traffic_header.sortIndicatorChanged.connect(self.traffic_proxy.sort)
+        traffic_table.setSelectionBehavior(QTableView.SelectRows)
+        traffic_table.setEditTriggers(QTableView.NoEditTriggers)
+        traffic_table.setWordWrap(False)
+        # 固定行高，大量记录时不逐行计算高度
+        traffic_table.verticalHeader().setVisible(False)
+        traffic_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        traffic_table.verticalHeader().setDefaultSectionSize(24)
+        traffic_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        traffic_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        traffic_table.setMinimumHeight(300)
+        traffic_layout.addWidget(traffic_table)
+        return traffic_widget
+
+    def show_screenshot_menu(self, label, pos, case_ids, position):
+        menu = QMenu(label)
+        delete_action = menu.addAction("删除截图")
+        if menu.exec_(label.mapToGlobal(pos)) is delete_action:
+            self.confirm_delete_screenshot(*case_ids, position)
+
     def show_image(self, image_path):
         # 创建一个对话框显示放大的图片
         dialog = QDialog(self)
@@ -1507,42 +3738,30 @@ class App(QMainWindow):
 
         dialog.exec_()
 
-    def append_screenshot_result(self, bug_info):
-        case_id = self.current_case_id
-        module_id = self.current_module_id
-
-        error_file_path = get_user_data_path("import.json")
-
-        # 读取最新的import.json文件内容
-        with open(error_file_path, "r") as file:
-            data = json.load(file)
+    def append_screenshot_result(self, bug_info, module_id=None, case_id=None):
+        # 直接修改内存中的用例（默认为当前用例），不再重新读取 import.json
+        if case_id is None:
+            module_id, case_id = self.current_module_id, self.current_case_id
+        case = self.case_index.get_case(module_id, case_id)
+        if case is None:
+            logger.error(f"未找到用例，截图结果未保存: {bug_info}")
+            return
 
-        # 查找指定的模块和用例
-        for module in data:
-            if str(module["id"]) == module_id:
-                for case in module.get("caseVoList", []):
-                    if str(case["id"]) == case_id:
-                        # 读取并解析imageResult字段为JSON,如果存在且有效
-                        existing_image_results = []
-                        if "imageResult" in case and case["imageResult"]:
-                            try:
-                                existing_image_results = json.loads(case["imageResult"])
-                                if not isinstance(existing_image_results, list):
-                                    existing_image_results = [existing_image_results]
-                            except json.JSONDecodeError:
-                                logger.error("imageResult字段解析错误,将被覆盖。")
-                                existing_image_results = []
-
-                        # 追加新的截图结果
-                        updated_image_results = existing_image_results + [bug_info]
-                        case["imageResult"] = json.dumps(updated_image_results, ensure_ascii=False)
-                        break
-
-        # 保存修改后的整个data到import.json
-        with open(error_file_path, "w") as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
+        # 读取并解析imageResult字段为JSON,如果存在且有效
+        existing_image_results = []
+        if "imageResult" in case and case["imageResult"]:
+            try:
+                existing_image_results = json.loads(case["imageResult"])
+                if not isinstance(existing_image_results, list):
+                    existing_image_results = [existing_image_results]
+            except json.JSONDecodeError:
+                logger.error("imageResult字段解析错误,将被覆盖。")
+                existing_image_results = []
 
-        self.data = load_data(get_user_data_path("import.json"))
+        # 追加新的截图结果，经过索引更新截图引用计数
+        updated_image_results = existing_image_results + [bug_info]
+        self.case_index.set_images(case, updated_image_results)
+        self.persister.mark_dirty(module_id, case_id)
 
 
 class BrowserSettingsDialog(QDialog):
@@ -1731,24 +3950,358 @@ class BrowserSettingsDialog(QDialog):
 
 def load_data(filepath):
     try:
-        with open(filepath, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            data.sort(key=lambda x: x['id'])
-            for module in data:
-                module['caseVoList'].sort(key=lambda x: x['id'])
-                for case in module['caseVoList']:
-                    case.setdefault('isTested', False)  # 确保每个案例都有 isTested 字段
+        # 逐个模块解析，不再先把整个文件读成字符串
+        data = [module for module, _ in iter_json_array(filepath)]
+        data.sort(key=lambda x: x['id'])
+        for module in data:
+            module['caseVoList'].sort(key=lambda x: x['id'])
+            for case in module['caseVoList']:
+                case.setdefault('isTested', False)  # 确保每个案例都有 isTested 字段
         return data
     except FileNotFoundError:
         return []
 
 
+def iter_json_array(filepath, chunk_size=1024 * 1024):
+    # 增量解析顶层 JSON 数组，逐个返回元素及当前已读取的字节数
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer, pos, bytes_read, eof = "", 0, 0, False
+    state = "start"  # start: 等待 '['，first/value: 等待元素，sep: 等待 ',' 或 ']'
+
+    with open(filepath, "rb") as file:
+        def read_more(size):
+            nonlocal buffer, pos, bytes_read, eof
+            chunk = file.read(size)
+            bytes_read += len(chunk)
+            eof = not chunk
+            buffer = buffer[pos:] + text_decoder.decode(chunk, final=eof)
+            pos = 0
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    raise ValueError("JSON 数组不完整")
+                read_more(chunk_size)
+                continue
+
+            char = buffer[pos]
+            if state == "start":
+                if char != "[":
+                    raise ValueError("文件内容必须是 JSON 数组")
+                pos += 1
+                state = "first"
+            elif char == "]" and state in ("first", "sep"):
+                return
+            elif state == "sep":
+                if char != ",":
+                    raise ValueError(f"JSON 格式错误，位置 {bytes_read - len(buffer) + pos}")
+                pos += 1
+                state = "value"
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # 元素不完整，按已缓冲长度成倍读取，避免大元素被反复解析
+                    read_more(max(chunk_size, len(buffer) - pos))
+                    continue
+                if end == len(buffer) and not eof:
+                    read_more(chunk_size)
+                    continue
+                pos = end
+                state = "sep"
+                yield value, bytes_read
+
+
+def validate_module(module, index):
+    # 导入时逐个校验模块，并按 load_data 的规则整理用例
+    if not isinstance(module, dict) or "id" not in module or "name" not in module:
+        raise ValueError(f"第 {index + 1} 个模块缺少 id 或 name 字段")
+    cases = module.get("caseVoList")
+    if not isinstance(cases, list):
+        raise ValueError(f"模块 {module['id']} 的 caseVoList 不是数组")
+    for case in cases:
+        if not isinstance(case, dict) or "id" not in case or "caseName" not in case:
+            raise ValueError(f"模块 {module['id']} 中存在缺少 id 或 caseName 的用例")
+        case.setdefault('isTested', False)
+    cases.sort(key=lambda x: x['id'])
+
+
+def snapshot_plan(data):
+    # 浅拷贝模块和用例字典，后台线程序列化时不受界面线程后续修改的影响
+    # completion 按测试状态在副本中设置
+    snapshot = []
+    for module in data:
+        module_copy = dict(module)
+        if "caseVoList" in module:
+            module_copy["caseVoList"] = [dict(case, completion=1 if case.get("isTested", False) else 0)
+                                         for case in module["caseVoList"]]
+        snapshot.append(module_copy)
+    return snapshot
+
+
+def write_json_atomic(file_path, data):
+    # 写临时文件 + fsync + rename，崩溃时不会留下写了一半的文件
+    dir_name = os.path.dirname(file_path)
+    fd, temp_path = tempfile.mkstemp(prefix=".import-", suffix=".tmp", dir=dir_name)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    # 同步目录项，保证改名本身也已落盘
+    dir_fd = os.open(dir_name, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def parse_json_list(value):
+    # httpResult/imageResult 在文件中以 JSON 字符串保存，这里统一解析为列表
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return []
+    if not isinstance(value, list):
+        return [value] if value else []
+    return value
+
+
+def get_http_journal_path(module_id, case_id):
+    # 与代理脚本中的路径相同：每个用例一个追加写入的 JSONL 抓包日志
+    return os.path.join(get_user_data_path("http_journal"), str(module_id), f"{case_id}.jsonl")
+
+
+def append_json_lines(path, entries):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+
+
+def fold_http_journal(find_case, skip=(), leftovers=False):
+    # 将 mitmproxy 追加写入的抓包日志合并进对应用例的 httpResult
+    # 返回已合并的日志文件，调用方在数据落盘后再删除它们
+    # skip 为已合并但尚未删除的日志；leftovers 为 True 时才读取上次运行遗留的日志
+    journal_dir = get_user_data_path("http_journal")
+    if not os.path.isdir(journal_dir):
+        return []
+
+    consumed = []
+    for module_id in os.listdir(journal_dir):
+        module_dir = os.path.join(journal_dir, module_id)
+        if not os.path.isdir(module_dir):
+            continue
+        for name in sorted(os.listdir(module_dir)):
+            journal_path = os.path.join(module_dir, name)
+            if name.endswith(".jsonl"):
+                # 先改名再读取，mitmproxy 之后的追加会写入新文件
+                case_id = name[:-len(".jsonl")]
+                compacting_path = os.path.join(module_dir, f"{case_id}.{time.time_ns()}.compacting")
+                try:
+                    os.replace(journal_path, compacting_path)
+                except FileNotFoundError:
+                    continue
+            elif name.endswith(".compacting"):
+                # 上次运行合并后未及时删除的日志，运行期间的 .compacting 都已在内存中
+                if not leftovers or journal_path in skip:
+                    continue
+                case_id = name.split(".")[0]
+                compacting_path = journal_path
+            else:
+                continue
+
+            entries = []
+            with open(compacting_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.error(f"跳过无法解析的抓包记录: {compacting_path}")
+            consumed.append(compacting_path)
+
+            case = find_case(module_id, case_id)
+            if case is None:
+                logger.error(f"抓包日志对应的用例不存在: 模块 {module_id}, 用例 {case_id}")
+                continue
+            if entries:
+                existing_errors = parse_json_list(case.get("httpResult"))
+                case["httpResult"] = json.dumps(merge_http_results(existing_errors, entries), ensure_ascii=False)
+    return consumed
+
+
+def merge_http_results(existing, entries):
+    # 普通抓包记录直接追加；聚合记录是累计值，替换相同 aggregateKey 的旧记录
+    merged = list(existing)
+    aggregate_positions = {entry["aggregateKey"]: pos for pos, entry in enumerate(merged)
+                           if isinstance(entry, dict) and entry.get("aggregateKey")}
+    for entry in entries:
+        key = entry.get("aggregateKey") if isinstance(entry, dict) else None
+        if key and key in aggregate_positions:
+            merged[aggregate_positions[key]] = entry
+        else:
+            if key:
+                aggregate_positions[key] = len(merged)
+            merged.append(entry)
+    return merged
+
+
+def remove_journal_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"删除抓包日志失败: {path}: {e}")
+
+
+def iter_image_names(image_result):
+    for image in parse_json_list(image_result):
+        if isinstance(image, dict) and image.get("imageName"):
+            yield image["imageName"]
+
+
+def count_image_references(data):
+    # 截图引用计数：同一张截图可以被多个用例引用；运行期间由 CaseIndex 增量维护
+    references = Counter()
+    for module in data or []:
+        for case in module.get("caseVoList", []):
+            references.update(iter_image_names(case.get("imageResult")))
+    return references
+
+
+def get_export_screenshots(data):
+    # 只导出计划中引用的截图，每张截图只打包一次
+    screenshots_dir = get_user_data_path('screenshots')
+    return sorted(name for name in count_image_references(data)
+                  if os.path.exists(os.path.join(screenshots_dir, name)))
+
+
+def load_export_manifest():
+    # 清单记录已导出截图的大小、修改时间、哈希和导出时间
+    manifest_path = get_user_data_path('export_manifest.json')
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            files = json.load(f).get("files", {})
+        return files if isinstance(files, dict) else {}
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"读取导出清单失败，将按全部截图处理: {e}")
+        return {}
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def has_http_journal():
+    return os.path.isdir(get_user_data_path("http_journal"))
+
+
+def discard_http_journal():
+    shutil.rmtree(get_user_data_path("http_journal"), ignore_errors=True)
+
+
+def get_har_journal_path(module_id, case_id):
+    # 与代理脚本中的路径相同：每个用例一个 HAR 日志，一行一条
+    return os.path.join(get_user_data_path("har"), str(module_id), f"{case_id}.jsonl")
+
+
+def get_har_journals():
+    # 代理脚本写入的 har/<模块ID>/<用例ID>.jsonl，返回 (压缩包内路径, 文件路径, 大小)
+    har_dir = get_user_data_path("har")
+    journals = []
+    if not os.path.isdir(har_dir):
+        return journals
+    for module_id in sorted(os.listdir(har_dir)):
+        module_dir = os.path.join(har_dir, module_id)
+        if not os.path.isdir(module_dir):
+            continue
+        for name in sorted(os.listdir(module_dir)):
+            if name.endswith(".jsonl"):
+                path = os.path.join(module_dir, name)
+                case_id = name[:-len(".jsonl")]
+                journals.append((f"har/{module_id}_{case_id}.har", path, os.path.getsize(path)))
+    return journals
+
+
+def discard_har_journal():
+    shutil.rmtree(get_user_data_path("har"), ignore_errors=True)
+
+
+def create_webdriver(browser_choice, browser_path, driver_path, proxy_port):
+    # selenium 导入较慢，第一次启动浏览器时才导入
+    from selenium.webdriver import Firefox, Chrome
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.firefox.options import Options as FirefoxOptions
+    from selenium.webdriver.firefox.service import Service as FirefoxService
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    if browser_choice == "firefox":
+        firefox_options = FirefoxOptions()
+        firefox_options.binary_location = browser_path
+        firefox_options.set_preference('network.proxy.type', 1)
+        firefox_options.set_preference('network.proxy.http', '127.0.0.1')
+        firefox_options.set_preference('network.proxy.http_port', proxy_port)
+        firefox_options.set_preference('network.proxy.ssl', '127.0.0.1')
+        firefox_options.set_preference('network.proxy.ssl_port', proxy_port)
+
+        # 将 FirefoxOptions 的日志级别设为 trace 以获取更详细信息
+        firefox_options.log.level = "trace"
+
+        firefox_service = FirefoxService(
+            executable_path=driver_path,
+            log_path='geckodriver.log',  # 将日志输出到本地文件中
+            service_args=["--log", "trace"]  # 设置日志级别为trace，获得更详细的日志信息
+        )
+        return Firefox(service=firefox_service, options=firefox_options)
+
+    chrome_options = ChromeOptions()
+    chrome_options.binary_location = browser_path
+    chrome_options.add_argument(f'--proxy-server=http://127.0.0.1:{proxy_port}')
+    chrome_service = ChromeService(executable_path=driver_path)
+    return Chrome(service=chrome_service, options=chrome_options)
+
+
+def is_session_alive(driver):
+    from selenium.common.exceptions import WebDriverException
+    try:
+        if driver.service.process is None or driver.service.process.poll() is not None:
+            return False
+        _ = driver.current_window_handle
+        return True
+    except WebDriverException:
+        return False
+
+
+def on_mitmproxy_check_failed():
+    logger.critical("mitmproxy 检查失败，程序将退出。")
+    QMessageBox.critical(None, "错误", "未找到可用的 mitmdump，程序将退出。请检查日志文件。")
+    QApplication.exit(1)
+
+
 if __name__ == '__main__':
+    startup_started = time.perf_counter()
     try:
-        # 在主程序开始时调用此函数
-        if not check_mitmproxy():
-            logger.critical("mitmproxy 检查失败，程序将退出。")
-            sys.exit(1)
         # 设置环境变量
         os.environ['QT_IM_MODULE'] = 'fcitx'  # 或者 'ibus'，取决于你的输入法
         os.environ['XMODIFIERS'] = '@im=fcitx'  # 或者 '@im=ibus'
@@ -1772,6 +4325,14 @@ if __name__ == '__main__':
             app.setStyleSheet(style)
         window = App()
         window.show()
+        # 事件循环处理完第一批事件（窗口已绘制）后记录启动耗时
+        QTimer.singleShot(0, lambda: logger.info(
+            f"启动耗时: {(time.perf_counter() - startup_started) * 1000:.0f} ms（{app.platformName()}）"))
+
+        # mitmdump 检查在后台进行，只执行一次
+        mitmproxy_check = MitmproxyCheckThread()
+        mitmproxy_check.failed.connect(on_mitmproxy_check_failed)
+        mitmproxy_check.start()
 
         # 显式启用输入法
         input_method = QGuiApplication.inputMethod()